@@ -5,13 +5,33 @@ user registration, and administrative flight management.
 
 import tkinter as tk
 import db_queries
+import sessions
+import instrumentation
+import export
+import occupancy
+import changes
+import holds
+import waitlist
+import replica
+import archive
+import heatmap
+import history
+import maintenance
+import snapshot
+import warmup
+import statscache
+import usersearch
+import datetime
 import os
+import queue
+import sqlite3
 import sys
+import threading
 
-from tkinter import messagebox
-from stats import calculate_seat_availability, list_seat_availability, list_users_for_flight
+from tkinter import messagebox, filedialog
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
 
 
 class App(tk.Tk):
@@ -24,8 +44,17 @@ class App(tk.Tk):
         show_previous_page(): Navigates back to the previous page.
         set_user_info(user_info2): Sets or updates the logged in user info.
         get_user_info(): Retrieves the logged in user info.
+        start_session(user_info2): Stores the user info and issues a session token.
+        end_session(): Revokes the current session token.
+        is_admin(): Checks the current session for admin rights without querying the database.
+        poll_changes(): Checks periodically for bookings changed by other users, releases expired seat holds, reports waitlist promotions and runs idle maintenance.
+        notify_promotions(): Tells the logged in user about seats they got from a waitlist.
+        stats_db_path(): Returns the database path statistics should be read from.
         on_close(): Cleans up resources and closes the application.
     """
+    # Interval in milliseconds at which open seat maps are checked for changes
+    POLL_INTERVAL_MS = 1000
+
     def __init__(self):
         super().__init__()
         
@@ -42,12 +71,56 @@ class App(tk.Tk):
         # Dictionary to store user information
         self.user_info = {}
 
+        # Session manager and the token of the logged in user
+        self.sessions = sessions.SessionManager()
+        self.session_token = None
+
+        # Watcher that tells open seat maps about bookings changed by other users
+        self.watcher = changes.SeatMapWatcher(db_queries.db_path)
+        self.after(self.POLL_INTERVAL_MS, self.poll_changes)
+
+        # Seat holds that keep selected seats free while the user decides
+        self.holds = holds.SeatHolds()
+
+        # Record how flights fill up from now on (history.py), for the fill curves on the Stats page
+        history.ensure_table()
+
+        # Waitlists of full flights; cancelled seats go to the next customer waiting
+        self.waitlist = waitlist.Waitlist()
+
+        # Optional in-memory replica for statistics, so long reports don't hold up bookings.
+        # FLIGHTS_STATS_REPLICA is the maximum age of the replica in seconds.
+        self.stats_replica = None
+        staleness = os.environ.get("FLIGHTS_STATS_REPLICA")
+        if staleness:
+            self.stats_replica = replica.StatsReplica(db_queries.db_path, max_staleness=float(staleness))
+            self.stats_replica.start()
+
+        # Statistics of recently searched flights, reused while their bookings are unchanged
+        self.stats_cache = statscache.StatsCache()
+
+        # Optional seat snapshot shared by all processes on this host (snapshot.py), so seat maps are
+        # read from a memory-mapped file. FLIGHTS_SEAT_SNAPSHOT is the path of the snapshot file,
+        # published by "python snapshot.py <file>".
+        self.seat_snapshot = None
+        snapshot_path = os.environ.get("FLIGHTS_SEAT_SNAPSHOT")
+        if snapshot_path and os.path.exists(snapshot_path):
+            self.seat_snapshot = snapshot.SeatSnapshot(snapshot_path)
+
+        # Database maintenance (statistics, vacuum, integrity check) while the app is idle
+        self.maintenance = maintenance.MaintenanceScheduler(db_queries.db_path)
+        self.bind_all("<Key>", lambda event: self.maintenance.touch(), add="+")
+        self.bind_all("<Button>", lambda event: self.maintenance.touch(), add="+")
+
         # List to track navigation history
         self.navigation_history = []
 
         # Initialize and show the main menu
         self.show_page(WelcomeMenu)
 
+        # Once the Welcome page is drawn, warm up caches in the background for the first search
+        self.after_idle(warmup.start)
+
         # Bind the window close event to the cleanup method
         self.protocol("WM_DELETE_WINDOW", self.on_close)
 
@@ -58,9 +131,16 @@ class App(tk.Tk):
         Args:
             page_class (class): The class of the page to be displayed.
         """
-        # Add the current page to navigation history if a page is already loaded
+        # Admin-only pages are checked against the session, not the database
+        if page_class in (Stats, ManageFlights, UserSearch, QueryProfile) and not self.is_admin():
+            messagebox.showerror("Error", "This page is only available to administrators.")
+            return
+
+        # Add the current page to navigation history if a page is already loaded,
+        # and stop watching the flight it displayed
         if self.pages:
             self.navigation_history.append(self.current_page)
+            self.watcher.unsubscribe(self.current_page.__name__)
 
         # Create a new instance of the page if it doesn't exist (except for WelcomeMenu)
         if (page_class not in self.pages) or (page_class != WelcomeMenu):
@@ -76,6 +156,9 @@ class App(tk.Tk):
         # Update the current page tracker
         self.current_page = page_class
 
+        # Queries issued from now on are attributed to this page
+        instrumentation.set_screen(page_class.__name__)
+
     def show_previous_page(self):
         """
         Navigate back to the previous page in the navigation history.
@@ -102,10 +185,76 @@ class App(tk.Tk):
         """
         return self.user_info
 
+    def start_session(self, user_info2):
+        """
+        Store the logged in user information and issue a new session token for it.
+
+        Args:
+            user_info2 (dict): A dictionary containing user details (username, name, user_type).
+        """
+        self.end_session()
+        self.set_user_info(user_info2)
+        self.session_token = self.sessions.issue(user_info2)
+
+    def end_session(self):
+        """
+        Revoke the current session token, if any.
+        """
+        if self.session_token is not None:
+            self.sessions.revoke(self.session_token)
+            self.session_token = None
+
+    def is_admin(self):
+        """
+        Check whether the logged in user is an admin.
+
+        Returns:
+            bool: True if the current session is valid and belongs to an admin.
+        """
+        return self.sessions.is_admin(self.session_token)
+
+    def poll_changes(self):
+        """
+        Check for bookings changed by other users, release expired seat holds, tell the user about
+        seats they got from a waitlist, start database maintenance if it is due and the app is idle,
+        and reschedule the next check.
+        """
+        try:
+            self.holds.release_expired()
+            self.watcher.poll()
+            self.notify_promotions()
+            self.maintenance.maybe_run()
+        finally:
+            self.after(self.POLL_INTERVAL_MS, self.poll_changes)
+
+    def notify_promotions(self):
+        """
+        Show a message for every seat the logged in user got from a waitlist since the last check.
+        """
+        username = self.user_info.get("username")
+        if self.session_token is None or username is None:
+            return
+        for flight_id, seat_number in self.waitlist.pop_promotions(username):
+            messagebox.showinfo("Waitlist", f"A seat became free on Flight {flight_id}: Seat {seat_number} is now booked for you.")
+
+    def stats_db_path(self):
+        """
+        Returns the path statistics are read from: the in-memory replica if one is configured,
+        otherwise the database file.
+        """
+        if self.stats_replica is not None:
+            return self.stats_replica.path()
+        return db_queries.db_path
+
     def on_close(self):
         """
         Clean up resources and close the application.
         """
+        self.watcher.close()
+        if self.stats_replica is not None:
+            self.stats_replica.close()
+        if self.seat_snapshot is not None:
+            self.seat_snapshot.close()
         # Close all matplotlib figures
         plt.close('all')
         # Destroy the Tkinter window
@@ -207,12 +356,12 @@ class LoginPage(tk.Frame):
 
         user = {"username": username, "password": password}
         
-        if db_queries.is_in_table("users", user):
-            full_user_info_tuple = db_queries.gimme_tuples("users", identifier=user)
-            user["name"] = full_user_info_tuple[0][1]
-            user["user_type"] = full_user_info_tuple[0][3]
+        user_record = db_queries.fetch_record("users", user)
+        if user_record:
+            user["name"] = user_record.name
+            user["user_type"] = user_record.user_type
 
-            self.controller.set_user_info(user)
+            self.controller.start_session(user)
             self.controller.show_page(MainMenu)
             
         else:
@@ -336,7 +485,7 @@ class MyAccountPage(tk.Frame):
         tk.Button(self, text="Back to Main Menu", command=lambda: controller.show_page(MainMenu)).pack(pady=10)
 
         # Log out Button to return to the Welcome Menu
-        tk.Button(self, text="Log out", command=lambda: (controller.show_page(WelcomeMenu))).pack(pady=10)
+        tk.Button(self, text="Log out", command=lambda: (controller.end_session(), controller.show_page(WelcomeMenu))).pack(pady=10)
 
     def show_info(self):
         """
@@ -358,7 +507,12 @@ class MainMenu(tk.Frame):
     Methods:
         __init__(parent, controller): Initializes the main menu page.
         search_display_flight(): Searches for a flight and displays its seat layout.
-        book_seat(entry, flight_id): Processes the booking of a selected seat.
+        apply_seat_changes(flight_id, changes): Redraws the seats changed by other users.
+        book_seat(entry, flight_id): Processes the booking of the selected seats.
+        book_itinerary(entry): Books the seats of a connecting trip on all its flights, all or nothing.
+        suggest_seats(entry, party_entry, flight_id): Fills in and holds a block of adjacent free seats for a group.
+        hold_seats(entry, flight_id): Holds the entered seats for a few minutes.
+        join_waitlist(flight_id): Puts the current user on the waitlist of a full flight.
     """
     def __init__(self, parent, controller):
         super().__init__(parent)
@@ -369,14 +523,17 @@ class MainMenu(tk.Frame):
         button_frame.pack(anchor="ne", padx=10, pady=10)
 
         # Display admin-only buttons if the user is an admin
-        user_info = controller.get_user_info()
-        if user_info["user_type"] == "admin":
+        if controller.is_admin():
             tk.Button(button_frame, text="Stats", command=lambda: controller.show_page(Stats)).pack(side="left", padx=5)
             tk.Button(button_frame, text="Manage Flights", command=lambda: controller.show_page(ManageFlights)).pack(side="left", padx=5)
+            tk.Button(button_frame, text="Find Users", command=lambda: controller.show_page(UserSearch)).pack(side="left", padx=5)
+            if instrumentation.enabled:
+                tk.Button(button_frame, text="Query Profile", command=lambda: controller.show_page(QueryProfile)).pack(side="left", padx=5)
 
+        tk.Button(button_frame, text="Find Flights", command=lambda: controller.show_page(FlightSearch)).pack(side="left", padx=5)
         tk.Button(button_frame, text="My Bookings", command=lambda: controller.show_page(MyBookings)).pack(side="left", padx=5)
         tk.Button(button_frame, text="My Account", command=lambda: controller.show_page(MyAccountPage)).pack(side="left", padx=5)
-        tk.Button(button_frame, text="Log Off", command=lambda: controller.show_page(WelcomeMenu)).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Log Off", command=lambda: (controller.end_session(), controller.show_page(WelcomeMenu))).pack(side="left", padx=5)
 
         # Search field frame in the center for flight booking
         search_frame = tk.Frame(self)
@@ -389,6 +546,19 @@ class MainMenu(tk.Frame):
         self.search_entry = tk.Entry(search_frame)
         self.search_entry.pack(pady=5)
         tk.Button(search_frame, text="Search", command=self.search_display_flight).pack(pady=5)
+
+        # Connecting trips are booked on all flights at once, or not at all
+        tk.Label(search_frame, text="Connecting trip (e.g. 13808: 1A 1B; 13809: 2C 2D):").pack(pady=5)
+        trip_frame = tk.Frame(search_frame)
+        trip_frame.pack(pady=5)
+        trip_entry = tk.Entry(trip_frame, width=30)
+        trip_entry.pack(side=tk.LEFT, padx=5)
+        tk.Button(trip_frame, text="Book Trip", command=lambda: self.book_itinerary(entry=trip_entry)).pack(side=tk.LEFT, padx=5)
+
+        # Frame and text widget of the currently displayed seat map
+        self.display_frame = None
+        self.seat_text = None
+        self.seat_representation = None
         
     def search_display_flight(self):
         """
@@ -398,15 +568,33 @@ class MainMenu(tk.Frame):
         flight_id = self.search_entry.get()
 
         if db_queries.is_in_table("flights", {"flight_id": flight_id}):
-            # Retrieve flight, aircraft, and booking information from the database
-            flight_info = db_queries.gimme_tuples("flights", identifier={"flight_id": flight_id})
-            aircraft_info = db_queries.gimme_tuples("aircrafts", identifier={"code": flight_info[0][1]})
-            booking_info = db_queries.gimme_tuples("bookings", identifier={"flight": flight_id})
+            # Watch the flight for bookings by other users before reading its seats, so none are missed
+            version = self.controller.watcher.subscribe("MainMenu", flight_id, self.apply_seat_changes)
+
+            # Read the seats from the shared seat snapshot if it has the flight, otherwise from the database
+            seat_snapshot = self.controller.seat_snapshot
+            snapshot_flight = seat_snapshot.flight(flight_id) if seat_snapshot is not None else None
+            if snapshot_flight is not None and snapshot_flight.version <= version:
+                layout, rows, total_seats = snapshot_flight.layout, snapshot_flight.row_number, snapshot_flight.total_seats
+                booked_seats = set(seat_snapshot.booked_seats(flight_id))
+                # Bring the snapshot up to date with the seats changed since it was written
+                for seat, booker in changes.changed_seats(self.controller.watcher.conn, flight_id,
+                                                          snapshot_flight.version).items():
+                    if booker is None:
+                        booked_seats.discard(seat)
+                    else:
+                        booked_seats.add(seat)
+            else:
+                flight = db_queries.fetch_record("flights", {"flight_id": flight_id})
+                aircraft = db_queries.fetch_record("aircrafts", {"code": flight.aircraft_code})
+                flight_bookings = db_queries.fetch_records("bookings", {"flight": flight_id})
+                layout, rows, total_seats = aircraft.layout, aircraft.row_number, len(flight_bookings)
+                booked_seats = {booking.seat_number for booking in flight_bookings if booking.booker is not None}
+            held_info = self.controller.holds.held_seats(flight_id)
             
             # Build the string representation of the flight's seat layout
-            seat_representation = aircraft_info[0][1].replace("| |", "|   |")
+            seat_representation = layout.replace("| |", "|   |")
             flight_representation = ["     " + seat_representation + "\n"]
-            rows = aircraft_info[0][2]
 
             for i in range(rows):
                 if i+1 < 10:
@@ -415,52 +603,319 @@ class MainMenu(tk.Frame):
                     flight_representation += ["\n" + str(i+1) + "  " + seat_representation]
                 
             # Replace seat characters with 'X' if the seat is booked
-            booked_seats = [booking[1] for booking in booking_info if booking[2] is not None]
             for seat in booked_seats:
                 flight_representation[int(seat[:-1])] = flight_representation[int(seat[:-1])].replace(seat[-1], "X")
 
+            # Replace seat characters with 'H' if the seat is held by another user
+            username = self.controller.get_user_info()["username"]
+            for seat, holder in held_info.items():
+                if holder != username:
+                    flight_representation[int(seat[:-1])] = flight_representation[int(seat[:-1])].replace(seat[-1], "H")
+
             single_string_representation = "".join(flight_representation)
                 
-            # Create a frame to display the seat layout and booking input
+            # Create a frame to display the seat layout and booking input, replacing a previous one
+            if self.display_frame is not None:
+                self.display_frame.destroy()
             display_frame = tk.Frame(self)
             display_frame.pack(expand=True, pady=10, anchor="n")
-            tk.Label(display_frame, text=f"Seat Layout Representation for Flight no {flight_id}\n X represents a reserved seat \n |   | represents an aisle").pack(pady=5)
-            tk.Label(display_frame, anchor = "n", text=single_string_representation).pack(pady=5)
+            self.display_frame = display_frame
+            tk.Label(display_frame, text=f"Seat Layout Representation for Flight no {flight_id}\n X represents a reserved seat, H a seat held by another customer \n |   | represents an aisle").pack(pady=5)
+
+            # The seat map is a text widget so that single seats can be redrawn when they change
+            self.seat_representation = seat_representation
+            self.seat_text = tk.Text(display_frame, height=rows + 2, width=len(seat_representation) + 6, borderwidth=0)
+            self.seat_text.insert("1.0", single_string_representation)
+            self.seat_text.config(state=tk.DISABLED)
+            self.seat_text.pack(pady=5)
 
-            tk.Label(display_frame, text="Enter the seat number you want to book:").pack(pady=5, anchor="n")
+            tk.Label(display_frame, text="Enter the seat number(s) you want to book:").pack(pady=5, anchor="n")
             book_seat_entry = tk.Entry(display_frame)
             book_seat_entry.pack(pady=5, anchor="n")
-            tk.Button(display_frame, text="Book", command=lambda: self.book_seat(entry=book_seat_entry, flight_id=flight_id)).pack(pady=5, anchor="n")
+
+            # Group size field and button to suggest adjacent seats
+            suggest_frame = tk.Frame(display_frame)
+            suggest_frame.pack(pady=5, anchor="n")
+            tk.Label(suggest_frame, text="Group size:").pack(side=tk.LEFT, padx=5)
+            party_entry = tk.Entry(suggest_frame, width=5)
+            party_entry.pack(side=tk.LEFT, padx=5)
+            tk.Button(suggest_frame, text="Suggest seats", command=lambda: self.suggest_seats(entry=book_seat_entry, party_entry=party_entry, flight_id=flight_id)).pack(side=tk.LEFT, padx=5)
+
+            # Buttons to hold or book the entered seats
+            book_frame = tk.Frame(display_frame)
+            book_frame.pack(pady=5, anchor="n")
+            tk.Button(book_frame, text="Hold", command=lambda: self.hold_seats(entry=book_seat_entry, flight_id=flight_id)).pack(side=tk.LEFT, padx=5)
+            tk.Button(book_frame, text="Book", command=lambda: self.book_seat(entry=book_seat_entry, flight_id=flight_id)).pack(side=tk.LEFT, padx=5)
+
+            # A full flight can only be booked through its waitlist
+            if len(booked_seats) >= total_seats:
+                waitlist_frame = tk.Frame(display_frame)
+                waitlist_frame.pack(pady=5, anchor="n")
+                tk.Label(waitlist_frame, text="This flight is full.").pack(side=tk.LEFT, padx=5)
+                tk.Button(waitlist_frame, text="Join Waitlist", command=lambda: self.join_waitlist(flight_id=flight_id)).pack(side=tk.LEFT, padx=5)
 
         else:
             messagebox.showerror("Error", "Flight not found, please try again.")
 
+    def apply_seat_changes(self, flight_id, changes):
+        """
+        Redraw only the seats that were booked or cancelled since the seat map was drawn.
+
+        Args:
+            flight_id (str): The ID of the displayed flight.
+            changes (dict): Seat number -> current booker (None if the seat is free again).
+        """
+        if self.seat_text is None or not self.seat_text.winfo_exists():
+            return
+
+        self.seat_text.config(state=tk.NORMAL)
+        for seat, booker in changes.items():
+            row, letter = int(seat[:-1]), seat[-1]
+            if letter not in self.seat_representation:
+                continue
+            # Line 1 is the header and line 2 is empty; rows 1-9 are prefixed with 5 characters, rows 10+ with 4
+            line = row + 2
+            column = len(str(row)) + (4 if row < 10 else 2) + self.seat_representation.index(letter)
+            self.seat_text.delete(f"{line}.{column}")
+            self.seat_text.insert(f"{line}.{column}", "X" if booker is not None else letter)
+        self.seat_text.config(state=tk.DISABLED)
+
     def book_seat(self, entry, flight_id):
         """
-        Attempt to book a seat for the specified flight based on user input.
+        Attempt to book one or more seats for the specified flight based on user input.
+        Seats held by other customers cannot be booked.
 
         Args:
-            entry (tk.Entry): The entry widget containing the seat number.
-            flight_id (str): The ID of the flight for which the seat is being booked.
-        """
-        booking_info_dictionary = {"seat_number": entry.get(),
-                                    "flight": flight_id,
-                                    }
-        if db_queries.is_in_table("bookings", booking_info_dictionary):
-            seat_info = db_queries.gimme_tuples("bookings", identifier=booking_info_dictionary)
-
-            if seat_info[0][2] is None:
-                booker_username ={"booker" : self.controller.get_user_info()["username"]}
-                db_queries.update_row("bookings", old_values=booking_info_dictionary, new_values=booker_username)
-                messagebox.showinfo("Info", "Booking succesful")
-
-                self.controller.show_page(EmptyPage)
-                self.controller.show_page(MainMenu)
-            else:
-                messagebox.showerror("Error", "The selected seat already booked, please choose another one.")
+            entry (tk.Entry): The entry widget containing the seat numbers, separated by spaces or commas.
+            flight_id (str): The ID of the flight for which the seats are being booked.
+        """
+        seat_numbers = entry.get().replace(",", " ").split()
+        username = self.controller.get_user_info()["username"]
 
-        else:
-            messagebox.showerror("Error", "Invalid seat number, try again.")
+        success, error = self.controller.holds.book(flight_id, seat_numbers, username)
+        if not success:
+            messagebox.showerror("Error", error)
+            return
+
+        messagebox.showinfo("Info", "Booking succesful")
+
+        self.controller.show_page(EmptyPage)
+        self.controller.show_page(MainMenu)
+
+    def book_itinerary(self, entry):
+        """
+        Book the seats of a connecting trip on all its flights in one transaction: if any seat
+        cannot be booked, nothing is booked.
+
+        Args:
+            entry (tk.Entry): The entry widget containing the legs as "<flight ID>: <seats>", separated by semicolons.
+        """
+        legs = []
+        for leg in entry.get().split(";"):
+            if not leg.strip():
+                continue
+            flight_id, separator, seats = leg.partition(":")
+            if not separator or not flight_id.strip():
+                messagebox.showerror("Error", "Please enter each flight as <flight ID>: <seats>, separated by semicolons.")
+                return
+            legs.append((flight_id.strip(), seats.replace(",", " ").split()))
+        if not legs:
+            messagebox.showerror("Error", "Please enter at least one flight.")
+            return
+
+        username = self.controller.get_user_info()["username"]
+        success, error = self.controller.holds.book_itinerary(legs, username)
+        if not success:
+            messagebox.showerror("Error", f"{error}\nNone of the seats were booked.")
+            return
+
+        messagebox.showinfo("Info", f"Booking succesful on flights {', '.join(flight_id for flight_id, _ in legs)}")
+
+    def join_waitlist(self, flight_id):
+        """
+        Put the current user on the waitlist of a full flight. The next seat that is cancelled on the
+        flight is booked for the first customer on the waitlist.
+
+        Args:
+            flight_id (str): The ID of the flight.
+        """
+        username = self.controller.get_user_info()["username"]
+
+        success, error = self.controller.waitlist.join(flight_id, username)
+        if not success:
+            messagebox.showerror("Error", error)
+            return
+
+        position = self.controller.waitlist.position(flight_id, username)
+        messagebox.showinfo("Info", f"You are on the waitlist of Flight {flight_id} (position {position}). "
+                                    f"You will be told when a seat is booked for you.")
+
+    def hold_seats(self, entry, flight_id):
+        """
+        Hold the entered seats for the current user so that nobody else can book them for a few minutes.
+
+        Args:
+            entry (tk.Entry): The entry widget containing the seat numbers, separated by spaces or commas.
+            flight_id (str): The ID of the flight.
+
+        Returns:
+            bool: True if the seats are now held.
+        """
+        seat_numbers = entry.get().replace(",", " ").split()
+        username = self.controller.get_user_info()["username"]
+
+        success, error = self.controller.holds.hold(flight_id, seat_numbers, username)
+        if not success:
+            messagebox.showerror("Error", error)
+            return False
+
+        minutes = self.controller.holds.ttl // 60
+        messagebox.showinfo("Info", f"Seat(s) {', '.join(seat_numbers)} held for you for {minutes} minutes.")
+        return True
+
+    def suggest_seats(self, entry, party_entry, flight_id):
+        """
+        Suggest a block of adjacent free seats in one row for a group and put it into the booking field.
+
+        Args:
+            entry (tk.Entry): The entry widget for the seat numbers to book.
+            party_entry (tk.Entry): The entry widget containing the group size.
+            flight_id (str): The ID of the flight.
+        """
+        try:
+            party_size = int(party_entry.get())
+        except ValueError:
+            messagebox.showerror("Error", "Group size must be a number.")
+            return
+        if party_size < 1:
+            messagebox.showerror("Error", "Group size must be at least 1.")
+            return
+
+        # Seats held by other users are as good as booked; the user's own holds may be suggested again
+        username = self.controller.get_user_info()["username"]
+        held_by_others = [seat_number for seat_number, holder in self.controller.holds.held_seats(flight_id).items()
+                          if holder != username]
+        seats = db_queries.suggest_seats(flight_id, party_size, held_by_others)
+        if seats is None:
+            messagebox.showinfo("Info", f"There are no {party_size} adjacent free seats in one row on this flight.")
+            return
+
+        entry.delete(0, tk.END)
+        entry.insert(0, " ".join(seats))
+        self.hold_seats(entry=entry, flight_id=flight_id)
+
+
+class FlightSearch(tk.Frame):
+    """
+    Page to search flights by aircraft type, number of free seats and size of the largest block of
+    adjacent free seats, with sortable and paginated results.
+
+    Methods:
+        __init__(parent, controller): Initializes the flight search page.
+        search(page): Runs the search and displays the given page of results.
+        open_flight(flight_id): Opens the seat map of a flight on the main menu.
+    """
+    PAGE_SIZE = 15
+
+    def __init__(self, parent, controller):
+        super().__init__(parent)
+        self.controller = controller
+        self.page = 1
+
+        # Upper left button frame for navigation
+        button_frame = tk.Frame(self)
+        button_frame.pack(anchor="ne", padx=10, pady=10)
+
+        tk.Button(button_frame, text="Return", command=lambda: controller.show_page(MainMenu)).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Help", command=lambda: controller.show_page(HelpPage)).pack(side="left", padx=5)
+
+        # Page Title
+        tk.Label(self, text="Find Flights", font=("Arial", 16)).pack(pady=10)
+
+        # Frame to hold labels for the filters
+        top_frame = tk.Frame(self)
+        top_frame.pack(pady=5)
+        tk.Label(top_frame, text="Aircraft code:", width=14).pack(side=tk.LEFT, padx=5)
+        tk.Label(top_frame, text="Min. free seats:", width=14).pack(side=tk.LEFT, padx=5)
+        tk.Label(top_frame, text="Min. seats together:", width=16).pack(side=tk.LEFT, padx=5)
+
+        # Frame to hold entry fields for the filters
+        middle_frame = tk.Frame(self)
+        middle_frame.pack(pady=5)
+        self.aircraft_entry = tk.Entry(middle_frame, width=14)
+        self.aircraft_entry.pack(side=tk.LEFT, padx=5)
+        self.free_entry = tk.Entry(middle_frame, width=14)
+        self.free_entry.pack(side=tk.LEFT, padx=5)
+        self.block_entry = tk.Entry(middle_frame, width=16)
+        self.block_entry.pack(side=tk.LEFT, padx=5)
+
+        # Sorting options
+        sort_frame = tk.Frame(self)
+        sort_frame.pack(pady=5)
+        tk.Label(sort_frame, text="Sort by:").pack(side=tk.LEFT, padx=5)
+        self.sort_var = tk.StringVar(value="flight_id")
+        tk.OptionMenu(sort_frame, self.sort_var, *occupancy.SORT_COLUMNS).pack(side=tk.LEFT, padx=5)
+        self.descending_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(sort_frame, text="Descending", variable=self.descending_var).pack(side=tk.LEFT, padx=5)
+        tk.Button(sort_frame, text="Search", command=lambda: self.search(1)).pack(side=tk.LEFT, padx=5)
+
+        # Frame to display the results
+        self.results_frame = tk.Frame(self)
+        self.results_frame.pack(fill="both", expand=True, pady=10)
+
+    def search(self, page):
+        """
+        Run the search with the current filters and display the given page of results.
+
+        Args:
+            page (int): The page number, starting at 1.
+        """
+        try:
+            min_free = int(self.free_entry.get() or 0)
+            min_block = int(self.block_entry.get() or 0)
+        except ValueError:
+            messagebox.showerror("Error", "The number of seats must be a number.")
+            return
+
+        rows, total = occupancy.search_flights(aircraft_code=self.aircraft_entry.get().strip() or None,
+                                               min_free=min_free, min_block=min_block,
+                                               sort=self.sort_var.get(), descending=self.descending_var.get(),
+                                               page=page, page_size=self.PAGE_SIZE)
+        self.page = page
+        pages = max(1, (total + self.PAGE_SIZE - 1) // self.PAGE_SIZE)
+
+        # Clear the previous results
+        for widget in self.results_frame.winfo_children():
+            widget.destroy()
+
+        tk.Label(self.results_frame, text=f"{total} flight(s) found, page {page} of {pages}").pack(pady=5)
+
+        for flight_id, aircraft_code, total_seats, free_seats, max_block in rows:
+            row_frame = tk.Frame(self.results_frame)
+            row_frame.pack(pady=1)
+            tk.Label(row_frame, text=f"Flight {flight_id} ({aircraft_code}): {free_seats}/{total_seats} seats free, "
+                                     f"up to {max_block if max_block is not None else '?'} together").pack(side=tk.LEFT, padx=5)
+            tk.Button(row_frame, text="Open", command=lambda f=flight_id: self.open_flight(f)).pack(side=tk.LEFT, padx=5)
+
+        # Buttons to switch pages
+        page_frame = tk.Frame(self.results_frame)
+        page_frame.pack(pady=5)
+        if page > 1:
+            tk.Button(page_frame, text="Previous", command=lambda: self.search(page - 1)).pack(side=tk.LEFT, padx=5)
+        if page < pages:
+            tk.Button(page_frame, text="Next", command=lambda: self.search(page + 1)).pack(side=tk.LEFT, padx=5)
+
+    def open_flight(self, flight_id):
+        """
+        Open the seat map of a flight on the main menu.
+
+        Args:
+            flight_id (str): The ID of the flight.
+        """
+        self.controller.show_page(MainMenu)
+        main_menu = self.controller.pages[MainMenu]
+        main_menu.search_entry.insert(0, flight_id)
+        main_menu.search_display_flight()
 
 
 class Stats(tk.Frame):
@@ -471,7 +926,10 @@ class Stats(tk.Frame):
         __init__(parent, controller): Initializes the stats page.
         search_flight(): Fetches and displays statistics for the given flight.
         show_pie_chart(seat_data): Displays a pie chart for reserved vs. available seats.
-        save_statistics_to_file(): Saves the current flight statistics to a text file.
+        show_heatmap(): Displays how often each seat position of an aircraft type is booked.
+        show_fill_curve(): Displays how the number of booked seats of the flight changed over time.
+        save_statistics_to_file(): Exports the current flight statistics to a file.
+        export_all_flights(): Exports the statistics of all flights to a file.
         clear_stats_frame(): Clears previous statistics from the display.
     """
     def __init__(self, parent, controller):
@@ -483,7 +941,7 @@ class Stats(tk.Frame):
         button_frame.pack(anchor="ne", padx=10, pady=10)
 
         tk.Button(button_frame, text="Return", command=lambda: controller.show_page(MainMenu)).pack(side="left", padx=5)
-        tk.Button(button_frame, text="Log Off", command=lambda: controller.show_page(WelcomeMenu)).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Log Off", command=lambda: (controller.end_session(), controller.show_page(WelcomeMenu))).pack(side="left", padx=5)
 
         # Help Button for assistance
         tk.Button(button_frame, text="Help", command=lambda: controller.show_page(HelpPage)).pack(side="left", padx=5)
@@ -496,9 +954,20 @@ class Stats(tk.Frame):
         self.search_entry = tk.Entry(search_frame)
         self.search_entry.pack(pady=5)
         tk.Button(search_frame, text="Search", command=self.search_flight).pack(pady=5)
+        tk.Button(search_frame, text="Show Fill Curve", command=self.show_fill_curve).pack(pady=5)
 
-        # Button to save statistics to a text file
+        # Buttons to export statistics to a file
         tk.Button(search_frame, text="Save Statistics to File", command=self.save_statistics_to_file).pack(pady=5)
+        tk.Button(search_frame, text="Export All Flights", command=self.export_all_flights).pack(pady=5)
+
+        # Seat heatmap of an aircraft type across all its flights
+        heatmap_frame = tk.Frame(search_frame)
+        heatmap_frame.pack(pady=5)
+        tk.Label(heatmap_frame, text="Seat heatmap for aircraft:").pack(side=tk.LEFT, padx=5)
+        aircraft_codes = db_queries.fetch_column("aircrafts", "code") or [""]
+        self.heatmap_aircraft = tk.StringVar(value=aircraft_codes[0])
+        tk.OptionMenu(heatmap_frame, self.heatmap_aircraft, *aircraft_codes).pack(side=tk.LEFT, padx=5)
+        tk.Button(heatmap_frame, text="Show Heatmap", command=self.show_heatmap).pack(side=tk.LEFT, padx=5)
 
         # Frame to display statistics
         self.stats_frame = tk.Frame(self)
@@ -514,6 +983,13 @@ class Stats(tk.Frame):
         self.seat_list_data = None
         self.user_data = None
 
+        # The heatmap is drawn once and then updated in place (None while no heatmap is shown)
+        self.heatmap_canvas = None
+        self.heatmap_image = None
+
+        # Reserved and available seats of the pie chart on display (None while no pie chart is shown)
+        self.pie_sizes = None
+
     def search_flight(self):
         """
         Fetch and display statistics for the entered flight ID, including seat availability,
@@ -524,26 +1000,20 @@ class Stats(tk.Frame):
             messagebox.showerror("Error", "Please enter a flight ID.")
             return
         
-        current_dir = os.path.abspath(os.path.dirname(__file__))
-        db_path = os.path.join(current_dir, 'flights.sqlite')
+        db_path = self.controller.stats_db_path()
 
-        # Fetch seat availability data
-        seat_data, error = calculate_seat_availability(flight_id, db_path)
-        if error:
-            messagebox.showerror("Error", error)
-            return
+        # Archived flights are read from the database file with the archive attached (archives never change,
+        # so the replica is not needed for them)
+        include_archive = archive.is_archived(db_queries.get_connection(), flight_id)
+        if include_archive:
+            db_path = db_queries.db_path
 
-        # Fetch seat list data
-        seat_list_data, error = list_seat_availability(flight_id, db_path)
-        if error:
-            messagebox.showerror("Error", error)
-            return
-
-        # Fetch user booking data
-        user_data, error = list_users_for_flight(flight_id, db_path)
+        # Fetch seat availability, seat list and user booking data (cached while the flight's bookings are unchanged)
+        results, error = self.controller.stats_cache.flight_statistics(flight_id, db_path, include_archive)
         if error:
             messagebox.showerror("Error", error)
             return
+        seat_data, seat_list_data, user_data = results
 
         # Store the current flight ID and related statistics
         self.current_flight_id = flight_id
@@ -559,6 +1029,7 @@ class Stats(tk.Frame):
         tk.Label(self.stats_frame, text=f"Total Seats: {seat_data['total_seats']}").pack(pady=2)
         tk.Label(self.stats_frame, text=f"Reserved Seats: {seat_data['reserved_seats']} ({seat_data['reserved_percentage']:.2f}%)").pack(pady=2)
         tk.Label(self.stats_frame, text=f"Available Seats: {seat_data['available_seats']} ({seat_data['available_percentage']:.2f}%)").pack(pady=2)
+        tk.Label(self.stats_frame, text=f"Currently Held Seats: {seat_data['held_seats']}").pack(pady=2)
 
         # Display reserved seats list
         tk.Label(self.stats_frame, text="Reserved Seats", font=("Arial", 14)).pack(pady=5)
@@ -582,24 +1053,33 @@ class Stats(tk.Frame):
             users_text.insert(tk.END, f"Username: {user[0]}, Name: {user[1]}, User Type: {user[2]}, Booked Seats: {user[3]}\n")
         users_text.config(state=tk.DISABLED)
 
+        metrics = self.controller.stats_cache.metrics()
+        tk.Label(self.stats_frame, text=f"Statistics cache: {metrics['hits']} hits, {metrics['misses']} misses "
+                                        f"({metrics['entries']} flights cached)").pack(pady=2)
+
         # Display a pie chart showing reserved vs. available seats
         self.show_pie_chart(seat_data)
 
     def show_pie_chart(self, seat_data):
         """
         Display a pie chart representing the distribution of reserved and available seats.
+        A chart of the same numbers that is already on display is kept instead of being drawn again.
 
         Args:
             seat_data (dict): Dictionary containing seat availability statistics.
         """
+        sizes = [seat_data['reserved_seats'], seat_data['available_seats']]
+        if sizes == self.pie_sizes:
+            return
+
         # Clear any existing chart widgets from the frame
         for widget in self.chart_frame.winfo_children():
             widget.destroy()
+        self.heatmap_canvas = None
 
         # Create a pie chart using matplotlib
         fig, ax = plt.subplots()
         labels = ['Reserved Seats', 'Available Seats']
-        sizes = [seat_data['reserved_seats'], seat_data['available_seats']]
         colors = ['red', 'green']
         ax.pie(sizes, labels=labels, colors=colors, autopct='%1.1f%%', startangle=90)
         ax.axis('equal')  # Ensure the pie chart is circular
@@ -608,41 +1088,122 @@ class Stats(tk.Frame):
         canvas = FigureCanvasTkAgg(fig, master=self.chart_frame)
         canvas.draw()
         canvas.get_tk_widget().pack(fill="both", expand=True)
+        self.pie_sizes = sizes
+
+    def show_heatmap(self):
+        """
+        Display the share of flights on which each seat of the selected aircraft type is booked, as a
+        row x seat letter heatmap. The counts come from the seat_position_counts table (heatmap.py),
+        and switching aircraft only replaces the image data instead of building a new figure.
+        """
+        aircraft_code = self.heatmap_aircraft.get()
+        data = heatmap.seat_heatmap(aircraft_code)
+        if data is None:
+            messagebox.showerror("Error", f"No such aircraft '{aircraft_code}' exists.")
+            return
+        columns, rows, matrix = data
+
+        self.clear_stats_frame()
+
+        if self.heatmap_canvas is None:
+            for widget in self.chart_frame.winfo_children():
+                widget.destroy()
+            self.pie_sizes = None
+
+            figure = Figure(figsize=(5, 5))
+            self.heatmap_axes = figure.add_subplot()
+            self.heatmap_image = self.heatmap_axes.imshow(matrix, cmap="Reds", vmin=0, vmax=1, aspect="auto")
+            figure.colorbar(self.heatmap_image, ax=self.heatmap_axes, label="Share of flights booked")
+
+            self.heatmap_canvas = FigureCanvasTkAgg(figure, master=self.chart_frame)
+            self.heatmap_canvas.get_tk_widget().pack(fill="both", expand=True)
+        else:
+            self.heatmap_image.set_data(matrix)
+            self.heatmap_image.set_extent((-0.5, len(columns) - 0.5, len(rows) - 0.5, -0.5))
+
+        axes = self.heatmap_axes
+        axes.set_xticks(range(len(columns)), columns)
+        axes.set_yticks(range(0, len(rows), 5), rows[::5])
+        axes.set_title(f"Seat bookings on all {aircraft_code} flights")
+        self.heatmap_canvas.draw_idle()
+
+    def show_fill_curve(self):
+        """
+        Display how the number of booked seats of the entered flight changed over time, from the
+        occupancy history (history.py). Recent changes are shown one by one, older ones per hour
+        or per day.
+        """
+        flight_id = self.search_entry.get()
+        if not flight_id:
+            messagebox.showerror("Error", "Please enter a flight ID.")
+            return
+
+        curve = history.fill_curve(flight_id)
+        if not curve:
+            messagebox.showerror("Error", f"No booking history for flight {flight_id}.")
+            return
+
+        # The fill curve replaces the pie chart or heatmap
+        for widget in self.chart_frame.winfo_children():
+            widget.destroy()
+        self.heatmap_canvas = None
+        self.pie_sizes = None
+
+        figure = Figure(figsize=(5, 4))
+        axes = figure.add_subplot()
+        times = [datetime.datetime.fromtimestamp(point[0]) for point in curve]
+        booked = [point[1] for point in curve]
+        # Extend the last step to now
+        axes.step(times + [datetime.datetime.now()], booked + booked[-1:], where="post", color="red")
+        if self.current_flight_id == flight_id and self.seat_data:
+            axes.axhline(self.seat_data['total_seats'], color="grey", linestyle="--", label="Total Seats")
+            axes.legend()
+        axes.set_ylabel("Booked Seats")
+        axes.set_title(f"Bookings of flight {flight_id} over time")
+        figure.autofmt_xdate()
+        figure.tight_layout()
+
+        canvas = FigureCanvasTkAgg(figure, master=self.chart_frame)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill="both", expand=True)
 
     def save_statistics_to_file(self):
         """
-        Save the current flight statistics to a text file.
+        Export the current flight statistics to a CSV, JSON Lines or columnar file.
         """
         if not self.current_flight_id:
             messagebox.showerror("Error", "No flight statistics to save. Please search for a flight first.")
             return
 
-        file_path = f"flight_{self.current_flight_id}_statistics.txt"
+        self.export_statistics([self.current_flight_id], f"flight_{self.current_flight_id}_statistics.csv")
 
-        try:
-            with open(file_path, 'w') as file:
-                file.write(f"Flight Details for Flight {self.current_flight_id}\n")
-                file.write("=================\n\n")
-
-                # Write seat availability data to file
-                file.write("Seat Availability:\n")
-                file.write(f"Total Seats: {self.seat_data['total_seats']}\n")
-                file.write(f"Reserved Seats: {self.seat_data['reserved_seats']} ({self.seat_data['reserved_percentage']:.2f}%)\n")
-                file.write(f"Available Seats: {self.seat_data['available_seats']} ({self.seat_data['available_percentage']:.2f}%)\n\n")
+    def export_all_flights(self):
+        """
+        Export the statistics of all flights to a CSV, JSON Lines or columnar file.
+        """
+        self.export_statistics(None, "all_flights_statistics.csv.gz")
 
-                # Write reserved and available seats information to file
-                file.write("Reserved Seats:\n")
-                file.write(", ".join(self.seat_list_data['reserved_seats']) + "\n\n")
+    def export_statistics(self, flight_ids, default_name):
+        """
+        Ask for a file name and stream the statistics of the given flights into it.
+        The format is chosen by the file extension; a trailing ".gz" compresses the file.
 
-                file.write("Available Seats:\n")
-                file.write(", ".join(self.seat_list_data['available_seats']) + "\n\n")
+        Args:
+            flight_ids (list): The flight IDs to export, or None for all flights.
+            default_name (str): The file name suggested in the dialog.
+        """
+        file_path = filedialog.asksaveasfilename(
+            initialfile=default_name,
+            filetypes=[("CSV", "*.csv *.csv.gz"), ("JSON Lines", "*.jsonl *.jsonl.gz"),
+                       ("Columnar", "*.columnar *.columnar.gz"), ("All files", "*")])
+        if not file_path:
+            return
 
-                # Write user booking details to file
-                file.write("Users:\n")
-                for user in self.user_data:
-                    file.write(f"Username: {user[0]}, Name: {user[1]}, User Type: {user[2]}, Booked Seats: {user[3]}\n")
+        db_path = self.controller.stats_db_path()
 
-            messagebox.showinfo("Success", f"Statistics saved to {file_path}")
+        try:
+            count = export.export_statistics(db_path, file_path, flight_ids, fmt=export.format_for_path(file_path))
+            messagebox.showinfo("Success", f"Statistics of {count} flight(s) saved to {file_path}")
         except Exception as e:
             messagebox.showerror("Error", f"Failed to save statistics: {e}")
 
@@ -657,7 +1218,7 @@ class Stats(tk.Frame):
 
 class ManageFlights(tk.Frame):
     """
-    Admin-only page to add new aircraft templates and flights to the database.
+    Admin-only page to add new aircraft templates and flights to the database, and to archive closed flights.
 
     Methods:
         __init__(parent, controller): Initializes the Manage Flights page.
@@ -666,6 +1227,8 @@ class ManageFlights(tk.Frame):
         flight_addition(): Displays the UI for adding a new flight.
         add_aircraft(): Validates input and adds a new aircraft to the database.
         add_flight(): Validates input and adds a new flight to the database.
+        flight_archival(): Displays the UI for archiving closed flights.
+        archive_flights(): Moves the entered flights and their bookings to the archive.
     """
     def __init__(self, parent, controller):
         super().__init__(parent)
@@ -692,6 +1255,7 @@ class ManageFlights(tk.Frame):
 
         tk.Button(button_frame, text="Add aircraft", command=self.aircraft_addition).pack(side=tk.LEFT, padx=5)
         tk.Button(button_frame, text="Add flight", command=self.flight_addition).pack(side=tk.LEFT, padx=5)
+        tk.Button(button_frame, text="Archive flights", command=self.flight_archival).pack(side=tk.LEFT, padx=5)
 
         # Options frame where additional widgets are displayed
         self.options_frame = tk.Frame(action_frame)
@@ -824,6 +1388,10 @@ class ManageFlights(tk.Frame):
         if db_queries.is_in_table("flights", {"flight_id": id}):    
             messagebox.showerror("Error", "Flight already exists.")
             return
+
+        if archive.is_archived(db_queries.get_connection(), id):
+            messagebox.showerror("Error", "Flight already exists in the archive.")
+            return
         
         if not db_queries.is_in_table("aircrafts", {"code": code}):    
             messagebox.showerror("Error", f"No such aircraft '{code}' exists.")
@@ -833,6 +1401,273 @@ class ManageFlights(tk.Frame):
         db_queries.add_rows_to_bookings(id, code)
         messagebox.showinfo("Success", "Flight added successfully to the database.")
 
+    def flight_archival(self):
+        """
+        Display the user interface components for archiving closed flights.
+        """
+        self.clear_options_frame()
+
+        tk.Label(self.options_frame, text="Enter the IDs of the closed flights, separated by commas:").pack(pady=5)
+
+        self.archive_ids = tk.Entry(self.options_frame, width=40)
+        self.archive_ids.pack(pady=5)
+
+        # Button to trigger the archival
+        tk.Button(self.options_frame, text="Archive", command=self.archive_flights).pack(pady=5)
+
+    def archive_flights(self):
+        """
+        Move the entered flights and their bookings from the database to the archive file.
+        Archived flights can no longer be booked, but their statistics are still available.
+        """
+        flight_ids = [flight_id.strip() for flight_id in self.archive_ids.get().split(",") if flight_id.strip()]
+        if not flight_ids:
+            messagebox.showerror("Error", "Please enter at least one flight ID.")
+            return
+
+        unknown = [flight_id for flight_id in flight_ids if not db_queries.is_in_table("flights", {"flight_id": flight_id})]
+        if unknown:
+            messagebox.showerror("Error", f"No such flight(s): {', '.join(unknown)}")
+            return
+
+        if not messagebox.askyesno("Archive flights", f"Move {len(flight_ids)} flight(s) and their bookings to the archive?"):
+            return
+
+        count = archive.archive_flights(flight_ids, db_queries.db_path)
+        messagebox.showinfo("Success", f"{count} flight(s) archived.")
+
+
+class QueryProfile(tk.Frame):
+    """
+    Admin-only page that shows which pages issued which database queries and how long they took.
+    Only reachable when instrumentation is enabled (FLIGHTS_PROFILE=1).
+
+    Methods:
+        __init__(parent, controller): Initializes the query profile page.
+        refresh(): Reloads the query statistics.
+        reset(): Clears the collected statistics.
+        save_to_file(): Writes the statistics to a JSON file chosen by the user.
+    """
+    def __init__(self, parent, controller):
+        super().__init__(parent)
+        self.controller = controller
+
+        # Upper left button frame for navigation
+        button_frame = tk.Frame(self)
+        button_frame.pack(anchor="ne", padx=10, pady=10)
+
+        tk.Button(button_frame, text="Return", command=lambda: controller.show_page(MainMenu)).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Help", command=lambda: controller.show_page(HelpPage)).pack(side="left", padx=5)
+
+        # Page Title
+        tk.Label(self, text="Query Profile", font=("Arial", 16)).pack(pady=10)
+
+        # Buttons to refresh, reset and save the statistics
+        action_frame = tk.Frame(self)
+        action_frame.pack(pady=5)
+        tk.Button(action_frame, text="Refresh", command=self.refresh).pack(side=tk.LEFT, padx=5)
+        tk.Button(action_frame, text="Reset", command=self.reset).pack(side=tk.LEFT, padx=5)
+        tk.Button(action_frame, text="Save to File", command=self.save_to_file).pack(side=tk.LEFT, padx=5)
+
+        # Text box with the report
+        self.report_text = tk.Text(self, height=30, width=100, wrap=tk.NONE)
+        self.report_text.pack(fill="both", expand=True, padx=10, pady=10)
+
+        self.refresh()
+
+    def refresh(self):
+        """
+        Reload the query statistics into the text box.
+        """
+        self.report_text.config(state=tk.NORMAL)
+        self.report_text.delete("1.0", tk.END)
+        self.report_text.insert(tk.END, instrumentation.dump())
+        self.report_text.config(state=tk.DISABLED)
+
+    def reset(self):
+        """
+        Clear the collected statistics.
+        """
+        instrumentation.reset()
+        self.refresh()
+
+    def save_to_file(self):
+        """
+        Write the collected statistics to a JSON file chosen by the user.
+        """
+        file_path = filedialog.asksaveasfilename(
+            initialfile="query_profile.json", defaultextension=".json",
+            filetypes=[("JSON", "*.json"), ("All files", "*")])
+        if not file_path:
+            return
+
+        try:
+            instrumentation.dump_to_file(file_path)
+            messagebox.showinfo("Success", f"Query profile saved to {file_path}")
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save query profile: {e}")
+
+
+class UserSearch(tk.Frame):
+    """
+    Admin-only page to find users by part of their username or name while typing, and to list a
+    user's bookings on all flights. Searches wait until typing pauses and run in a worker thread,
+    so the window stays responsive.
+
+    Methods:
+        __init__(parent, controller): Initializes the user search page.
+        schedule_search(event): Starts the search once typing has paused for DEBOUNCE_MS.
+        search(): Searches users for the entered text.
+        open_user(username): Lists the bookings of a user.
+        run_in_background(function, args, show): Runs a query in a worker thread and shows its result.
+        show_users(users): Displays the users found.
+        show_bookings(username, bookings): Displays the bookings of a user.
+    """
+    # Pause in typing after which the search runs, in milliseconds
+    DEBOUNCE_MS = 300
+    # Interval at which the result of a running query is checked for, in milliseconds
+    RESULT_POLL_MS = 20
+
+    def __init__(self, parent, controller):
+        super().__init__(parent)
+        self.controller = controller
+
+        # Pending debounce timer, and the number of the latest query (results of older ones are dropped)
+        self.search_timer = None
+        self.generation = 0
+
+        # Upper left button frame for navigation
+        button_frame = tk.Frame(self)
+        button_frame.pack(anchor="ne", padx=10, pady=10)
+
+        tk.Button(button_frame, text="Return", command=lambda: controller.show_page(MainMenu)).pack(side="left", padx=5)
+        tk.Button(button_frame, text="Help", command=lambda: controller.show_page(HelpPage)).pack(side="left", padx=5)
+
+        # Page Title
+        tk.Label(self, text="Find Users", font=("Arial", 16)).pack(pady=10)
+
+        # Search field, searched while typing
+        search_frame = tk.Frame(self)
+        search_frame.pack(pady=5)
+        tk.Label(search_frame, text="Username or name:").pack(side=tk.LEFT, padx=5)
+        self.search_entry = tk.Entry(search_frame, width=30)
+        self.search_entry.pack(side=tk.LEFT, padx=5)
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
+
+        # Frame to display the results
+        self.results_frame = tk.Frame(self)
+        self.results_frame.pack(fill="both", expand=True, pady=10)
+
+    def schedule_search(self, event=None):
+        """
+        Restart the debounce timer, so the search runs once typing has paused for DEBOUNCE_MS.
+
+        Args:
+            event (tk.Event): The key event (unused).
+        """
+        if self.search_timer is not None:
+            self.after_cancel(self.search_timer)
+        self.search_timer = self.after(self.DEBOUNCE_MS, self.search)
+
+    def search(self):
+        """
+        Search users whose username or name contains the entered text.
+        """
+        self.search_timer = None
+        self.run_in_background(usersearch.search_users, (self.search_entry.get(),), self.show_users)
+
+    def open_user(self, username):
+        """
+        List the bookings of a user.
+
+        Args:
+            username (str): The username.
+        """
+        self.run_in_background(usersearch.user_bookings, (username,),
+                               lambda bookings: self.show_bookings(username, bookings))
+
+    def run_in_background(self, function, args, show):
+        """
+        Run a query in a worker thread and pass its result to show() in the UI thread, unless a newer
+        query was started in the meantime.
+
+        Args:
+            function (callable): The query, run with its own database connection.
+            args (tuple): Arguments of the query.
+            show (callable): Called with the result.
+        """
+        self.generation += 1
+        generation = self.generation
+        results = queue.Queue()
+
+        def work():
+            try:
+                result = function(*args)
+            except sqlite3.Error as e:
+                result = e
+            finally:
+                # The connection belongs to this thread, which ends here
+                db_queries.close_connection()
+            results.put(result)
+
+        threading.Thread(target=work, daemon=True).start()
+        self.after(self.RESULT_POLL_MS, lambda: self._wait_for_result(generation, results, show))
+
+    def _wait_for_result(self, generation, results, show):
+        try:
+            result = results.get_nowait()
+        except queue.Empty:
+            self.after(self.RESULT_POLL_MS, lambda: self._wait_for_result(generation, results, show))
+            return
+
+        if generation != self.generation:
+            return
+        if isinstance(result, sqlite3.Error):
+            messagebox.showerror("Error", f"Database error: {result}")
+            return
+        show(result)
+
+    def show_users(self, users):
+        """
+        Display the users found, each with a button to list their bookings.
+
+        Args:
+            users (list): (username, name, user_type) tuples.
+        """
+        for widget in self.results_frame.winfo_children():
+            widget.destroy()
+
+        if not self.search_entry.get().strip():
+            return
+        tk.Label(self.results_frame, text=f"{len(users)} user(s) found"
+                                          + (" (refine the search to see more)" if len(users) >= usersearch.SEARCH_LIMIT else "")).pack(pady=5)
+
+        for username, name, user_type in users:
+            row_frame = tk.Frame(self.results_frame)
+            row_frame.pack(pady=1)
+            tk.Label(row_frame, text=f"{username} ({name}, {user_type})").pack(side=tk.LEFT, padx=5)
+            tk.Button(row_frame, text="Bookings", command=lambda u=username: self.open_user(u)).pack(side=tk.LEFT, padx=5)
+
+    def show_bookings(self, username, bookings):
+        """
+        Display the bookings of a user on all flights.
+
+        Args:
+            username (str): The username.
+            bookings (list): (flight, seat_number, aircraft_code) tuples.
+        """
+        for widget in self.results_frame.winfo_children():
+            widget.destroy()
+
+        tk.Label(self.results_frame, text=f"{username}'s Bookings ({len(bookings)})", font=("Arial", 14)).pack(pady=5)
+        tk.Button(self.results_frame, text="Back to Results", command=self.search).pack(pady=5)
+
+        bookings_text = tk.Text(self.results_frame, height=20, width=80)
+        bookings_text.pack(pady=2)
+        for flight, seat_number, aircraft_code in bookings:
+            bookings_text.insert(tk.END, f"Flight ID: {flight} ({aircraft_code}), Seat: {seat_number}\n")
+        bookings_text.config(state=tk.DISABLED)
+
 
 class MyBookings(tk.Frame):
     """
@@ -843,6 +1678,7 @@ class MyBookings(tk.Frame):
         load_bookings(): Loads and displays the user's current bookings.
         show_booking_page(): Navigates back to the flight search interface.
         cancel_booking(booking): Cancels the specified booking.
+        leave_waitlist(flight_id): Takes the user off the waitlist of a flight.
     """
     def __init__(self, parent, controller):
         super().__init__(parent)
@@ -872,7 +1708,7 @@ class MyBookings(tk.Frame):
         username = user_info['username']
 
         # Fetch current bookings for the user
-        current_bookings = db_queries.gimme_tuples("bookings", identifier={"booker": username})
+        current_bookings = db_queries.fetch_records("bookings", {"booker": username})
 
         # Clear the previous booking display
         for widget in self.booking_frame.winfo_children():
@@ -884,9 +1720,7 @@ class MyBookings(tk.Frame):
 
             # Display each booking with an option to cancel
             for booking in current_bookings:
-                flight_id = booking[0]
-                seat_number = booking[1]
-                tk.Label(self.booking_frame, text=f"Flight ID: {flight_id}, Seat: {seat_number}").pack(pady=5)
+                tk.Label(self.booking_frame, text=f"Flight ID: {booking.flight}, Seat: {booking.seat_number}").pack(pady=5)
 
                 # Button to cancel the booking
                 cancel_button = tk.Button(self.booking_frame, text="Cancel Booking", 
@@ -896,6 +1730,16 @@ class MyBookings(tk.Frame):
             # Inform the user if there are no bookings
             tk.Label(self.booking_frame, text="You currently have no bookings.").pack(pady=10)
 
+        # Flights the user is waiting for, with their place in the queue
+        waiting = self.controller.waitlist.waiting(username)
+        if waiting:
+            tk.Label(self.booking_frame, text="Waitlists", font=("Arial", 14)).pack(pady=10)
+            for flight_id in waiting:
+                position = self.controller.waitlist.position(flight_id, username)
+                tk.Label(self.booking_frame, text=f"Flight ID: {flight_id}, Position: {position}").pack(pady=5)
+                tk.Button(self.booking_frame, text="Leave Waitlist",
+                          command=lambda f=flight_id: self.leave_waitlist(f)).pack(pady=5)
+
     def show_booking_page(self):
         """
         Navigate back to the flight search interface to allow the user to book a new flight.
@@ -907,20 +1751,29 @@ class MyBookings(tk.Frame):
         Cancel the specified booking and update the database accordingly.
 
         Args:
-            booking (tuple): A tuple containing booking details (flight_id, seat_number, etc.).
+            booking (records.Booking): The booking to cancel.
         """
-        flight_id = booking[0]
-        seat_number = booking[1]
+        flight_id = booking.flight
+        seat_number = booking.seat_number
+        username = self.controller.get_user_info()["username"]
 
-        # Update the booking in the database to remove the user's booking
-        booking_info = {"flight": flight_id, "seat_number": seat_number}
-        new_booker = {"booker": None}
-        db_queries.update_row("bookings", old_values=booking_info, new_values=new_booker)
+        # Remove the user's booking; the seat goes to the first customer on the flight's waitlist, if any
+        self.controller.waitlist.cancel(flight_id, seat_number, username)
 
         # Notify the user and refresh the bookings list
         messagebox.showinfo("Booking Canceled", f"Your booking for Flight {flight_id}, Seat {seat_number} has been canceled.")
         self.load_bookings()
 
+    def leave_waitlist(self, flight_id):
+        """
+        Take the user off the waitlist of a flight and refresh the list.
+
+        Args:
+            flight_id (str): The ID of the flight.
+        """
+        self.controller.waitlist.leave(flight_id, self.controller.get_user_info()["username"])
+        self.load_bookings()
+
 
 class HelpPage(tk.Frame):
     """
@@ -945,9 +1798,13 @@ class HelpPage(tk.Frame):
         1. [ LOGIN ]: Enter your username and password to access your account.
         2. [ REGISTER ]: Create a user account to use the application, or an admin account for additional features.
         3. [ MAIN MENU ]: After logging in, you can book flights, view your bookings, or access admin features.
+           Use [ FIND FLIGHTS ] to search flights by aircraft and free seats, and [ SUGGEST SEATS ] to find seats together for a group.
+           [ BOOK TRIP ] books seats on several connecting flights at once; if one seat is taken, nothing is booked.
         4. [ MY BOOKINGS ]: Book or cancel seats from your desired flight.
-        5. [ STATS (ADMIN ONLY) ]: View statistics for flights, including seat availability and user details.
-        6. [ MANAGE FLIGHTS (ADMIN ONLY) ]: Add or remove flights and aircraft from the database.
+           If a flight is full, [ JOIN WAITLIST ]: the next cancelled seat is booked for the first customer waiting.
+        5. [ STATS (ADMIN ONLY) ]: View statistics for flights, including seat availability and user details, and a heatmap of the most booked seats per aircraft type.
+        6. [ MANAGE FLIGHTS (ADMIN ONLY) ]: Add flights and aircraft to the database, or move closed flights to the archive.
+           [ FIND USERS (ADMIN ONLY) ]: Type part of a username or name to find users, and list their bookings on all flights.
         7. [ MY ACCOUNT ]: View your account information.
         8. [ HELP ]: Access this page for instructions on how to use the application.
         """
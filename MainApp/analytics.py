@@ -0,0 +1,287 @@
+"""
+Fleet-wide booking analytics on a columnar NumPy snapshot of the bookings table.
+
+stats.py answers questions about one flight with a few SQL queries each. For questions about the
+whole fleet (occupancy of every flight, fill rate per row or per seat letter of an aircraft type,
+the distribution of load factors) a BookingsSnapshot loads bookings once into four parallel arrays,
+one element per seat:
+
+    flight   index into flight_ids
+    row      row number
+    column   position of the seat letter in the aircraft's layout (0 = leftmost seat)
+    booker   rowid of the booker in users, 0 if the booker is not a user, -1 if the seat is free
+
+and computes the statistics with vectorised operations. The arrays are sorted by (flight, row,
+column), so a seat is found with a binary search. refresh() applies booking changes incrementally
+using the change feed of changes.py and only reloads everything when flights were added or removed.
+"""
+
+import numpy as np
+
+import changes
+import instrumentation
+
+# Flights whose bookings are fetched at a time while loading
+LOAD_CHUNK_FLIGHTS = 2000
+
+# Bits of the sort key used for the row and the column of a seat
+ROW_BITS = 10
+COLUMN_BITS = 5
+
+# Returns the seats of a range of flights as two comma separated lists: the flight rowid, row and
+# seat letter packed into one integer, and the booker id. Building the lists in SQLite and parsing
+# them with NumPy avoids creating a Python tuple per seat, which dominates the load time otherwise.
+LOAD_QUERY = """
+SELECT GROUP_CONCAT(seat), GROUP_CONCAT(booker)
+FROM (
+    SELECT (f.rowid << 20)
+           | (CAST(SUBSTR(b.seat_number, 1, LENGTH(b.seat_number) - 1) AS INTEGER) << 7)
+           | UNICODE(SUBSTR(b.seat_number, -1)) AS seat,
+           CASE WHEN b.booker IS NULL THEN -1 ELSE COALESCE(u.rowid, 0) END AS booker
+    FROM flights f
+    CROSS JOIN bookings b ON b.flight = f.flight_id
+    LEFT JOIN users u ON u.username = b.booker
+    WHERE f.rowid BETWEEN ? AND ?
+);
+"""
+
+CHANGES_QUERY = """
+SELECT CAST(SUBSTR(s.seat_number, 1, LENGTH(s.seat_number) - 1) AS INTEGER),
+       UNICODE(SUBSTR(s.seat_number, -1)),
+       CASE WHEN b.booker IS NULL THEN -1 ELSE COALESCE(u.rowid, 0) END
+FROM seat_versions s
+JOIN bookings b ON b.flight = s.flight_id AND b.seat_number = s.seat_number
+LEFT JOIN users u ON u.username = b.booker
+WHERE s.flight_id = ? AND s.version > ?;
+"""
+
+
+class BookingsSnapshot:
+    """
+    Columnar in-memory copy of the bookings table with fleet-wide statistics.
+
+    Methods:
+        __init__(db_path): Loads the snapshot.
+        reload(): Loads all bookings again.
+        refresh(): Applies booking changes made since the last load or refresh.
+        flight_occupancy(): Returns seats and booked seats of every flight.
+        load_factor_histogram(bins): Returns the distribution of load factors over all flights.
+        row_fill_rates(aircraft_code): Returns the share of booked seats per row of an aircraft type.
+        column_fill_rates(aircraft_code): Returns the share of booked seats per seat letter of an aircraft type.
+        summary(): Returns fleet and per-aircraft totals.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        # The change feed's tables and triggers are created once here, not on every reload
+        conn = instrumentation.connect(db_path)
+        try:
+            changes.ensure_schema(conn)
+        finally:
+            conn.close()
+        self.reload()
+
+    def reload(self):
+        """
+        Load the whole bookings table. Reads happen in one transaction, so the snapshot is consistent.
+        """
+        conn = instrumentation.connect(self.db_path)
+        try:
+            conn.execute("BEGIN;")
+
+            aircrafts = conn.execute("SELECT code, layout FROM aircrafts ORDER BY code;").fetchall()
+            self.aircraft_codes = [code for code, _ in aircrafts]
+            self.aircraft_columns = [layout.replace("|", "").replace(" ", "") for _, layout in aircrafts]
+            aircraft_index = {code: i for i, code in enumerate(self.aircraft_codes)}
+
+            # Position of each seat letter in each aircraft's layout, indexed by [aircraft, unicode]
+            self._letter_position = np.full((len(aircrafts), 128), -1, dtype=np.int8)
+            for i, columns in enumerate(self.aircraft_columns):
+                for position, letter in enumerate(columns):
+                    self._letter_position[i, ord(letter)] = position
+
+            flights = conn.execute("SELECT rowid, flight_id, aircraft_code FROM flights ORDER BY rowid;").fetchall()
+            self._flight_rowids = np.array([rowid for rowid, _, _ in flights], dtype=np.int64)
+            self.flight_ids = [str(flight_id) for _, flight_id, _ in flights]
+            self.flight_aircraft = np.array([aircraft_index.get(code, -1) for _, _, code in flights], dtype=np.int16)
+            self._flight_index = {flight_id: i for i, flight_id in enumerate(self.flight_ids)}
+
+            parts = []
+            for start in range(0, len(flights), LOAD_CHUNK_FLIGHTS):
+                first, last = self._flight_rowids[start], self._flight_rowids[min(start + LOAD_CHUNK_FLIGHTS, len(flights)) - 1]
+                seats, bookers = conn.execute(LOAD_QUERY, (int(first), int(last))).fetchone()
+                if not seats:
+                    continue
+                packed = np.fromstring(seats, dtype=np.int64, sep=",")
+                flight = np.searchsorted(self._flight_rowids, packed >> 20).astype(np.int32)
+                aircraft = self.flight_aircraft[flight]
+                column = np.where(aircraft >= 0, self._letter_position[aircraft, packed & 127], -1).astype(np.int8)
+                parts.append((flight, ((packed >> 7) & 0x1FFF).astype(np.int16), column,
+                              np.fromstring(bookers, dtype=np.int64, sep=",").astype(np.int32)))
+
+            self.versions = dict(conn.execute("SELECT flight_id, version FROM flight_versions;"))
+            self._signature = self._read_signature(conn)
+            conn.commit()
+        finally:
+            conn.close()
+
+        if parts:
+            flight, row, column, booker = (np.concatenate(arrays) for arrays in zip(*parts))
+        else:
+            flight, row, column, booker = (np.empty(0, dtype=dtype) for dtype in (np.int32, np.int16, np.int8, np.int32))
+
+        key = self._key(flight, row, column)
+        order = np.argsort(key, kind="stable")
+        self.flight, self.row, self.column, self.booker = flight[order], row[order], column[order], booker[order]
+        self._keys = key[order]
+
+    def refresh(self):
+        """
+        Bring the snapshot up to date. Booking changes are applied to the arrays in place; if flights
+        or bookings rows were added or removed, everything is reloaded.
+
+        :return: "unchanged", "incremental" or "reloaded".
+        """
+        conn = instrumentation.connect(self.db_path)
+        try:
+            conn.execute("BEGIN;")
+            if self._read_signature(conn) != self._signature:
+                conn.commit()
+                conn.close()
+                conn = None
+                self.reload()
+                return "reloaded"
+
+            changed = [(flight_id, version) for flight_id, version in conn.execute("SELECT flight_id, version FROM flight_versions;")
+                       if version > self.versions.get(flight_id, 0)]
+            for flight_id, version in changed:
+                index = self._flight_index.get(flight_id)
+                if index is None:
+                    # Bookings of a flight that is not in the flights table are not part of the snapshot
+                    self.versions[flight_id] = version
+                    continue
+                aircraft = self.flight_aircraft[index]
+                rows = conn.execute(CHANGES_QUERY, (flight_id, self.versions.get(flight_id, 0))).fetchall()
+                if rows and aircraft >= 0:
+                    seats = np.array(rows, dtype=np.int64)
+                    column = self._letter_position[aircraft, seats[:, 1] & 127]
+                    keys = self._key(index, seats[:, 0], column)
+                    positions = np.minimum(np.searchsorted(self._keys, keys), len(self._keys) - 1)
+                    found = self._keys[positions] == keys
+                    self.booker[positions[found]] = seats[found, 2]
+                self.versions[flight_id] = version
+            conn.commit()
+        finally:
+            if conn is not None:
+                conn.close()
+        return "incremental" if changed else "unchanged"
+
+    def flight_occupancy(self):
+        """
+        Returns the number of seats and of booked seats of every flight.
+
+        :return: Tuple (flight_ids, seats, booked) with NumPy arrays in the order of flight_ids.
+        """
+        count = len(self.flight_ids)
+        seats = np.bincount(self.flight, minlength=count)
+        booked = np.bincount(self.flight, weights=self.booker >= 0, minlength=count).astype(np.int64)
+        return self.flight_ids, seats, booked
+
+    def load_factor_histogram(self, bins=10):
+        """
+        Returns the distribution of load factors (booked seats / seats) over all flights with seats.
+
+        :param bins: Number of equally wide bins between 0 and 1.
+        :return: Tuple (counts, bin_edges) as returned by numpy.histogram.
+        """
+        _, seats, booked = self.flight_occupancy()
+        has_seats = seats > 0
+        return np.histogram(booked[has_seats] / seats[has_seats], bins=bins, range=(0.0, 1.0))
+
+    def row_fill_rates(self, aircraft_code):
+        """
+        Returns the share of booked seats in each row over all flights of an aircraft type.
+
+        :return: NumPy array, element i is the fill rate of row i + 1 (NaN for rows without seats).
+        """
+        mask = self._aircraft_mask(aircraft_code)
+        return self._fill_rates(self.row[mask].astype(np.int64) - 1, self.booker[mask] >= 0)
+
+    def column_fill_rates(self, aircraft_code):
+        """
+        Returns the share of booked seats for each seat letter over all flights of an aircraft type.
+
+        :return: Dictionary seat letter -> fill rate.
+        """
+        mask = self._aircraft_mask(aircraft_code) & (self.column >= 0)
+        rates = self._fill_rates(self.column[mask].astype(np.int64), self.booker[mask] >= 0)
+        columns = self.aircraft_columns[self.aircraft_codes.index(aircraft_code)]
+        return {letter: float(rates[i]) if i < len(rates) else float("nan") for i, letter in enumerate(columns)}
+
+    def summary(self):
+        """
+        Returns fleet-wide and per-aircraft totals.
+
+        :return: Dictionary with "flights", "seats", "booked", "load_factor" and "aircrafts"
+                 (aircraft code -> dictionary with the same keys except "aircrafts").
+        """
+        _, seats, booked = self.flight_occupancy()
+        count = len(self.aircraft_codes)
+        aircraft = self.flight_aircraft.astype(np.int64)
+        known = aircraft >= 0
+        flights_per_aircraft = np.bincount(aircraft[known], minlength=count)
+        seats_per_aircraft = np.bincount(aircraft[known], weights=seats[known], minlength=count)
+        booked_per_aircraft = np.bincount(aircraft[known], weights=booked[known], minlength=count)
+
+        def totals(flights, seats, booked):
+            return {"flights": int(flights), "seats": int(seats), "booked": int(booked),
+                    "load_factor": float(booked / seats) if seats else 0.0}
+
+        result = totals(len(self.flight_ids), seats.sum(), booked.sum())
+        result["aircrafts"] = {code: totals(flights_per_aircraft[i], seats_per_aircraft[i], booked_per_aircraft[i])
+                               for i, code in enumerate(self.aircraft_codes)}
+        return result
+
+    def _aircraft_mask(self, aircraft_code):
+        """
+        Boolean mask of the seats that belong to flights of an aircraft type.
+
+        :raises ValueError: If the aircraft code is unknown.
+        """
+        if aircraft_code not in self.aircraft_codes:
+            raise ValueError(f"Unknown aircraft code '{aircraft_code}'.")
+        return self.flight_aircraft[self.flight] == self.aircraft_codes.index(aircraft_code)
+
+    @staticmethod
+    def _fill_rates(groups, booked):
+        """
+        Share of booked seats per group number.
+        """
+        if len(groups) == 0:
+            return np.empty(0)
+        seats = np.bincount(groups)
+        taken = np.bincount(groups, weights=booked, minlength=len(seats))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return taken / seats
+
+    @staticmethod
+    def _key(flight, row, column):
+        """
+        Sort key of a seat: flight, then row, then column. Seat letters missing from the layout
+        (column -1) sort after the others of their row.
+        """
+        flight = np.asarray(flight, dtype=np.int64)
+        row = np.asarray(row, dtype=np.int64)
+        column = np.asarray(column, dtype=np.int64) & ((1 << COLUMN_BITS) - 1)
+        return (flight << (ROW_BITS + COLUMN_BITS)) | (row << COLUMN_BITS) | column
+
+    @staticmethod
+    def _read_signature(conn):
+        """
+        Cheap fingerprint of the set of flights and bookings rows; it changes when rows are added or removed.
+        The counts catch removals that leave the largest rowid in place. MAX(rowid) is read in its own
+        query, where SQLite looks it up instead of scanning.
+        """
+        flights = conn.execute("SELECT COUNT(*), MAX(rowid) FROM flights;").fetchone()
+        bookings = conn.execute("SELECT COUNT(*) FROM bookings;").fetchone()
+        last_booking = conn.execute("SELECT MAX(rowid) FROM bookings;").fetchone()
+        return flights + bookings + last_booking
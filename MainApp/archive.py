@@ -0,0 +1,193 @@
+"""
+Archive of closed flights.
+
+Every flight keeps a full seat grid in bookings, so the table only ever grows. archive_flights()
+moves closed flights and their bookings to a separate SQLite file (by default flights_archive.sqlite
+next to the database), a chunk of flights per transaction, and records them in the archived_flights
+table of the main database. Both databases are attached to the same connection, so each chunk is
+moved atomically.
+
+Reads that should include archived flights use connect(), which attaches the archive and shadows
+flights and bookings with temporary views over both databases. Queries written against the normal
+tables (stats.py, db_queries.gimme_tuples) then see archived flights without any change. Such
+connections are read-only for those two tables.
+"""
+
+import os
+import sqlite3
+import time
+
+import instrumentation
+
+# Flights moved per transaction
+ARCHIVE_CHUNK_SIZE = 200
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS archived_flights (
+        flight_id TEXT PRIMARY KEY,
+        aircraft_code TEXT NOT NULL,
+        archived_at REAL NOT NULL,
+        total_seats INTEGER NOT NULL,
+        reserved_seats INTEGER NOT NULL
+    );
+    """,
+]
+
+# Same tables as in the main database, created in the archive file
+ARCHIVE_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS archive.flights (
+        flight_id TEXT PRIMARY KEY,
+        aircraft_code TEXT NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS archive.bookings (
+        flight INTEGER NOT NULL,
+        seat_number TEXT NOT NULL,
+        booker TEXT,
+        PRIMARY KEY (flight, seat_number)
+    );
+    """,
+]
+
+VIEWS = [
+    """
+    CREATE TEMP VIEW flights AS
+    SELECT flight_id, aircraft_code FROM main.flights
+    UNION ALL
+    SELECT flight_id, aircraft_code FROM archive.flights;
+    """,
+    """
+    CREATE TEMP VIEW bookings AS
+    SELECT flight, seat_number, booker FROM main.bookings
+    UNION ALL
+    SELECT flight, seat_number, booker FROM archive.bookings;
+    """,
+]
+
+
+def archive_path_for(db_path):
+    """
+    Returns the default archive file of a database: <name>_archive.sqlite in the same folder.
+    """
+    root, ext = os.path.splitext(db_path)
+    return f"{root}_archive{ext or '.sqlite'}"
+
+
+def ensure_schema(conn):
+    """
+    Creates the archived_flights table if it does not exist yet.
+
+    :param conn: An open connection to the main database.
+    """
+    with conn:
+        for sql in SCHEMA:
+            conn.execute(sql)
+
+
+def is_archived(conn, flight_id):
+    """
+    Returns True if a flight was moved to the archive.
+
+    :param conn: An open connection to the main database.
+    :param flight_id: The ID of the flight.
+    """
+    try:
+        row = conn.execute("SELECT 1 FROM archived_flights WHERE flight_id = ?;", (str(flight_id),)).fetchone()
+    except sqlite3.OperationalError:
+        return False
+    return row is not None
+
+
+def connect(db_path, archive_path=None, **kwargs):
+    """
+    Open a connection on which flights and bookings include the archived flights.
+    If there is no archive (yet), or db_path is not a file, a normal connection is returned.
+
+    :param db_path: Path to the main database.
+    :param archive_path: Path to the archive (default: archive_path_for(db_path)).
+    :param kwargs: Passed on to sqlite3.connect.
+    """
+    conn = instrumentation.connect(db_path, **kwargs)
+    if db_path.startswith("file:"):
+        return conn
+
+    archive_path = archive_path or archive_path_for(db_path)
+    if not os.path.exists(archive_path):
+        return conn
+
+    conn.execute("ATTACH DATABASE ? AS archive;", (archive_path,))
+    for sql in VIEWS:
+        conn.execute(sql)
+    return conn
+
+
+def archive_flights(flight_ids, db_path, archive_path=None, chunk_size=ARCHIVE_CHUNK_SIZE, progress=None):
+    """
+    Move flights and their bookings from the main database to the archive.
+    Flights that do not exist (or were archived before) are skipped.
+
+    :param flight_ids: IDs of the flights to archive.
+    :param db_path: Path to the main database.
+    :param archive_path: Path to the archive (default: archive_path_for(db_path)); created if needed.
+    :param chunk_size: Number of flights moved per transaction.
+    :param progress: Optional callback called as progress(done, total) after every chunk.
+    :return: Number of flights archived.
+    """
+    flight_ids = [str(flight_id) for flight_id in dict.fromkeys(flight_ids)]
+    archive_path = archive_path or archive_path_for(db_path)
+
+    conn = instrumentation.connect(db_path)
+    try:
+        ensure_schema(conn)
+        conn.execute("ATTACH DATABASE ? AS archive;", (archive_path,))
+        with conn:
+            for sql in ARCHIVE_SCHEMA:
+                conn.execute(sql)
+        # Holds and waitlist entries of archived flights are dropped; their tables may not exist yet
+        flight_tables = [row[0] for row in conn.execute(
+            "SELECT name FROM main.sqlite_master WHERE type = 'table' AND name IN ('seat_holds', 'waitlist');")]
+
+        archived = 0
+        for start in range(0, len(flight_ids), chunk_size):
+            chunk = flight_ids[start:start + chunk_size]
+            archived += _archive_chunk(conn, chunk, flight_tables)
+            if progress:
+                progress(min(start + chunk_size, len(flight_ids)), len(flight_ids))
+        return archived
+    finally:
+        conn.close()
+
+
+def _archive_chunk(conn, flight_ids, flight_tables):
+    """
+    Moves one chunk of flights in a single transaction. Returns the number of flights moved.
+    """
+    placeholders = ", ".join(["?"] * len(flight_ids))
+    conn.execute("BEGIN IMMEDIATE;")
+    try:
+        moved = conn.execute(f"""
+        INSERT INTO archived_flights (flight_id, aircraft_code, archived_at, total_seats, reserved_seats)
+        SELECT f.flight_id, f.aircraft_code, ?,
+               (SELECT COUNT(*) FROM main.bookings b WHERE b.flight = f.flight_id),
+               (SELECT COUNT(*) FROM main.bookings b WHERE b.flight = f.flight_id AND b.booker IS NOT NULL)
+        FROM main.flights f
+        WHERE f.flight_id IN ({placeholders});
+        """, (time.time(), *flight_ids)).rowcount
+
+        conn.execute(f"INSERT OR REPLACE INTO archive.flights SELECT flight_id, aircraft_code FROM main.flights "
+                     f"WHERE flight_id IN ({placeholders});", flight_ids)
+        conn.execute(f"INSERT OR REPLACE INTO archive.bookings SELECT flight, seat_number, booker FROM main.bookings "
+                     f"WHERE flight IN ({placeholders});", flight_ids)
+
+        conn.execute(f"DELETE FROM main.bookings WHERE flight IN ({placeholders});", flight_ids)
+        conn.execute(f"DELETE FROM main.flights WHERE flight_id IN ({placeholders});", flight_ids)
+        for table in flight_tables:
+            conn.execute(f"DELETE FROM main.{table} WHERE flight_id IN ({placeholders});", flight_ids)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return moved
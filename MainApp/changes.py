@@ -0,0 +1,160 @@
+"""
+Change feed for seat maps.
+
+Triggers keep a bookings version per flight (flight_versions) that goes up by one on every change
+of a seat's booker, and remember for each changed seat the flight version it was last changed at
+(seat_versions). A SeatMapWatcher polls PRAGMA data_version, which only changes when another
+connection (or process) commits, so idle polls cost no table reads. When it changes, the watcher
+compares the versions of the subscribed flights and fetches only the seats changed since the
+version the subscriber has seen.
+"""
+
+import instrumentation
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS flight_versions (
+        flight_id TEXT PRIMARY KEY,
+        version INTEGER NOT NULL
+    );
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS seat_versions (
+        flight_id TEXT NOT NULL,
+        seat_number TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        PRIMARY KEY (flight_id, seat_number)
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS seat_versions_version ON seat_versions (flight_id, version);",
+    """
+    CREATE TRIGGER IF NOT EXISTS seat_versions_update AFTER UPDATE OF booker ON bookings
+    WHEN OLD.booker IS NOT NEW.booker
+    BEGIN
+        INSERT INTO flight_versions (flight_id, version) VALUES (CAST(NEW.flight AS TEXT), 1)
+        ON CONFLICT (flight_id) DO UPDATE SET version = version + 1;
+        INSERT INTO seat_versions (flight_id, seat_number, version)
+        VALUES (CAST(NEW.flight AS TEXT), NEW.seat_number,
+                (SELECT version FROM flight_versions WHERE flight_id = CAST(NEW.flight AS TEXT)))
+        ON CONFLICT (flight_id, seat_number) DO UPDATE SET version = excluded.version;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS seat_versions_flight_delete AFTER DELETE ON flights
+    BEGIN
+        DELETE FROM seat_versions WHERE flight_id = OLD.flight_id;
+        DELETE FROM flight_versions WHERE flight_id = OLD.flight_id;
+    END;
+    """,
+]
+
+
+def ensure_schema(conn):
+    """
+    Creates the version tables and triggers if they do not exist yet.
+
+    :param conn: An open connection to the database.
+    """
+    with conn:
+        for sql in SCHEMA:
+            conn.execute(sql)
+
+
+def flight_version(conn, flight_id):
+    """
+    Returns the bookings version of a flight (0 if its bookings never changed).
+    """
+    row = conn.execute("SELECT version FROM flight_versions WHERE flight_id = ?;", (str(flight_id),)).fetchone()
+    return row[0] if row else 0
+
+
+def changed_seats(conn, flight_id, since):
+    """
+    Returns the seats of a flight changed after a given version.
+
+    :param conn: An open connection to the database.
+    :param flight_id: The ID of the flight.
+    :param since: The last version the caller has seen.
+    :return: Dictionary seat number -> current booker (None if the seat is free).
+    """
+    rows = conn.execute("""
+    SELECT s.seat_number, b.booker
+    FROM seat_versions s JOIN bookings b ON b.flight = s.flight_id AND b.seat_number = s.seat_number
+    WHERE s.flight_id = ? AND s.version > ?;
+    """, (str(flight_id), since)).fetchall()
+    return dict(rows)
+
+
+class SeatMapWatcher:
+    """
+    Notifies subscribers about seats that changed on the flights they show.
+
+    Methods:
+        __init__(db_path): Opens the watcher's own connection and creates the version tables.
+        subscribe(key, flight_id, callback): Starts watching a flight; returns its current version.
+        unsubscribe(key): Stops a subscription.
+        poll(): Checks for changes and calls the callbacks of changed flights.
+        close(): Closes the connection.
+    """
+    def __init__(self, db_path):
+        # A separate connection is needed: PRAGMA data_version ignores commits made on the same connection
+        self.conn = instrumentation.connect(db_path)
+        ensure_schema(self.conn)
+        self.data_version = self._data_version()
+
+        # key -> [flight_id, last seen version, callback]
+        self.subscriptions = {}
+
+    def subscribe(self, key, flight_id, callback):
+        """
+        Start watching a flight. A previous subscription with the same key is replaced.
+        Read the seat map after subscribing, so no change can be missed in between.
+
+        :param key: Identifies the subscriber, e.g. the page name.
+        :param flight_id: The ID of the flight.
+        :param callback: Called as callback(flight_id, changes) with changes as returned by changed_seats.
+        :return: The current version of the flight.
+        """
+        version = flight_version(self.conn, flight_id)
+        self.subscriptions[key] = [flight_id, version, callback]
+        return version
+
+    def unsubscribe(self, key):
+        """
+        Stop a subscription.
+        """
+        self.subscriptions.pop(key, None)
+
+    def poll(self):
+        """
+        Check for changes and call the callbacks of subscriptions whose flight changed.
+
+        :return: Number of callbacks called.
+        """
+        if not self.subscriptions:
+            return 0
+
+        data_version = self._data_version()
+        if data_version == self.data_version:
+            return 0
+        self.data_version = data_version
+
+        notified = 0
+        for subscription in list(self.subscriptions.values()):
+            flight_id, seen, callback = subscription
+            version = flight_version(self.conn, flight_id)
+            if version > seen:
+                changes = changed_seats(self.conn, flight_id, seen)
+                subscription[1] = version
+                callback(flight_id, changes)
+                notified += 1
+        return notified
+
+    def close(self):
+        """
+        Close the watcher's connection.
+        """
+        self.conn.close()
+
+    def _data_version(self):
+        return self.conn.execute("PRAGMA data_version;").fetchone()[0]
@@ -1,33 +1,220 @@
-import sqlite3
 import os
+import threading
+from functools import lru_cache
+
+import archive
+import instrumentation
+import records
+import seating
 
 # Get the absolute path to the current directory
 current_dir = os.path.abspath(os.path.dirname(__file__))
 db_path = os.path.join(current_dir, 'flights.sqlite')
 
-def gimme_tuples(table, columns='*', identifier=None):
+# Size of sqlite3's per-connection statement cache. The builders below produce one SQL string
+# per (table, columns, keys) shape, and the app uses a few dozen shapes, so this leaves plenty of room.
+CACHED_STATEMENTS = 256
+
+# One connection per thread, reused across calls so the statement cache actually gets hits
+_local = threading.local()
+
+# Table name -> tuple of column names, read from the database on first use
+_schema = {}
+
+
+def get_connection():
+    """
+    Returns the calling thread's connection to the database, opening it if needed.
+
+    The connection is reopened if db_path was changed since it was opened.
+    """
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != db_path:
+        if conn is not None:
+            conn.close()
+        conn = instrumentation.connect(db_path, cached_statements=CACHED_STATEMENTS)
+        _local.conn = conn
+        _local.path = db_path
+    return conn
+
+
+def get_archive_connection():
+    """
+    Returns the calling thread's read connection on which flights and bookings include archived
+    flights (see archive.connect), opening it if needed.
+    """
+    conn = getattr(_local, "archive_conn", None)
+    # Also reopen once the archive file was created, so the connection attaches it
+    if (conn is None or _local.archive_path != db_path
+            or (not _local.archive_attached and os.path.exists(archive.archive_path_for(db_path)))):
+        if conn is not None:
+            conn.close()
+        conn = archive.connect(db_path, cached_statements=CACHED_STATEMENTS)
+        _local.archive_conn = conn
+        _local.archive_path = db_path
+        _local.archive_attached = os.path.exists(archive.archive_path_for(db_path))
+    return conn
+
+
+def close_connection():
+    """
+    Closes the calling thread's connections, if it has any.
+    """
+    for name in ("conn", "archive_conn"):
+        conn = getattr(_local, name, None)
+        if conn is not None:
+            conn.close()
+            setattr(_local, name, None)
+
+
+def table_columns(table):
+    """
+    Returns the column names of a table, reading the schema from the database if necessary.
+
+    :param table: The name of the table.
+    :raises ValueError: If the table does not exist.
+    """
+    key = (db_path, table)
+    if key not in _schema:
+        conn = get_connection()
+        names = [row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table';")]
+        if table not in names:
+            raise ValueError(f"Unknown table '{table}'.")
+        # PRAGMA does not accept parameters, but the name was just checked against sqlite_master
+        _schema[key] = tuple(row[1] for row in conn.execute(f"PRAGMA table_info({table});"))
+    return _schema[key]
+
+
+def _check_columns(table, columns):
+    """
+    Raises ValueError if any of the columns does not belong to the table.
+    """
+    known = table_columns(table)
+    for col in columns:
+        if col not in known:
+            raise ValueError(f"Unknown column '{col}' in table '{table}'.")
+
+
+@lru_cache(maxsize=CACHED_STATEMENTS)
+def select_sql(table, columns, keys):
+    """
+    Builds a SELECT statement.
+
+    :param table: The name of the table.
+    :param columns: Tuple of columns to select, or ('*',) for all columns.
+    :param keys: Tuple of columns for the WHERE clause (may be empty).
+    """
+    if columns != ("*",):
+        _check_columns(table, columns)
+    _check_columns(table, keys)
+
+    query = f"SELECT {', '.join(columns)} FROM {table}"
+    if keys:
+        query += " WHERE " + " AND ".join(f"{col} = ?" for col in keys)
+    return query + ";"
+
+
+@lru_cache(maxsize=CACHED_STATEMENTS)
+def exists_sql(table, keys):
+    """
+    Builds a statement that selects 1 if a matching row exists.
+    """
+    _check_columns(table, keys)
+    where_clause = " AND ".join(f"{col} = ?" for col in keys)
+    return f"SELECT 1 FROM {table} WHERE {where_clause} LIMIT 1;"
+
+
+@lru_cache(maxsize=CACHED_STATEMENTS)
+def update_sql(table, set_keys, where_keys):
+    """
+    Builds an UPDATE statement. Parameters go SET values first, then WHERE values.
+    """
+    _check_columns(table, set_keys + where_keys)
+    set_clause = ", ".join(f"{col} = ?" for col in set_keys)
+    where_clause = " AND ".join(f"{col} = ?" for col in where_keys)
+    return f"UPDATE {table} SET {set_clause} WHERE {where_clause};"
+
+
+@lru_cache(maxsize=CACHED_STATEMENTS)
+def insert_sql(table, keys):
+    """
+    Builds an INSERT statement.
+    """
+    _check_columns(table, keys)
+    placeholders = ", ".join(["?"] * len(keys))
+    return f"INSERT INTO {table} ({', '.join(keys)}) VALUES ({placeholders});"
+
+
+@lru_cache(maxsize=CACHED_STATEMENTS)
+def delete_sql(table, keys):
+    """
+    Builds a DELETE statement.
+    """
+    _check_columns(table, keys)
+    where_clause = " AND ".join(f"{col} = ?" for col in keys)
+    return f"DELETE FROM {table} WHERE {where_clause};"
+
+
+def gimme_tuples(table, columns='*', identifier=None, include_archive=False):
     """
     Requests all rows from a table in the database.
-    
+
     :param table: The name of the table to query.
     :param columns='*': The columns to select from the table. Default is all columns.
     :param identifier=None: A dictionary with the column names and values to filter the rows.
+    :param include_archive=False: Also return rows of archived flights (flights and bookings only).
+    """
+    columns = tuple(col.strip() for col in columns.split(","))
+    identifier = identifier or {}
+
+    query = select_sql(table, columns, tuple(identifier.keys()))
+    conn = get_archive_connection() if include_archive else get_connection()
+    cursor = conn.execute(query, tuple(identifier.values()))
+    return cursor.fetchall()
+
+def fetch_records(table, identifier=None, include_archive=False):
+    """
+    Requests rows from one of the main tables as typed records (see records.py).
+
+    :param table: flights, aircrafts, bookings or users.
+    :param identifier=None: A dictionary with the column names and values to filter the rows.
+    :param include_archive=False: Also return rows of archived flights (flights and bookings only).
+    :return: List of records, e.g. Booking(flight, seat_number, booker).
+    :raises ValueError: If the table has no record type.
     """
-    
-    conn = sqlite3.connect(db_path)
+    if table not in records.TABLES:
+        raise ValueError(f"No record type for table '{table}'.")
+    identifier = identifier or {}
+
+    query = select_sql(table, records.TABLES[table]._fields, tuple(identifier.keys()))
+    conn = get_archive_connection() if include_archive else get_connection()
+    # Set on this cursor only, other users of the connection keep getting plain tuples
     cursor = conn.cursor()
-    
-    if identifier is not None:
-        where_clause = "AND ".join([f"{col} = ?" for col in identifier.keys()])
-        query = f"SELECT {columns} FROM {table} WHERE {where_clause};"
-        cursor.execute(query, tuple(identifier.values()))
-    else:
-        query = f"SELECT {columns} FROM {table};"
-        cursor.execute(query)
-    rows = cursor.fetchall()
-    conn.close()
-
-    return rows
+    cursor.row_factory = records.FACTORIES[table]
+    return cursor.execute(query, tuple(identifier.values())).fetchall()
+
+def fetch_record(table, identifier):
+    """
+    Requests the first row matching identifier as a typed record, or None if there is none.
+    """
+    rows = fetch_records(table, identifier)
+    return rows[0] if rows else None
+
+def fetch_column(table, column, identifier=None, include_archive=False):
+    """
+    Requests the values of a single column, without fetching the rest of the rows.
+
+    :param table: The name of the table to query.
+    :param column: The column to select.
+    :param identifier=None: A dictionary with the column names and values to filter the rows.
+    :param include_archive=False: Also return rows of archived flights (flights and bookings only).
+    :return: List of values.
+    """
+    identifier = identifier or {}
+
+    query = select_sql(table, (column,), tuple(identifier.keys()))
+    conn = get_archive_connection() if include_archive else get_connection()
+    return [row[0] for row in conn.execute(query, tuple(identifier.values()))]
 
 def is_in_table(table, values):
     """
@@ -37,95 +224,74 @@ def is_in_table(table, values):
     :param table: The name of the table to check.
     :return: True if the row exists, False otherwise.
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # Construct the WHERE clause
-    where_clause = " AND ".join([f"{col} = ?" for col in values.keys()])
-    query = f"SELECT 1 FROM {table} WHERE {where_clause} LIMIT 1;"
-
-    # Execute the query with the values
-    cursor.execute(query, tuple(values.values()))
-    result = cursor.fetchone()
-
-    conn.close()
-
+    query = exists_sql(table, tuple(values.keys()))
+    result = get_connection().execute(query, tuple(values.values())).fetchone()
     return result is not None
 
 def update_row(table, old_values, new_values):
-    
-    if old_values is not None and new_values is not None:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
 
-        where_clause = "AND ".join([f"{col} = ?" for col in old_values.keys()])
-        set_clause = ", ".join([f"{col} = ?" for col in new_values.keys()])
+    if old_values is not None and new_values is not None:
+        query = update_sql(table, tuple(new_values.keys()), tuple(old_values.keys()))
 
         # Combine parameters: SET values first, THEN WHERE values
-        params = tuple(list(new_values.values()) + list(old_values.values()))
-
-        # Build the query
-        query = f"UPDATE {table} SET {set_clause} WHERE {where_clause};"
+        params = tuple(new_values.values()) + tuple(old_values.values())
 
-        cursor.execute(query, params)
-        conn.commit()
-        conn.close()
+        conn = get_connection()
+        with conn:
+            conn.execute(query, params)
         return True
     return False
 
 def insert_row(table, values):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    columns = ', '.join(values.keys())
-    placeholders = ', '.join(['?'] * len(values))
+    query = insert_sql(table, tuple(values.keys()))
 
-    query = f"INSERT INTO {table} ({columns}) VALUES ({placeholders});"
-
-    cursor.execute(query, tuple(values.values()))
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with conn:
+        conn.execute(query, tuple(values.values()))
 
 def delete_row(table, values):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    where_clause = " AND ".join([f"{col} = ?" for col in values.keys()])
-    query = f"DELETE FROM {table} WHERE {where_clause};"
+    query = delete_sql(table, tuple(values.keys()))
 
-    cursor.execute(query, tuple(values.values()))
-    conn.commit()
-    conn.close()
+    conn = get_connection()
+    with conn:
+        conn.execute(query, tuple(values.values()))
 
 def add_rows_to_bookings(flight_id, aircraft_code):
     """
     Ad hoc function to add rows to the bookings table based on the aircraft layout.
     """
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
+    conn = get_connection()
 
-    bookings_data = []
-
-    query = f"SELECT layout, row_number FROM aircrafts WHERE code = '{aircraft_code}';"
-    cursor.execute(query)
-    aircraft = cursor.fetchone()
+    aircraft = conn.execute("SELECT layout, row_number FROM aircrafts WHERE code = ?;", (aircraft_code,)).fetchone()
 
     layout, row_number = aircraft
-    layout = layout.replace("|", "")
-    layout = layout.replace(" ", "")
+    bookings_data = [(flight_id, seat_number, None) for seat_number in seating.seat_labels(layout, row_number)]
+
+    with conn:
+        conn.executemany(insert_sql("bookings", ("flight", "seat_number", "booker")), bookings_data)
 
-    for a in layout:
-        for i in range(1, row_number+1):
-            bookings_data.append((flight_id, f"{i}{a}", None))
+def suggest_seats(flight_id, party_size, unavailable=()):
+    """
+    Suggests a block of adjacent free seats in one row and aisle segment for a group.
 
-    insert_sql = """
-    INSERT INTO bookings (flight, seat_number, booker)
-    VALUES (?, ?, ?);
+    :param flight_id: The ID of the flight.
+    :param party_size: The number of seats needed.
+    :param unavailable: Seat numbers that are not booked but cannot be suggested either (e.g. seats
+                        held by other users).
+    :return: List of seat numbers, or None if the flight does not exist or no such block is free.
     """
+    conn = get_connection()
 
-    for booking in bookings_data:
-        cursor.execute(insert_sql, booking)
+    aircraft = conn.execute(
+        "SELECT a.layout, a.row_number FROM flights f JOIN aircrafts a ON a.code = f.aircraft_code WHERE f.flight_id = ?;",
+        (str(flight_id),)).fetchone()
+    if aircraft is None:
+        return None
+
+    layout, row_number = aircraft
+    booked = conn.execute("SELECT seat_number FROM bookings WHERE flight = ? AND booker IS NOT NULL;", (flight_id,))
+    taken = [row[0] for row in booked]
+    taken.extend(unavailable)
+    masks = seating.occupancy_masks(layout, row_number, taken)
 
-    conn.commit()
-    conn.close()
+    return seating.recommend_seats(layout, masks, party_size)
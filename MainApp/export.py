@@ -0,0 +1,244 @@
+"""
+Streaming export of flight statistics.
+
+The statistics of one, several or all flights are written one flight at a time, reading the
+bookings with fetchmany, so memory use does not grow with the size of the fleet (names and user
+types of bookers are cached for at most USER_CACHE_SIZE users). Flights without seats are exported
+with zero seats. Supported formats:
+
+- "csv": one row per flight, seat lists separated by spaces; bookers as username:name:user_type:seats,
+  separated by semicolons.
+- "jsonl": one JSON object per flight; "bookers" is a list of {"username", "name", "user_type", "seats"}.
+- "columnar": JSON Lines of row groups, each holding ROW_GROUP_SIZE flights stored column by column
+  ({"row_group": 0, "num_rows": ..., "columns": {"flight_id": [...], ...}}).
+
+Files ending in ".gz" (or with compress=True) are gzip compressed.
+"""
+
+import csv
+import gzip
+import json
+from collections import OrderedDict
+
+import instrumentation
+
+FORMATS = ("csv", "jsonl", "columnar")
+
+# Rows fetched from SQLite per fetchmany call
+FETCH_SIZE = 5000
+
+# Flights per row group in the columnar format
+ROW_GROUP_SIZE = 1000
+
+# Bookers whose name and user type are kept for reuse (least recently used ones are dropped); a few
+# MiB at most
+USER_CACHE_SIZE = 20000
+
+FIELDS = (
+    "flight_id",
+    "aircraft_code",
+    "total_seats",
+    "reserved_seats",
+    "available_seats",
+    "reserved_percentage",
+    "available_percentage",
+    "reserved_seat_list",
+    "available_seat_list",
+    "bookers",
+)
+
+# A LEFT JOIN keeps flights as the outer loop, so the bookings of a flight come out together, and
+# gives flights without bookings rows one row with NULL seat_number
+ALL_FLIGHTS_QUERY = """
+SELECT f.flight_id, f.aircraft_code, b.seat_number, b.booker
+FROM flights f LEFT JOIN bookings b ON b.flight = f.flight_id;
+"""
+
+ONE_FLIGHT_QUERY = """
+SELECT f.flight_id, f.aircraft_code, b.seat_number, b.booker
+FROM flights f LEFT JOIN bookings b ON b.flight = f.flight_id
+WHERE f.flight_id = ?;
+"""
+
+USER_QUERY = "SELECT name, user_type FROM users WHERE username = ?;"
+
+
+def _fetch_rows(cursor):
+    """
+    Yields the rows of an executed cursor, fetching FETCH_SIZE rows at a time.
+    """
+    while True:
+        rows = cursor.fetchmany(FETCH_SIZE)
+        if not rows:
+            return
+        yield from rows
+
+
+def _flight_stats(flight_id, aircraft_code, seats, user_details):
+    """
+    Builds the statistics record of one flight from its (seat_number, booker) pairs.
+    user_details(username) returns the (name, user_type) of a booker.
+    """
+    reserved = [seat for seat, booker in seats if booker is not None]
+    available = [seat for seat, booker in seats if booker is None]
+    total = len(seats)
+
+    bookers = {}
+    for seat, booker in seats:
+        if booker is not None:
+            if booker not in bookers:
+                name, user_type = user_details(booker)
+                bookers[booker] = {"username": booker, "name": name, "user_type": user_type, "seats": []}
+            bookers[booker]["seats"].append(seat)
+
+    return {
+        "flight_id": flight_id,
+        "aircraft_code": aircraft_code,
+        "total_seats": total,
+        "reserved_seats": len(reserved),
+        "available_seats": len(available),
+        "reserved_percentage": len(reserved) / total * 100 if total else 0,
+        "available_percentage": len(available) / total * 100 if total else 0,
+        "reserved_seat_list": reserved,
+        "available_seat_list": available,
+        "bookers": list(bookers.values()),
+    }
+
+
+def iter_flight_stats(db_path, flight_ids=None):
+    """
+    Yields a statistics dictionary per flight (see FIELDS), one flight at a time.
+
+    :param db_path: Path to the SQLite database file.
+    :param flight_ids: Flight IDs to export. None exports all flights.
+    """
+    conn = instrumentation.connect(db_path)
+    # Name and user type of recent bookers, so they are looked up about once per user, not per seat
+    users = OrderedDict()
+
+    def user_details(username):
+        if username in users:
+            users.move_to_end(username)
+            return users[username]
+        details = users[username] = conn.execute(USER_QUERY, (username,)).fetchone() or (None, None)
+        if len(users) > USER_CACHE_SIZE:
+            users.popitem(last=False)
+        return details
+
+    try:
+        if flight_ids is None:
+            batches = [conn.execute(ALL_FLIGHTS_QUERY)]
+        else:
+            batches = (conn.execute(ONE_FLIGHT_QUERY, (str(flight_id),)) for flight_id in flight_ids)
+
+        for cursor in batches:
+            current = None
+            seats = []
+            for flight_id, aircraft_code, seat_number, booker in _fetch_rows(cursor):
+                if current is not None and flight_id != current[0]:
+                    yield _flight_stats(current[0], current[1], seats, user_details)
+                    seats = []
+                current = (flight_id, aircraft_code)
+                if seat_number is not None:
+                    seats.append((seat_number, booker))
+            if current is not None:
+                yield _flight_stats(current[0], current[1], seats, user_details)
+    finally:
+        conn.close()
+
+
+def _open(path, compress):
+    """
+    Opens the output file for writing text, gzip compressed if requested.
+    """
+    if compress is None:
+        compress = path.endswith(".gz")
+    if compress:
+        return gzip.open(path, 'wt', compresslevel=6, newline='', encoding='utf-8')
+    return open(path, 'w', newline='', encoding='utf-8')
+
+
+def _write_csv(file, records):
+    writer = csv.writer(file)
+    writer.writerow(FIELDS)
+    count = 0
+    for record in records:
+        writer.writerow([
+            record["flight_id"],
+            record["aircraft_code"],
+            record["total_seats"],
+            record["reserved_seats"],
+            record["available_seats"],
+            f"{record['reserved_percentage']:.2f}",
+            f"{record['available_percentage']:.2f}",
+            " ".join(record["reserved_seat_list"]),
+            " ".join(record["available_seat_list"]),
+            ";".join(f"{user['username']}:{user['name'] or ''}:{user['user_type'] or ''}:{' '.join(user['seats'])}"
+                     for user in record["bookers"]),
+        ])
+        count += 1
+    return count
+
+
+def _write_jsonl(file, records):
+    count = 0
+    for record in records:
+        file.write(json.dumps(record))
+        file.write("\n")
+        count += 1
+    return count
+
+
+def _write_columnar(file, records):
+    count = 0
+    group = 0
+    columns = {field: [] for field in FIELDS}
+
+    def flush():
+        file.write(json.dumps({"row_group": group, "num_rows": len(columns["flight_id"]), "columns": columns}))
+        file.write("\n")
+
+    for record in records:
+        for field in FIELDS:
+            columns[field].append(record[field])
+        count += 1
+        if len(columns["flight_id"]) >= ROW_GROUP_SIZE:
+            flush()
+            group += 1
+            columns = {field: [] for field in FIELDS}
+
+    if columns["flight_id"] or group == 0:
+        flush()
+    return count
+
+
+def export_statistics(db_path, path, flight_ids=None, fmt="csv", compress=None):
+    """
+    Writes the statistics of the given flights (or all flights) to a file.
+
+    :param db_path: Path to the SQLite database file.
+    :param path: Output file path.
+    :param flight_ids: Flight IDs to export. None exports all flights.
+    :param fmt: One of FORMATS.
+    :param compress: Gzip the output. None decides by the ".gz" file extension.
+    :return: Number of flights written.
+    :raises ValueError: If the format is unknown.
+    """
+    writers = {"csv": _write_csv, "jsonl": _write_jsonl, "columnar": _write_columnar}
+    if fmt not in writers:
+        raise ValueError(f"Unknown export format '{fmt}', expected one of {', '.join(FORMATS)}.")
+
+    with _open(path, compress) as file:
+        return writers[fmt](file, iter_flight_stats(db_path, flight_ids))
+
+
+def format_for_path(path):
+    """
+    Guesses the export format from a file name, e.g. "stats.jsonl.gz" -> "jsonl".
+    """
+    name = path[:-3] if path.endswith(".gz") else path
+    if name.endswith(".jsonl") or name.endswith(".json"):
+        return "jsonl"
+    if name.endswith(".columnar") or name.endswith(".cols"):
+        return "columnar"
+    return "csv"
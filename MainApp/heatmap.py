@@ -0,0 +1,127 @@
+"""
+Booking frequency by seat position for each aircraft type.
+
+The seat_position_counts table holds, for every aircraft type and seat number, how many flights have
+that seat and on how many of them it is booked. It is filled once with a single grouped query over
+bookings and then kept up to date by triggers on bookings (seat grid inserts, book, cancel and
+deletes), so drawing a heatmap only reads a few hundred aggregate rows instead of scanning bookings.
+"""
+
+import db_queries
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS seat_position_counts (
+        aircraft_code TEXT NOT NULL,
+        seat_number TEXT NOT NULL,
+        seats INTEGER NOT NULL DEFAULT 0,
+        booked INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (aircraft_code, seat_number)
+    );
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS seat_position_counts_insert AFTER INSERT ON bookings
+    BEGIN
+        INSERT INTO seat_position_counts (aircraft_code, seat_number, seats, booked)
+        SELECT aircraft_code, NEW.seat_number, 1, NEW.booker IS NOT NULL
+        FROM flights WHERE flight_id = CAST(NEW.flight AS TEXT)
+        ON CONFLICT (aircraft_code, seat_number) DO UPDATE SET
+            seats = seats + 1,
+            booked = booked + (NEW.booker IS NOT NULL);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS seat_position_counts_update AFTER UPDATE OF booker ON bookings
+    WHEN (OLD.booker IS NULL) != (NEW.booker IS NULL)
+    BEGIN
+        UPDATE seat_position_counts
+        SET booked = booked + (NEW.booker IS NOT NULL) - (OLD.booker IS NOT NULL)
+        WHERE aircraft_code = (SELECT aircraft_code FROM flights WHERE flight_id = CAST(NEW.flight AS TEXT))
+          AND seat_number = NEW.seat_number;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS seat_position_counts_delete AFTER DELETE ON bookings
+    BEGIN
+        UPDATE seat_position_counts
+        SET seats = seats - 1, booked = booked - (OLD.booker IS NOT NULL)
+        WHERE aircraft_code = (SELECT aircraft_code FROM flights WHERE flight_id = CAST(OLD.flight AS TEXT))
+          AND seat_number = OLD.seat_number;
+    END;
+    """,
+]
+
+# Databases (by path) whose schema was already checked by this process
+_initialized = set()
+
+
+def ensure_table():
+    """
+    Creates the seat_position_counts table and its triggers if they do not exist yet, and fills the
+    table from the bookings the first time.
+    """
+    if db_queries.db_path in _initialized:
+        return
+
+    conn = db_queries.get_connection()
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'seat_position_counts';").fetchone()
+
+    with conn:
+        for sql in SCHEMA:
+            conn.execute(sql)
+        if not exists:
+            conn.execute("""
+            INSERT INTO seat_position_counts (aircraft_code, seat_number, seats, booked)
+            SELECT f.aircraft_code, b.seat_number, COUNT(*), SUM(b.booker IS NOT NULL)
+            FROM flights f CROSS JOIN bookings b ON b.flight = f.flight_id
+            GROUP BY f.aircraft_code, b.seat_number;
+            """)
+
+    _initialized.add(db_queries.db_path)
+
+
+def layout_columns(layout):
+    """
+    Returns the columns of a heatmap for an aircraft layout: one seat letter per column, with an
+    empty string for each aisle, e.g. "AB| |CD" -> ["A", "B", "", "C", "D"].
+    """
+    columns = []
+    for segment in layout.split("|"):
+        if segment.strip():
+            columns.extend(segment.strip())
+        else:
+            columns.append("")
+    return columns
+
+
+def seat_heatmap(aircraft_code):
+    """
+    Returns the booking frequency of every seat position of an aircraft type over all its flights.
+
+    :param aircraft_code: The code of the aircraft type.
+    :return: Tuple (columns, rows, matrix): the column labels (see layout_columns), the row numbers
+             and one list per row with the share of flights on which the seat is booked (NaN for
+             aisles and seats no flight has). None if the aircraft does not exist.
+    """
+    ensure_table()
+    conn = db_queries.get_connection()
+
+    aircraft = conn.execute("SELECT layout, row_number FROM aircrafts WHERE code = ?;", (aircraft_code,)).fetchone()
+    if aircraft is None:
+        return None
+
+    layout, row_number = aircraft
+    columns = layout_columns(layout)
+    position = {letter: i for i, letter in enumerate(columns) if letter}
+    rows = list(range(1, row_number + 1))
+    matrix = [[float("nan")] * len(columns) for _ in rows]
+
+    counts = conn.execute("SELECT seat_number, seats, booked FROM seat_position_counts WHERE aircraft_code = ? AND seats > 0;",
+                          (aircraft_code,))
+    for seat_number, seats, booked in counts:
+        row, letter = seat_number[:-1], seat_number[-1]
+        if row.isdigit() and 1 <= int(row) <= row_number and letter in position:
+            matrix[int(row) - 1][position[letter]] = booked / seats
+
+    return columns, rows, matrix
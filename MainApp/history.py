@@ -0,0 +1,185 @@
+"""
+Occupancy history of flights, for fill curves.
+
+Triggers on bookings add to the occupancy_history table whenever a seat is booked or cancelled: one
+row per flight and second, holding by how much the number of booked seats changed in that second.
+When the table is created, every flight gets a first point with the seats booked at that time, so
+the number of booked seats at any time is the sum of the changes up to then; fill_curve() adds them
+up. Deleting seats (flight deletion, archiving) is not recorded, and the history of an archived
+flight is kept.
+
+downsample() (run by maintenance.py) merges older points by adding up their changes: points older
+than RAW_RETENTION are merged into one per hour, points older than HOURLY_RETENTION into one per
+day. A merged point is stamped with the last second of its hour or day, so the curve stays exact at
+every point that is left, only the steps in between are lost.
+"""
+
+import threading
+import time
+
+import archive
+import db_queries
+
+# Age in seconds after which points are merged into one per hour, and into one per day
+RAW_RETENTION = 24 * 60 * 60
+HOURLY_RETENTION = 30 * 24 * 60 * 60
+
+# Flights whose points are merged per transaction (the first transaction, if it adapts to a budget)
+DOWNSAMPLE_CHUNK_SIZE = 50
+
+# Time recording may add to a booking or cancellation, in microseconds (checked by
+# benchmarks/bench_history.py; measured at about 10 on the 20 000 flight benchmark database)
+WRITE_BUDGET_US = 15
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS occupancy_history (
+        flight_id TEXT NOT NULL,
+        time INTEGER NOT NULL,
+        change INTEGER NOT NULL,
+        PRIMARY KEY (flight_id, time)
+    ) WITHOUT ROWID;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS occupancy_history_insert AFTER INSERT ON bookings
+    WHEN NEW.booker IS NOT NULL
+    BEGIN
+        INSERT INTO occupancy_history (flight_id, time, change)
+        VALUES (CAST(NEW.flight AS TEXT), CAST(strftime('%s', 'now') AS INTEGER), 1)
+        ON CONFLICT (flight_id, time) DO UPDATE SET change = change + 1;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS occupancy_history_update AFTER UPDATE OF booker ON bookings
+    WHEN (OLD.booker IS NULL) != (NEW.booker IS NULL)
+    BEGIN
+        INSERT INTO occupancy_history (flight_id, time, change)
+        VALUES (CAST(NEW.flight AS TEXT), CAST(strftime('%s', 'now') AS INTEGER), (NEW.booker IS NOT NULL) - (OLD.booker IS NOT NULL))
+        ON CONFLICT (flight_id, time) DO UPDATE SET change = change + excluded.change;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS occupancy_history_flight_delete AFTER DELETE ON flights
+    WHEN NOT EXISTS (SELECT 1 FROM archived_flights WHERE flight_id = OLD.flight_id)
+    BEGIN
+        DELETE FROM occupancy_history WHERE flight_id = OLD.flight_id;
+    END;
+    """,
+]
+
+# Databases (by path) whose schema was already checked by this process
+_initialized = set()
+# Keeps two threads from filling the table twice
+_init_lock = threading.Lock()
+
+
+def ensure_table():
+    """
+    Creates the occupancy_history table and its triggers if they do not exist yet, and records the
+    seats booked on every flight the first time.
+    """
+    if db_queries.db_path in _initialized:
+        return
+
+    with _init_lock:
+        if db_queries.db_path in _initialized:
+            return
+
+        conn = db_queries.get_connection()
+        # The flight deletion trigger keeps the history of archived flights
+        archive.ensure_schema(conn)
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'occupancy_history';").fetchone()
+
+        with conn:
+            for sql in SCHEMA:
+                conn.execute(sql)
+            if not exists:
+                conn.execute("""
+                INSERT INTO occupancy_history (flight_id, time, change)
+                SELECT CAST(flight AS TEXT), ?, COUNT(*) FROM bookings
+                WHERE booker IS NOT NULL GROUP BY flight;
+                """, (int(time.time()),))
+
+        _initialized.add(db_queries.db_path)
+
+
+def fill_curve(flight_id):
+    """
+    Returns how the number of booked seats of a flight changed over time.
+
+    :param flight_id: The ID of the flight.
+    :return: List of (time, booked_seats) tuples in time order, time in seconds since the epoch.
+             Empty if nothing was recorded for the flight.
+    """
+    ensure_table()
+    return db_queries.get_connection().execute("""
+    SELECT time, SUM(change) OVER (ORDER BY time) FROM occupancy_history
+    WHERE flight_id = ? ORDER BY time;
+    """, (str(flight_id),)).fetchall()
+
+
+def downsample(conn, now=None, chunk_size=DOWNSAMPLE_CHUNK_SIZE, budget_ms=None):
+    """
+    Merges points older than RAW_RETENTION into one per hour and points older than
+    HOURLY_RETENTION into one per day, a chunk of flights per transaction.
+
+    :param conn: An open connection to the database (not in a transaction).
+    :param now: Current time in seconds since the epoch (default: time.time()).
+    :param chunk_size: Number of flights per transaction.
+    :param budget_ms: If given, chunks are sized so a transaction takes about half of it, with a
+                      pause of budget_ms between them so writers get their turn.
+    :return: Dictionary with the number of "rows_before" and "rows_after" and the duration of the
+             longest transaction in "max_chunk_seconds". All 0 if the table does not exist.
+    """
+    result = {"rows_before": 0, "rows_after": 0, "max_chunk_seconds": 0.0}
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'occupancy_history';").fetchone():
+        return result
+
+    now = int(time.time() if now is None else now)
+    result["rows_before"] = conn.execute("SELECT COUNT(*) FROM occupancy_history;").fetchone()[0]
+    flight_ids = [row[0] for row in conn.execute("SELECT DISTINCT flight_id FROM occupancy_history ORDER BY flight_id;")]
+
+    start = 0
+    while start < len(flight_ids):
+        chunk = flight_ids[start:start + chunk_size]
+        start += len(chunk)
+        conn.execute("BEGIN IMMEDIATE;")
+        begun = time.perf_counter()
+        try:
+            for age, size in ((RAW_RETENTION, 60 * 60), (HOURLY_RETENTION, 24 * 60 * 60)):
+                _merge(conn, chunk[0], chunk[-1], now - age, size)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        elapsed = time.perf_counter() - begun
+        result["max_chunk_seconds"] = max(result["max_chunk_seconds"], elapsed)
+
+        if budget_ms is not None:
+            if elapsed > 0:
+                chunk_size = max(1, min(10000, int(chunk_size * budget_ms / 2 / (elapsed * 1000))))
+            time.sleep(budget_ms / 1000)
+
+    result["rows_after"] = conn.execute("SELECT COUNT(*) FROM occupancy_history;").fetchone()[0]
+    return result
+
+
+def _merge(conn, first_flight, last_flight, older_than, size):
+    """
+    Merges the points of flights first_flight to last_flight in complete buckets of size seconds
+    ending before older_than into one point per bucket, at the bucket's last second.
+    """
+    cutoff = older_than - older_than % size
+    # The SELECT ends in GROUP BY, so the parser cannot take ON CONFLICT for a join constraint
+    conn.execute("""
+    INSERT INTO occupancy_history (flight_id, time, change)
+    SELECT flight_id, time - time % :size + :size - 1, SUM(change) FROM occupancy_history
+    WHERE flight_id BETWEEN :first AND :last AND time < :cutoff AND time % :size != :size - 1
+    GROUP BY flight_id, time - time % :size
+    ON CONFLICT (flight_id, time) DO UPDATE SET change = change + excluded.change;
+    """, {"size": size, "first": first_flight, "last": last_flight, "cutoff": cutoff})
+    conn.execute("""
+    DELETE FROM occupancy_history
+    WHERE flight_id BETWEEN :first AND :last AND time < :cutoff AND time % :size != :size - 1;
+    """, {"size": size, "first": first_flight, "last": last_flight, "cutoff": cutoff})
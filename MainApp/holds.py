@@ -0,0 +1,231 @@
+"""
+Time-limited seat holds.
+
+A hold reserves free seats for one user for a short time (DEFAULT_TTL seconds), so that nobody else
+can book them between looking at the seat map and clicking "Book". Holds are stored in the seat_holds
+table, so they are honoured by every process; a hold whose expires_at has passed is simply ignored.
+Each process also keeps its own holds in a heap ordered by expiry time, so release_expired() deletes
+expired rows by popping the heap (O(log n) each) instead of scanning the table.
+"""
+
+import heapq
+import sqlite3
+import threading
+import time
+
+import db_queries
+
+# Default lifetime of a hold in seconds
+DEFAULT_TTL = 5 * 60
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS seat_holds (
+        flight_id TEXT NOT NULL,
+        seat_number TEXT NOT NULL,
+        holder TEXT NOT NULL,
+        expires_at REAL NOT NULL,
+        PRIMARY KEY (flight_id, seat_number),
+        FOREIGN KEY (holder) REFERENCES users(username)
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS seat_holds_expiry ON seat_holds (expires_at);",
+]
+
+
+def ensure_schema(conn):
+    """
+    Creates the seat_holds table if it does not exist yet.
+
+    :param conn: An open connection to the database.
+    """
+    with conn:
+        for sql in SCHEMA:
+            conn.execute(sql)
+
+
+def active_holds(conn, flight_id, now=None):
+    """
+    Returns the unexpired holds of a flight.
+
+    :param conn: An open connection to the database.
+    :param flight_id: The ID of the flight.
+    :return: Dictionary seat number -> holder. Empty if the seat_holds table does not exist.
+    """
+    now = time.time() if now is None else now
+    try:
+        rows = conn.execute("SELECT seat_number, holder FROM seat_holds WHERE flight_id = ? AND expires_at > ?;",
+                            (str(flight_id), now)).fetchall()
+    except sqlite3.OperationalError:
+        return {}
+    return dict(rows)
+
+
+class SeatHolds:
+    """
+    Places, releases and honours seat holds.
+
+    Methods:
+        __init__(ttl): Creates the manager and the seat_holds table.
+        hold(flight_id, seat_numbers, holder): Holds free seats for a user.
+        release(flight_id, seat_numbers, holder): Releases a user's holds.
+        release_expired(): Deletes this process's expired holds.
+        held_seats(flight_id): Returns the active holds of a flight.
+        book(flight_id, seat_numbers, username): Books seats, honouring holds of other users.
+        book_itinerary(legs, username): Books seats on several flights, all or nothing.
+    """
+    def __init__(self, ttl=DEFAULT_TTL):
+        self.ttl = ttl
+
+        # Heap of (expires_at, flight_id, seat_number, holder) for holds placed by this process
+        self._heap = []
+        self._lock = threading.Lock()
+
+        ensure_schema(db_queries.get_connection())
+
+    def hold(self, flight_id, seat_numbers, holder, ttl=None):
+        """
+        Hold free seats for a user. Either all seats are held or none.
+        Seats the user already holds have their hold extended.
+
+        :param flight_id: The ID of the flight.
+        :param seat_numbers: List of seat numbers.
+        :param holder: The username of the user.
+        :param ttl: Lifetime of the hold in seconds (default: the manager's ttl).
+        :return: Tuple (success, error message or None).
+        """
+        flight_id = str(flight_id)
+        now = time.time()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+
+        conn = db_queries.get_connection()
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            error = self._check_seats(conn, flight_id, seat_numbers, holder, now)
+            if error:
+                conn.rollback()
+                return False, error
+
+            conn.executemany("""
+            INSERT INTO seat_holds (flight_id, seat_number, holder, expires_at) VALUES (?, ?, ?, ?)
+            ON CONFLICT (flight_id, seat_number) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at;
+            """, [(flight_id, seat, holder, expires_at) for seat in seat_numbers])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        with self._lock:
+            for seat in seat_numbers:
+                heapq.heappush(self._heap, (expires_at, flight_id, seat, holder))
+        return True, None
+
+    def release(self, flight_id, seat_numbers, holder):
+        """
+        Release a user's holds on some seats. Holds of other users are left alone.
+        """
+        conn = db_queries.get_connection()
+        with conn:
+            conn.executemany("DELETE FROM seat_holds WHERE flight_id = ? AND seat_number = ? AND holder = ?;",
+                             [(str(flight_id), seat, holder) for seat in seat_numbers])
+
+    def release_expired(self, now=None):
+        """
+        Delete the expired holds placed by this process. Holds that were extended or released in the
+        meantime no longer match their heap entry and are not touched.
+
+        :return: Number of expired heap entries processed.
+        """
+        now = time.time() if now is None else now
+        expired = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                expired.append(heapq.heappop(self._heap))
+
+        if expired:
+            conn = db_queries.get_connection()
+            with conn:
+                conn.executemany(
+                    "DELETE FROM seat_holds WHERE expires_at = ? AND flight_id = ? AND seat_number = ? AND holder = ?;",
+                    expired)
+        return len(expired)
+
+    def held_seats(self, flight_id):
+        """
+        Returns the active holds of a flight as a dictionary seat number -> holder.
+        """
+        return active_holds(db_queries.get_connection(), flight_id)
+
+    def book(self, flight_id, seat_numbers, username):
+        """
+        Book seats for a user in one transaction. Either all seats are booked or none.
+        Seats held by another user cannot be booked; the user's own holds on them are removed.
+
+        :param flight_id: The ID of the flight.
+        :param seat_numbers: List of seat numbers.
+        :param username: The username of the booker.
+        :return: Tuple (success, error message or None).
+        """
+        return self.book_itinerary([(flight_id, seat_numbers)], username)
+
+    def book_itinerary(self, legs, username):
+        """
+        Book seats on several flights (e.g. the legs of a connecting trip) in one transaction.
+        Either every seat of every leg is booked or none; holds are honoured as in book().
+
+        The write lock is taken before anything is read (BEGIN IMMEDIATE), so two itineraries can
+        never wait for each other, and the legs are checked and written in a fixed order (by flight
+        and seat), so the outcome does not depend on the order the legs were given in.
+
+        :param legs: List of (flight_id, seat_numbers). Seats of the same flight in several legs are combined.
+        :param username: The username of the booker.
+        :return: Tuple (success, error message or None).
+        """
+        seats_by_flight = {}
+        for flight_id, seat_numbers in legs:
+            seats_by_flight.setdefault(str(flight_id), set()).update(seat_numbers)
+        if not seats_by_flight:
+            return False, "Invalid seat number, try again."
+        ordered = [(flight_id, sorted(seats_by_flight[flight_id])) for flight_id in sorted(seats_by_flight)]
+
+        conn = db_queries.get_connection()
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            now = time.time()
+            for flight_id, seat_numbers in ordered:
+                error = self._check_seats(conn, flight_id, seat_numbers, username, now)
+                if error:
+                    conn.rollback()
+                    return False, error if len(ordered) == 1 else f"Flight {flight_id}: {error}"
+
+            seats = [(flight_id, seat) for flight_id, seat_numbers in ordered for seat in seat_numbers]
+            conn.executemany("UPDATE bookings SET booker = ? WHERE flight = ? AND seat_number = ?;",
+                             [(username, flight_id, seat) for flight_id, seat in seats])
+            conn.executemany("DELETE FROM seat_holds WHERE flight_id = ? AND seat_number = ?;", seats)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return True, None
+
+    def _check_seats(self, conn, flight_id, seat_numbers, user, now):
+        """
+        Checks that all seats exist, are not booked and not held by another user.
+
+        :return: An error message, or None if all seats are available to the user.
+        """
+        if not seat_numbers:
+            return "Invalid seat number, try again."
+
+        for seat in seat_numbers:
+            row = conn.execute("SELECT booker FROM bookings WHERE flight = ? AND seat_number = ?;", (flight_id, seat)).fetchone()
+            if row is None:
+                return f"Invalid seat number {seat}, try again."
+            if row[0] is not None:
+                return f"The selected seat {seat} is already booked, please choose another one."
+
+            hold = conn.execute("SELECT holder FROM seat_holds WHERE flight_id = ? AND seat_number = ? AND expires_at > ?;",
+                                (flight_id, seat, now)).fetchone()
+            if hold is not None and hold[0] != user:
+                return f"The selected seat {seat} is currently held by another customer, please choose another one."
+        return None
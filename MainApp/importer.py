@@ -0,0 +1,244 @@
+"""
+Streaming importer for the Kaggle airlines dataset.
+
+Reads the aircrafts_data, seats and flights tables of the dataset, either as the CSV files of the
+Kaggle download (a folder with aircrafts_data.csv, seats.csv and flights.csv) or as an SQLite dump
+with tables of the same names, and loads them into flights.sqlite:
+
+- Every aircraft gets a layout derived from the seat letters in seats (e.g. "ABC| |DEF") and the
+  highest row number. Aircraft that already exist keep their hand-made layout.
+- Flights are read in chunks of CHUNK_SIZE rows. Each chunk, the seat grids of its flights in
+  bookings and the import checkpoint are written in one transaction, so an interrupted import can
+  be resumed from the last committed chunk by running it again.
+
+Usage: python importer.py <folder or .sqlite file> [--db flights.sqlite] [--restart]
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import sqlite3
+import time
+
+import db_queries
+import instrumentation
+import seating
+
+# Flights read and written per transaction
+CHUNK_SIZE = 5000
+
+# Source rows fetched at a time from an SQLite dump
+FETCH_SIZE = 1000
+
+# Seats per row -> seats per aisle segment, used when deriving layouts from seat letters
+SEGMENTS = {1: (1,), 2: (1, 1), 3: (1, 2), 4: (2, 2), 5: (2, 3), 6: (3, 3),
+            7: (2, 3, 2), 8: (2, 4, 2), 9: (3, 3, 3), 10: (3, 4, 3)}
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS import_checkpoints (
+        source TEXT PRIMARY KEY,
+        rows_done INTEGER NOT NULL,
+        updated_at REAL NOT NULL
+    );
+    """,
+]
+
+
+def ensure_schema(conn):
+    """
+    Creates the import_checkpoints table if it does not exist yet.
+
+    :param conn: An open connection to the database.
+    """
+    with conn:
+        for sql in SCHEMA:
+            conn.execute(sql)
+
+
+def read_table(source, table, columns):
+    """
+    Streams the rows of a dataset table as tuples of the given columns.
+
+    :param source: A folder with <table>.csv files or the path to an SQLite dump.
+    :param table: The name of the table, e.g. "flights".
+    :param columns: Tuple of column names to return.
+    """
+    if os.path.isdir(source):
+        with open(os.path.join(source, f"{table}.csv"), newline='', encoding='utf-8') as file:
+            reader = csv.reader(file)
+            header = next(reader)
+            positions = [header.index(col) for col in columns]
+            for row in reader:
+                if row:
+                    yield tuple(row[i] for i in positions)
+        return
+
+    conn = sqlite3.connect(f"file:{source}?mode=ro", uri=True)
+    try:
+        # Table and column names are fixed by the callers of this module
+        cursor = conn.execute(f"SELECT {', '.join(columns)} FROM {table} ORDER BY rowid;")
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                yield tuple(str(value) for value in row)
+    finally:
+        conn.close()
+
+
+def layout_from_letters(letters):
+    """
+    Derives an aircraft layout from the seat letters used in a row, e.g. "ABCDEF" -> "ABC| |DEF".
+
+    :param letters: The seat letters in order.
+    """
+    count = len(letters)
+    if count in SEGMENTS:
+        sizes = SEGMENTS[count]
+    else:
+        outer = count // 3
+        sizes = (outer, count - 2 * outer, outer)
+
+    segments, start = [], 0
+    for size in sizes:
+        segments.append(letters[start:start + size])
+        start += size
+    return "| |".join(segments)
+
+
+def seat_configurations(source):
+    """
+    Reads the seats table and returns each aircraft's layout and number of rows.
+
+    :param source: A folder with CSV files or the path to an SQLite dump.
+    :return: Dictionary aircraft code -> (layout, row_number).
+    """
+    letters, rows = {}, {}
+    for code, seat_no in read_table(source, "seats", ("aircraft_code", "seat_no")):
+        letters.setdefault(code, set()).add(seat_no[-1])
+        rows[code] = max(rows.get(code, 0), int(seat_no[:-1]))
+    return {code: (layout_from_letters("".join(sorted(letters[code]))), rows[code]) for code in letters}
+
+
+def import_aircrafts(conn, source):
+    """
+    Adds the aircraft of the dataset that are not in the database yet.
+
+    :return: Number of aircraft added.
+    """
+    configurations = seat_configurations(source)
+    codes = [code for (code,) in read_table(source, "aircrafts_data", ("aircraft_code",))]
+
+    with conn:
+        cursor = conn.executemany(
+            "INSERT OR IGNORE INTO aircrafts (code, layout, row_number) VALUES (?, ?, ?);",
+            [(code, *configurations[code]) for code in codes if code in configurations])
+    return cursor.rowcount
+
+
+def import_flights(conn, source, progress=None, restart=False):
+    """
+    Imports the flights of the dataset and provisions their seat grids, one chunk per transaction.
+    Continues after the last committed chunk of a previous run unless restart is True.
+
+    :param progress: Optional callback called as progress(rows_done, flights_added, seats_added) after every chunk.
+    :return: Tuple (flights added, seats added).
+    """
+    ensure_schema(conn)
+    checkpoint = os.path.abspath(source)
+    if restart:
+        with conn:
+            conn.execute("DELETE FROM import_checkpoints WHERE source = ?;", (checkpoint,))
+
+    row = conn.execute("SELECT rows_done FROM import_checkpoints WHERE source = ?;", (checkpoint,)).fetchone()
+    rows_done = row[0] if row else 0
+
+    grids = aircraft_grids(conn)
+
+    rows = itertools.islice(read_table(source, "flights", ("flight_id", "aircraft_code")), rows_done, None)
+    flights_added = seats_added = 0
+    while True:
+        chunk = list(itertools.islice(rows, CHUNK_SIZE))
+        if not chunk:
+            break
+
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            flights, seats = insert_flights(conn, chunk, grids)
+            flights_added += flights
+            seats_added += seats
+
+            rows_done += len(chunk)
+            conn.execute("""
+            INSERT INTO import_checkpoints (source, rows_done, updated_at) VALUES (?, ?, ?)
+            ON CONFLICT (source) DO UPDATE SET rows_done = excluded.rows_done, updated_at = excluded.updated_at;
+            """, (checkpoint, rows_done, time.time()))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        if progress:
+            progress(rows_done, flights_added, seats_added)
+    return flights_added, seats_added
+
+
+def insert_flights(conn, flights, grids):
+    """
+    Adds flights and their seat grids. Runs inside the caller's transaction.
+    Flights with unknown aircraft are skipped, flights that already exist are left alone.
+
+    :param conn: An open connection to the database.
+    :param flights: Iterable of (flight_id, aircraft_code).
+    :param grids: Dictionary aircraft code -> seat labels (see seating.seat_labels).
+    :return: Tuple (flights added, seats added).
+    """
+    added = []
+    for flight_id, code in flights:
+        if code in grids and conn.execute("INSERT OR IGNORE INTO flights (flight_id, aircraft_code) VALUES (?, ?);",
+                                          (flight_id, code)).rowcount:
+            added.append((flight_id, code))
+
+    cursor = conn.executemany(
+        "INSERT OR IGNORE INTO bookings (flight, seat_number, booker) VALUES (?, ?, NULL);",
+        ((flight_id, seat) for flight_id, code in added for seat in grids[code]))
+    return len(added), cursor.rowcount
+
+
+def aircraft_grids(conn):
+    """
+    Returns the seat labels of every aircraft in the database, as aircraft code -> list (see seating.seat_labels).
+    """
+    return {code: seating.seat_labels(layout, row_number)
+            for code, layout, row_number in conn.execute("SELECT code, layout, row_number FROM aircrafts;")}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import the Kaggle airlines dataset into flights.sqlite")
+    parser.add_argument("source", help="folder with the dataset's CSV files, or an SQLite dump of it")
+    parser.add_argument("--db", default=db_queries.db_path, help="database to import into")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint of a previous run")
+    args = parser.parse_args()
+
+    conn = instrumentation.connect(args.db)
+    try:
+        print(f"Aircraft added: {import_aircrafts(conn, args.source)}")
+
+        start = time.perf_counter()
+
+        def report(rows_done, flights, seats):
+            elapsed = time.perf_counter() - start
+            print(f"{rows_done} rows read, {flights} flights and {seats} seats added "
+                  f"({flights / elapsed:.0f} flights/s, {seats / elapsed:.0f} seats/s)")
+
+        flights, seats = import_flights(conn, args.source, report, args.restart)
+        print(f"Done: {flights} flights and {seats} seats added in {time.perf_counter() - start:.1f}s")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
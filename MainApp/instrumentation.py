@@ -0,0 +1,276 @@
+"""
+Opt-in timing of database queries.
+
+When enabled, connections opened through connect() time every statement, count the rows it
+returned, and remember which function issued it and which screen of the app was active at the time.
+Statements slower than SLOW_QUERY_MS are logged. When disabled, connect() returns a plain sqlite3
+connection, so there is no per-query overhead at all.
+
+Enable it by setting the environment variable FLIGHTS_PROFILE=1 before starting the app (or by
+calling enable() before the first connection is opened). If FLIGHTS_PROFILE_DUMP is set to a file
+path, a JSON dump of all statistics is written there when the process exits.
+"""
+
+import atexit
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+enabled = os.environ.get("FLIGHTS_PROFILE", "") not in ("", "0")
+
+# Statements taking longer than this (execute plus fetches) are logged
+SLOW_QUERY_MS = float(os.environ.get("FLIGHTS_SLOW_QUERY_MS", 50))
+
+# Histogram bucket i counts statements that took less than 2**i microseconds (and at least 2**(i-1))
+HISTOGRAM_BUCKETS = 32
+
+logger = logging.getLogger("flights.queries")
+
+_lock = threading.Lock()
+_local = threading.local()
+
+# (screen, site, sql) -> {"count", "total_us", "rows", "histogram"}
+_stats = {}
+
+
+def enable(slow_query_ms=None):
+    """
+    Turn instrumentation on for connections opened from now on.
+
+    :param slow_query_ms: Optional new threshold for the slow query log.
+    """
+    global enabled, SLOW_QUERY_MS
+    enabled = True
+    if slow_query_ms is not None:
+        SLOW_QUERY_MS = slow_query_ms
+
+
+def disable():
+    """
+    Turn instrumentation off for connections opened from now on.
+    """
+    global enabled
+    enabled = False
+
+
+def reset():
+    """
+    Forget all collected statistics.
+    """
+    with _lock:
+        _stats.clear()
+
+
+def set_screen(name):
+    """
+    Set the name of the active screen (UI page) for the calling thread. Queries are grouped by it.
+    """
+    _local.screen = name
+
+
+def connect(path, **kwargs):
+    """
+    Open a connection to a database, instrumented if instrumentation is enabled.
+
+    :param path: Path to the SQLite database file, or a "file:" URI (e.g. an in-memory replica).
+    :param kwargs: Passed on to sqlite3.connect.
+    """
+    if path.startswith("file:"):
+        kwargs.setdefault("uri", True)
+    if not enabled:
+        return sqlite3.connect(path, **kwargs)
+    return sqlite3.connect(path, factory=InstrumentedConnection, **kwargs)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """
+    Cursor that times its statements. A statement's record is completed (and counted) when the
+    next statement is executed, the cursor is closed, or the cursor is garbage collected, so the
+    time and rows of later fetches are included.
+    """
+    _record = None
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        start = time.perf_counter()
+        super().execute(sql, parameters)
+        self._record = [sql, _call_site(), time.perf_counter() - start, 0]
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        start = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._record = [sql, _call_site(), time.perf_counter() - start, 0]
+        return self
+
+    def fetchone(self):
+        return self._timed_fetch(super().fetchone, single=True)
+
+    def fetchmany(self, size=None):
+        fetch = super().fetchmany
+        return self._timed_fetch(lambda: fetch(self.arraysize if size is None else size))
+
+    def fetchall(self):
+        return self._timed_fetch(super().fetchall)
+
+    def __next__(self):
+        start = time.perf_counter()
+        row = super().__next__()
+        if self._record is not None:
+            self._record[2] += time.perf_counter() - start
+            self._record[3] += 1
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _timed_fetch(self, fetch, single=False):
+        start = time.perf_counter()
+        result = fetch()
+        if self._record is not None:
+            self._record[2] += time.perf_counter() - start
+            if single:
+                self._record[3] += result is not None
+            else:
+                self._record[3] += len(result)
+        return result
+
+    def _finish(self):
+        record = self._record
+        if record is None:
+            return
+        self._record = None
+        sql, site, elapsed, rows = record
+        if rows == 0 and self.rowcount > 0:
+            rows = self.rowcount
+        _record(sql, site, elapsed, rows)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """
+    Connection whose cursors (including those created by execute shortcuts) are InstrumentedCursors.
+    """
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+
+def _call_site():
+    """
+    Returns "module.function" of the nearest caller outside this module.
+    """
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    module = os.path.splitext(os.path.basename(frame.f_code.co_filename))[0]
+    return f"{module}.{frame.f_code.co_name}"
+
+
+def _record(sql, site, elapsed, rows):
+    """
+    Add one finished statement to the statistics and log it if it was slow.
+    """
+    screen = getattr(_local, "screen", "-")
+    sql = " ".join(sql.split())
+    elapsed_us = elapsed * 1e6
+    bucket = min(int(elapsed_us).bit_length(), HISTOGRAM_BUCKETS - 1)
+
+    with _lock:
+        entry = _stats.get((screen, site, sql))
+        if entry is None:
+            entry = {"count": 0, "total_us": 0.0, "rows": 0, "histogram": [0] * HISTOGRAM_BUCKETS}
+            _stats[(screen, site, sql)] = entry
+        entry["count"] += 1
+        entry["total_us"] += elapsed_us
+        entry["rows"] += rows
+        entry["histogram"][bucket] += 1
+
+    if elapsed_us >= SLOW_QUERY_MS * 1000:
+        logger.warning("Slow query (%.1f ms, %d rows) on %s from %s: %s", elapsed_us / 1000, rows, screen, site, sql)
+
+
+def _percentile(histogram, fraction):
+    """
+    Upper bound in microseconds of the bucket holding the given fraction of the statements.
+    """
+    target = sum(histogram) * fraction
+    seen = 0
+    for i, count in enumerate(histogram):
+        seen += count
+        if seen >= target and count:
+            return 2 ** i
+    return 0
+
+
+def snapshot():
+    """
+    Returns the collected statistics as a list of dictionaries, slowest total time first.
+    """
+    with _lock:
+        items = [(key, dict(entry, histogram=list(entry["histogram"]))) for key, entry in _stats.items()]
+
+    result = []
+    for (screen, site, sql), entry in items:
+        entry.update({
+            "screen": screen,
+            "site": site,
+            "sql": sql,
+            "mean_us": entry["total_us"] / entry["count"],
+            "p50_us": _percentile(entry["histogram"], 0.5),
+            "p95_us": _percentile(entry["histogram"], 0.95),
+        })
+        result.append(entry)
+    result.sort(key=lambda e: e["total_us"], reverse=True)
+    return result
+
+
+def dump():
+    """
+    Returns a text report of the collected statistics, grouped by screen.
+    """
+    entries = snapshot()
+    if not entries:
+        return "No queries recorded." if enabled else "Instrumentation is disabled (set FLIGHTS_PROFILE=1)."
+
+    screens = {}
+    for entry in entries:
+        screens.setdefault(entry["screen"], []).append(entry)
+
+    lines = []
+    for screen, screen_entries in screens.items():
+        count = sum(e["count"] for e in screen_entries)
+        total_ms = sum(e["total_us"] for e in screen_entries) / 1000
+        lines.append(f"[{screen}] {count} queries, {total_ms:.1f} ms")
+        for e in screen_entries:
+            lines.append(f"  {e['count']:6d}x {e['mean_us']:9.1f} us mean, p95 <{e['p95_us']} us, "
+                         f"{e['rows']} rows  {e['site']}: {e['sql'][:80]}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def dump_to_file(path):
+    """
+    Write all collected statistics to a JSON file.
+    """
+    with open(path, 'w') as file:
+        json.dump(snapshot(), file, indent=2)
+
+
+if os.environ.get("FLIGHTS_PROFILE_DUMP"):
+    atexit.register(lambda: dump_to_file(os.environ["FLIGHTS_PROFILE_DUMP"]))
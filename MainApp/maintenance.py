@@ -0,0 +1,398 @@
+"""
+Database maintenance: planner statistics, freeing unused pages, integrity and orphan checks.
+
+run_maintenance() performs these steps, each in short transactions so booking writes are never
+blocked for much longer than a time budget (FLIGHTS_MAINTENANCE_BUDGET_MS, default 50 ms):
+
+- ANALYZE, one table at a time with PRAGMA analysis_limit, so each table is sampled instead of
+  scanned, followed by PRAGMA optimize.
+- Incremental vacuum: unused pages are returned to the file system a batch at a time, with the batch
+  size adapted to the budget. This needs auto_vacuum=INCREMENTAL, which a full VACUUM has to switch
+  on once. The full VACUUM blocks writers until it is done, so it only runs by itself for small
+  databases (up to FULL_VACUUM_MAX_PAGES used pages); larger ones need full_vacuum=True.
+- quick_check, one table (with its indexes) at a time. A check holds a read lock while it runs
+  and cannot be interrupted, and writers cannot commit meanwhile (except in WAL mode), so tables
+  too large to check within the budget are reported as skipped; full_check=True checks them anyway.
+- A search for orphaned bookings (rows whose flight is not in flights), optionally deleting them.
+- Downsampling of the occupancy history (history.py), a chunk of flights per transaction.
+
+The returned report holds file size and fragmentation (share of free pages) before and after, the
+duration of every step and the longest time a step held a lock. The time of the last completed run
+is stored in the maintenance_runs table, and MaintenanceScheduler runs maintenance in a background
+thread when the app has been idle for a while and that time is long enough ago, also across restarts.
+
+Usage: python maintenance.py [--db flights.sqlite] [--full-vacuum] [--full-check] [--delete-orphans]
+"""
+
+import argparse
+import os
+import sqlite3
+import threading
+import time
+
+import db_queries
+import history
+import instrumentation
+
+# Longest time a single maintenance step may keep writers waiting, in milliseconds
+BUDGET_MS = float(os.environ.get("FLIGHTS_MAINTENANCE_BUDGET_MS", 50))
+
+# How long maintenance waits for booking writes to finish before giving up, in seconds. This is
+# independent of the budget: maintenance may wait for writers, writers should not wait for it.
+BUSY_TIMEOUT = 30
+
+# Rows ANALYZE samples per index (PRAGMA analysis_limit)
+ANALYSIS_LIMIT = 1000
+
+# A full VACUUM (needed once to enable incremental vacuum) runs by itself only up to this many used pages
+FULL_VACUUM_MAX_PAGES = 2000
+
+# Rows quick_check gets through per millisecond (table and indexes), used to decide which tables
+# can be checked within the budget; measured at about 6000 on the 20 000 flight benchmark database
+CHECK_ROWS_PER_MS = 4000
+
+# Longest time an incremental vacuum run keeps going, waiting for writers included, in seconds
+VACUUM_TIME_LIMIT = 30
+
+# Orphaned flights are listed up to this many
+ORPHAN_LIST_LIMIT = 100
+
+SCHEMA = [
+    # A single row with the time the last maintenance run completed
+    """
+    CREATE TABLE IF NOT EXISTS maintenance_runs (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        last_run REAL NOT NULL
+    );
+    """,
+]
+
+
+def ensure_schema(conn):
+    """
+    Creates the maintenance_runs table if it does not exist yet.
+
+    :param conn: An open connection to the database.
+    """
+    with conn:
+        for sql in SCHEMA:
+            conn.execute(sql)
+
+
+def last_run_time(db_path):
+    """
+    Returns when maintenance last completed on a database.
+
+    :param db_path: Path to the SQLite database file.
+    :return: Time in seconds since the epoch, 0.0 if it never ran.
+    """
+    conn = instrumentation.connect(db_path)
+    try:
+        row = conn.execute("SELECT last_run FROM maintenance_runs WHERE id = 1;").fetchone()
+    except sqlite3.OperationalError:
+        return 0.0
+    finally:
+        conn.close()
+    return row[0] if row else 0.0
+
+
+def file_stats(conn):
+    """
+    Returns size information of the database.
+
+    :param conn: An open connection to the database.
+    :return: Dictionary with "file_size" in bytes, "page_count", "freelist_count" and
+             "fragmentation" (share of pages that are free).
+    """
+    page_size = conn.execute("PRAGMA page_size;").fetchone()[0]
+    page_count = conn.execute("PRAGMA page_count;").fetchone()[0]
+    freelist_count = conn.execute("PRAGMA freelist_count;").fetchone()[0]
+    return {
+        "file_size": page_size * page_count,
+        "page_count": page_count,
+        "freelist_count": freelist_count,
+        "fragmentation": freelist_count / page_count if page_count else 0.0,
+    }
+
+
+def orphaned_flights(conn):
+    """
+    Returns the flight numbers that have bookings but no row in flights.
+
+    The distinct flights of bookings are read with one index lookup each instead of a single scan,
+    so no statement keeps writers waiting for long.
+    """
+    flight_ids = {row[0] for row in conn.execute("SELECT flight_id FROM flights;")}
+    orphans = []
+    flight = conn.execute("SELECT MIN(flight) FROM bookings;").fetchone()[0]
+    while flight is not None:
+        if str(flight) not in flight_ids:
+            orphans.append(flight)
+        flight = conn.execute("SELECT MIN(flight) FROM bookings WHERE flight > ?;", (flight,)).fetchone()[0]
+    return orphans
+
+
+def analyze(conn, report):
+    """
+    Refreshes the query planner statistics one table at a time.
+    """
+    conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT};")
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%';")]
+    for table in tables:
+        # Names come from sqlite_master, quoting covers any unusual characters
+        table = table.replace('"', '""')
+        _write_step(conn, report, f"analyze {table}", f'ANALYZE "{table}";')
+    _write_step(conn, report, "optimize", "PRAGMA optimize;")
+
+
+def incremental_vacuum(conn, report, full_vacuum=False):
+    """
+    Frees unused pages in batches sized to the time budget. Switches the database to
+    auto_vacuum=INCREMENTAL first if allowed (see the module docstring).
+    """
+    stats = file_stats(conn)
+    if stats["freelist_count"] == 0:
+        return
+
+    if conn.execute("PRAGMA auto_vacuum;").fetchone()[0] != 2:
+        used_pages = stats["page_count"] - stats["freelist_count"]
+        if not full_vacuum and used_pages > FULL_VACUUM_MAX_PAGES:
+            report["notes"].append(f"Incremental vacuum is off and the database has {used_pages} used pages; "
+                                   f"run once with full_vacuum=True (blocks writers) to enable it.")
+            return
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+        start = time.perf_counter()
+        conn.execute("VACUUM;")
+        elapsed = time.perf_counter() - start
+        report["steps"].append(("full vacuum", elapsed, elapsed * 1000))
+        return
+
+    pages = 64
+    deadline = time.perf_counter() + VACUUM_TIME_LIMIT
+    while conn.execute("PRAGMA freelist_count;").fetchone()[0] > 0:
+        if time.perf_counter() > deadline:
+            report["notes"].append("Incremental vacuum stopped at its time limit; the next run continues.")
+            break
+        # A cursor steps this pragma only once, which frees a single page; executescript runs it to the
+        # end. The trace callback notes when the pragma starts, i.e. once BEGIN IMMEDIATE has the lock.
+        started = []
+        conn.set_trace_callback(lambda sql: "incremental_vacuum" in sql and started.append(time.perf_counter()))
+        try:
+            conn.executescript(f"BEGIN IMMEDIATE; PRAGMA incremental_vacuum({pages}); COMMIT;")
+        finally:
+            conn.set_trace_callback(None)
+        elapsed = time.perf_counter() - started[0]
+        report["steps"].append((f"incremental vacuum {pages} pages", elapsed, elapsed * 1000))
+        elapsed_ms = elapsed * 1000
+
+        # Aim for half the budget per batch
+        if elapsed_ms > 0:
+            pages = max(16, min(65536, int(pages * BUDGET_MS / 2 / elapsed_ms)))
+        time.sleep(BUDGET_MS / 1000)
+
+
+def quick_check(conn, report, full_check=False):
+    """
+    Runs PRAGMA quick_check on one table (with its indexes) at a time. A check cannot be
+    interrupted, so a table is only checked if its row count (from the statistics of ANALYZE)
+    suggests it fits the time budget, unless full_check is True or the database is in WAL mode
+    (readers do not block writers there). Skipped tables are listed in report["check_skipped"].
+    """
+    messages = []
+    report["check_skipped"] = []
+    wal = conn.execute("PRAGMA journal_mode;").fetchone()[0] == "wal"
+    rows = _table_rows(conn)
+    for table in sorted(rows):
+        if not (full_check or wal) and rows[table] / CHECK_ROWS_PER_MS > BUDGET_MS:
+            report["check_skipped"].append(table)
+            continue
+
+        # Take the read lock first, so waiting for a writer is not counted as check time
+        conn.execute("BEGIN;")
+        try:
+            conn.execute("SELECT 1 FROM sqlite_master LIMIT 1;").fetchall()
+            start = time.perf_counter()
+            # Names come from sqlite_master, escaping covers any unusual characters
+            messages.extend(row[0] for row in conn.execute(f"PRAGMA quick_check('{table.replace(chr(39), chr(39) * 2)}');"))
+            elapsed = time.perf_counter() - start
+        finally:
+            conn.commit()
+        report["steps"].append((f"quick_check {table}", elapsed, 0.0 if wal else elapsed * 1000))
+
+    report["quick_check"] = [message for message in messages if message != "ok"] or ["ok"]
+    if report["check_skipped"]:
+        report["notes"].append(f"Too large to check within the budget: {', '.join(report['check_skipped'])}; "
+                               f"run with full_check=True (blocks writers) to check them.")
+
+
+def _table_rows(conn):
+    """
+    Returns the estimated number of rows of every table, from sqlite_stat1 (written by ANALYZE).
+    Tables without statistics are empty and count as 0.
+    """
+    tables = [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%';")]
+    estimates = {}
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1';").fetchone():
+        for table, stat in conn.execute("SELECT tbl, stat FROM sqlite_stat1;"):
+            estimates[table] = max(estimates.get(table, 0), int(stat.split()[0]))
+    return {table: estimates.get(table, 0) for table in tables}
+
+
+def run_maintenance(db_path, full_vacuum=False, full_check=False, delete_orphans=False):
+    """
+    Run all maintenance steps on a database.
+
+    :param db_path: Path to the SQLite database file.
+    :param full_vacuum: Allow a full VACUUM to enable incremental vacuum on a large database.
+    :param full_check: Check tables whose integrity check takes longer than the budget, too.
+    :param delete_orphans: Delete orphaned bookings instead of only reporting them.
+    :return: Dictionary with "before" and "after" (see file_stats), "steps" (list of (name, seconds,
+             milliseconds writers were blocked)), "max_lock_ms", "quick_check" (list of messages,
+             ["ok"] if intact), "check_skipped", "orphaned_flights", "orphaned_count",
+             "orphaned_deleted", "history_rows" (occupancy history points before and after
+             downsampling) and "notes".
+    """
+    report = {"steps": [], "notes": [], "orphaned_deleted": 0}
+    conn = instrumentation.connect(db_path, timeout=BUSY_TIMEOUT)
+    try:
+        report["before"] = file_stats(conn)
+
+        analyze(conn, report)
+        incremental_vacuum(conn, report, full_vacuum)
+        quick_check(conn, report, full_check)
+
+        orphans = orphaned_flights(conn)
+        report["orphaned_flights"] = orphans[:ORPHAN_LIST_LIMIT]
+        report["orphaned_count"] = len(orphans)
+        if orphans and delete_orphans:
+            for flight in orphans:
+                _write_step(conn, report, f"delete orphaned bookings of {flight}", "DELETE FROM bookings WHERE flight = ?;",
+                            (flight,))
+            report["orphaned_deleted"] = len(orphans)
+
+        start = time.perf_counter()
+        downsampled = history.downsample(conn, budget_ms=BUDGET_MS)
+        report["steps"].append(("downsample occupancy history", time.perf_counter() - start,
+                                downsampled["max_chunk_seconds"] * 1000))
+        report["history_rows"] = (downsampled["rows_before"], downsampled["rows_after"])
+
+        report["after"] = file_stats(conn)
+
+        ensure_schema(conn)
+        with conn:
+            conn.execute("INSERT OR REPLACE INTO maintenance_runs (id, last_run) VALUES (1, ?);", (time.time(),))
+    finally:
+        conn.close()
+
+    report["max_lock_ms"] = max((lock_ms for _, _, lock_ms in report["steps"]), default=0.0)
+    return report
+
+
+def format_report(report):
+    """
+    Returns a text summary of a maintenance report.
+    """
+    def size(stats):
+        return f"{stats['file_size'] / 2**20:.1f} MiB, {stats['freelist_count']}/{stats['page_count']} pages free " \
+               f"({stats['fragmentation']:.0%})"
+
+    lines = [f"Before: {size(report['before'])}", f"After:  {size(report['after'])}"]
+    for name, seconds, lock_ms in report["steps"]:
+        lines.append(f"  {name:40s} {seconds * 1000:9.1f} ms (writers blocked up to {lock_ms:.1f} ms)")
+    lines.append(f"Longest block of writers: {report['max_lock_ms']:.1f} ms (budget {BUDGET_MS:g} ms)")
+    lines.append(f"quick_check: {', '.join(report['quick_check'])}")
+    lines.append(f"Orphaned bookings: {report['orphaned_count']} flight(s)"
+                 + (", deleted" if report["orphaned_deleted"] else "")
+                 + (f": {', '.join(map(str, report['orphaned_flights']))}" if report["orphaned_flights"] else ""))
+    lines.append(f"Occupancy history: {report['history_rows'][0]} points, {report['history_rows'][1]} after downsampling")
+    lines.extend(report["notes"])
+    return "\n".join(lines)
+
+
+def _write_step(conn, report, name, sql, parameters=()):
+    """
+    Runs one statement in its own write transaction, records its duration and returns it in milliseconds.
+
+    The transaction takes the write lock right away (BEGIN IMMEDIATE): a statement that starts as a
+    reader and then needs to write fails at once, without waiting, if a booking is being written
+    at the same time.
+    """
+    conn.execute("BEGIN IMMEDIATE;")
+    start = time.perf_counter()
+    try:
+        conn.execute(sql, parameters).fetchall()
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    elapsed = time.perf_counter() - start
+    report["steps"].append((name, elapsed, elapsed * 1000))
+    return elapsed * 1000
+
+
+class MaintenanceScheduler:
+    """
+    Runs maintenance in a background thread when the app is idle and the last run is old enough.
+
+    Methods:
+        __init__(db_path, interval, idle_seconds): Creates the scheduler, starting from the last completed run.
+        touch(): Records user activity.
+        maybe_run(): Starts a run if one is due and the app is idle.
+    """
+    def __init__(self, db_path, interval=24 * 60 * 60, idle_seconds=60):
+        self.db_path = db_path
+        self.interval = interval
+        self.idle_seconds = idle_seconds
+
+        self.last_activity = time.time()
+        # Last completed run (from the database), then the last run started by this process
+        self.last_run = last_run_time(db_path)
+        self.last_report = None
+        self._thread = None
+
+    def touch(self):
+        """
+        Record user activity; maintenance waits until the app has been idle for idle_seconds.
+        """
+        self.last_activity = time.time()
+
+    def maybe_run(self):
+        """
+        Start a maintenance run in the background if one is due, the app is idle and none is running.
+
+        :return: True if a run was started.
+        """
+        now = time.time()
+        if self._thread is not None and self._thread.is_alive():
+            return False
+        if now - self.last_run < self.interval or now - self.last_activity < self.idle_seconds:
+            return False
+
+        self.last_run = now
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return True
+
+    def _run(self):
+        try:
+            self.last_report = run_maintenance(self.db_path)
+        except sqlite3.Error as e:
+            # Busy or locked by a long transaction elsewhere; try again at the next interval
+            self.last_report = {"error": str(e)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run database maintenance")
+    parser.add_argument("--db", default=db_queries.db_path, help="database to maintain")
+    parser.add_argument("--full-vacuum", action="store_true", help="allow a full VACUUM to enable incremental vacuum")
+    parser.add_argument("--full-check", action="store_true", help="check all tables, however long it takes")
+    parser.add_argument("--delete-orphans", action="store_true", help="delete bookings of flights that do not exist")
+    args = parser.parse_args()
+
+    print(format_report(run_maintenance(args.db, args.full_vacuum, args.full_check, args.delete_orphans)))
+
+
+if __name__ == "__main__":
+    main()
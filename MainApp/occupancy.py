@@ -0,0 +1,201 @@
+"""
+Occupancy index and flight search.
+
+The flight_occupancy table holds one row per flight with its aircraft code, number of seats, number
+of free seats and the largest block of adjacent free seats in one row (see seating.py). Triggers on
+bookings and flights keep the seat counts up to date on every book, cancel, seat grid insert and
+flight deletion, from any process. The largest block needs the aircraft layout, so the triggers only
+mark it as unknown (NULL); it is recomputed for those flights before the next search that needs it.
+"""
+
+import threading
+
+import db_queries
+import seating
+
+# Columns search results can be sorted by
+SORT_COLUMNS = ("flight_id", "aircraft_code", "total_seats", "free_seats", "max_block")
+
+# Rows per transaction when filling in the largest blocks
+REFRESH_CHUNK_SIZE = 5000
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS flight_occupancy (
+        flight_id TEXT PRIMARY KEY,
+        aircraft_code TEXT,
+        total_seats INTEGER NOT NULL DEFAULT 0,
+        free_seats INTEGER NOT NULL DEFAULT 0,
+        max_block INTEGER,
+        FOREIGN KEY (flight_id) REFERENCES flights(flight_id)
+    );
+    """,
+    "CREATE INDEX IF NOT EXISTS flight_occupancy_aircraft ON flight_occupancy (aircraft_code, free_seats);",
+    "CREATE INDEX IF NOT EXISTS flight_occupancy_free ON flight_occupancy (free_seats);",
+    "CREATE INDEX IF NOT EXISTS flight_occupancy_block ON flight_occupancy (max_block);",
+    """
+    CREATE TRIGGER IF NOT EXISTS flight_occupancy_insert AFTER INSERT ON bookings
+    BEGIN
+        INSERT INTO flight_occupancy (flight_id, aircraft_code, total_seats, free_seats, max_block)
+        VALUES (CAST(NEW.flight AS TEXT),
+                (SELECT aircraft_code FROM flights WHERE flight_id = CAST(NEW.flight AS TEXT)),
+                1, NEW.booker IS NULL, NULL)
+        ON CONFLICT (flight_id) DO UPDATE SET
+            total_seats = total_seats + 1,
+            free_seats = free_seats + (NEW.booker IS NULL),
+            max_block = NULL;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS flight_occupancy_update AFTER UPDATE OF booker ON bookings
+    WHEN (OLD.booker IS NULL) != (NEW.booker IS NULL)
+    BEGIN
+        UPDATE flight_occupancy
+        SET free_seats = free_seats + (NEW.booker IS NULL) - (OLD.booker IS NULL), max_block = NULL
+        WHERE flight_id = CAST(NEW.flight AS TEXT);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS flight_occupancy_delete AFTER DELETE ON bookings
+    BEGIN
+        UPDATE flight_occupancy
+        SET total_seats = total_seats - 1, free_seats = free_seats - (OLD.booker IS NULL), max_block = NULL
+        WHERE flight_id = CAST(OLD.flight AS TEXT);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS flight_occupancy_flight_delete AFTER DELETE ON flights
+    BEGIN
+        DELETE FROM flight_occupancy WHERE flight_id = OLD.flight_id;
+    END;
+    """,
+]
+
+# Databases (by path) whose schema was already checked by this process
+_initialized = set()
+# Keeps two threads (e.g. the warm-up in warmup.py and a search) from filling the table twice
+_init_lock = threading.Lock()
+
+
+def ensure_index():
+    """
+    Creates the occupancy table and its triggers if they do not exist yet, and fills the table from
+    the bookings the first time.
+    """
+    if db_queries.db_path in _initialized:
+        return
+
+    with _init_lock:
+        if db_queries.db_path in _initialized:
+            return
+
+        conn = db_queries.get_connection()
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'flight_occupancy';").fetchone()
+
+        with conn:
+            for sql in SCHEMA:
+                conn.execute(sql)
+            if not exists:
+                conn.execute("""
+                INSERT INTO flight_occupancy (flight_id, aircraft_code, total_seats, free_seats, max_block)
+                SELECT f.flight_id, f.aircraft_code, COUNT(b.seat_number), COALESCE(SUM(b.booker IS NULL), 0), NULL
+                FROM flights f LEFT JOIN bookings b ON b.flight = f.flight_id
+                GROUP BY f.flight_id;
+                """)
+
+        refresh_blocks()
+        _initialized.add(db_queries.db_path)
+
+
+def refresh_blocks():
+    """
+    Recomputes the largest free block of every flight where it is unknown.
+
+    Each chunk is read and written inside one IMMEDIATE transaction, so no booking can change a
+    flight between reading its seats and storing its block. The write lock is only taken if some
+    block is unknown, so searches do not queue behind writers when there is nothing to do.
+
+    :return: Number of flights updated.
+    """
+    conn = db_queries.get_connection()
+    updated = 0
+
+    while True:
+        # Read outside a transaction, through the flight_occupancy_block index
+        if not conn.execute("SELECT 1 FROM flight_occupancy WHERE max_block IS NULL LIMIT 1;").fetchone():
+            return updated
+
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            dirty = conn.execute("""
+            SELECT o.flight_id, o.total_seats, a.layout, a.row_number
+            FROM flight_occupancy o JOIN aircrafts a ON a.code = o.aircraft_code
+            WHERE o.max_block IS NULL LIMIT ?;
+            """, (REFRESH_CHUNK_SIZE,)).fetchall()
+
+            updates = []
+            for flight_id, total_seats, layout, row_number in dirty:
+                if total_seats == 0:
+                    updates.append((0, flight_id))
+                    continue
+                booked = conn.execute("SELECT seat_number FROM bookings WHERE flight = ? AND booker IS NOT NULL;", (flight_id,))
+                masks = seating.occupancy_masks(layout, row_number, (row[0] for row in booked))
+                updates.append((seating.largest_free_block(layout, masks), flight_id))
+
+            conn.executemany("UPDATE flight_occupancy SET max_block = ? WHERE flight_id = ?;", updates)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        updated += len(dirty)
+        if len(dirty) < REFRESH_CHUNK_SIZE:
+            return updated
+
+
+def search_flights(aircraft_code=None, min_free=0, min_block=0, sort="flight_id", descending=False, page=1, page_size=20):
+    """
+    Searches flights by aircraft type and free seats.
+
+    :param aircraft_code: Only flights with this aircraft (None for any).
+    :param min_free: Minimum number of free seats.
+    :param min_block: Minimum size of the largest block of adjacent free seats in one row.
+    :param sort: Column to sort by, one of SORT_COLUMNS.
+    :param descending: Sort in descending order.
+    :param page: Page number, starting at 1.
+    :param page_size: Results per page.
+    :return: Tuple (rows, total) with rows as (flight_id, aircraft_code, total_seats, free_seats, max_block)
+             tuples and total the number of matching flights over all pages.
+    :raises ValueError: If the sort column is unknown.
+    """
+    if sort not in SORT_COLUMNS:
+        raise ValueError(f"Unknown sort column '{sort}'.")
+
+    ensure_index()
+    if min_block > 0:
+        refresh_blocks()
+
+    conditions = ["free_seats >= ?"]
+    params = [min_free]
+    if aircraft_code:
+        conditions.append("aircraft_code = ?")
+        params.append(aircraft_code)
+    if min_block > 0:
+        conditions.append("max_block >= ?")
+        params.append(min_block)
+    where_clause = " AND ".join(conditions)
+
+    conn = db_queries.get_connection()
+    total = conn.execute(f"SELECT COUNT(*) FROM flight_occupancy WHERE {where_clause};", params).fetchone()[0]
+
+    order = "DESC" if descending else "ASC"
+    rows = conn.execute(
+        f"""
+        SELECT flight_id, aircraft_code, total_seats, free_seats, max_block
+        FROM flight_occupancy WHERE {where_clause}
+        ORDER BY {sort} {order}, flight_id {order} LIMIT ? OFFSET ?;
+        """,
+        params + [page_size, (max(page, 1) - 1) * page_size]).fetchall()
+
+    return rows, total
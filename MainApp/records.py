@@ -0,0 +1,43 @@
+"""
+Typed records for the rows of the main tables.
+
+Records are namedtuples, so fields are read by name (booking.seat_number instead of booking[1]),
+while code that still indexes rows by position keeps working. A namedtuple takes no more memory than
+the plain tuple sqlite3 returns, unlike sqlite3.Row or dicts (see benchmarks/bench_records.py).
+
+row_factory() builds records directly with tuple.__new__, which skips the argument handling of the
+generated constructor; db_queries.fetch_records sets it on the cursors it reads records with.
+"""
+
+from collections import namedtuple
+
+Flight = namedtuple("Flight", "flight_id aircraft_code")
+Aircraft = namedtuple("Aircraft", "code layout row_number")
+Booking = namedtuple("Booking", "flight seat_number booker")
+User = namedtuple("User", "username name password user_type")
+
+# Table name -> record type; the record fields are the columns selected for it
+TABLES = {
+    "flights": Flight,
+    "aircrafts": Aircraft,
+    "bookings": Booking,
+    "users": User,
+}
+
+
+def row_factory(record):
+    """
+    Returns a row factory for sqlite3 that turns rows into the given record type. The rows must
+    have the record's fields as columns, in order.
+
+    :param record: One of the record types, e.g. Booking.
+    """
+    new = tuple.__new__
+
+    def factory(cursor, row):
+        return new(record, row)
+    return factory
+
+
+# Table name -> row factory, built once
+FACTORIES = {table: row_factory(record) for table, record in TABLES.items()}
@@ -0,0 +1,225 @@
+"""
+In-memory read replica for statistics.
+
+Long statistics queries on flights.sqlite hold a read lock that makes booking writes wait. A
+StatsReplica copies the database into memory with the SQLite online backup API, a few pages per
+step with short pauses in between, so writers only ever wait for one step. Statistics functions
+(stats.py, export.py) then run against the replica's path instead of the file.
+
+A stepwise copy starts over whenever another connection commits to the source, so under a steady
+stream of bookings it may never finish. After BACKUP_MAX_RESTARTS restarts the copy is made in one
+step instead, which holds the read lock for the whole copy (writers wait for it once) but always
+completes.
+
+There are two in-memory databases that are used alternately: a refresh fills the one nobody is
+reading and then switches over, so readers never see a half-copied database. A refresh is skipped
+when the source has not changed since the last one (PRAGMA data_version), and postponed while a
+report that started two refreshes ago is still reading the inactive database. start() refreshes
+from a background thread; path() never copies, it returns the current copy at once, so callers on
+the UI thread are never held up by a refresh. A busy source can make the copy older than the
+staleness bound; age() and metrics() tell by how much.
+"""
+
+import itertools
+import sqlite3
+import threading
+import time
+
+# Pages copied per backup step and pause between steps in seconds
+BACKUP_PAGES = 256
+BACKUP_PAUSE = 0.001
+
+# Restarts of a stepwise copy (caused by commits to the source) before copying in one step
+BACKUP_MAX_RESTARTS = 3
+
+# Gives every replica its own pair of in-memory database names
+_counter = itertools.count()
+
+
+class _TooManyRestarts(Exception):
+    """
+    Raised from the backup progress callback to abandon a stepwise copy.
+    """
+
+
+class StatsReplica:
+    """
+    Keeps an in-memory copy of a database no older than max_staleness seconds.
+
+    Methods:
+        __init__(source_path, max_staleness): Creates the replica (empty until the first refresh).
+        path(): Returns the path of the current copy without waiting for a refresh.
+        age(): Returns the seconds since the replica last matched the source.
+        refresh(): Copies the source database into the replica if it changed.
+        metrics(): Returns the refresh counters.
+        start(interval): Refreshes the replica periodically in a background thread.
+        stop(): Stops the background thread.
+        close(): Frees the in-memory databases.
+    """
+    def __init__(self, source_path, max_staleness=30):
+        self.source_path = source_path
+        self.max_staleness = max_staleness
+
+        number = next(_counter)
+        self.paths = [f"file:stats_replica_{number}_{i}?mode=memory&cache=shared" for i in (0, 1)]
+
+        # Keep one connection open to each in-memory database, otherwise it is freed
+        self._keepers = [sqlite3.connect(path, uri=True, check_same_thread=False) for path in self.paths]
+        self._current = None
+        self._refreshed_at = 0.0
+
+        # Connection used to read the source's data_version between refreshes
+        self._source = sqlite3.connect(source_path, check_same_thread=False)
+        self._source_version = None
+
+        # Refresh counters (see metrics)
+        self.copies = 0
+        self.unchanged = 0
+        self.failures = 0
+        self.restarts = 0
+        self.single_step_copies = 0
+
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+
+    def path(self):
+        """
+        Returns the path of the current copy, or the source database's path until the first copy
+        was made. Never waits for a refresh. Pass it as db_path to the functions in stats.py or export.py.
+        """
+        current = self._current
+        if current is None:
+            return self.source_path
+        return self.paths[current]
+
+    def age(self):
+        """
+        Returns the number of seconds since the replica was last known to match the source.
+        """
+        return time.time() - self._refreshed_at
+
+    def refresh(self):
+        """
+        Copy the source database into the inactive in-memory database and switch to it.
+        Nothing is copied if the source did not change since the last refresh.
+
+        :return: True if a copy was made, False if the source did not change or the source or
+                 the inactive database is locked.
+        """
+        with self._lock:
+            started = time.time()
+            try:
+                version = self._data_version()
+            except sqlite3.OperationalError as e:
+                # A writer is waiting for the readers of the source to finish; try again next time
+                if "locked" not in str(e):
+                    raise
+                self.failures += 1
+                return False
+            if self._current is not None and version == self._source_version:
+                self._refreshed_at = started
+                self.unchanged += 1
+                return False
+
+            target = 1 if self._current == 0 else 0
+            source = sqlite3.connect(self.source_path)
+            destination = sqlite3.connect(self.paths[target], uri=True)
+            try:
+                try:
+                    source.backup(destination, pages=BACKUP_PAGES, progress=self._progress())
+                except _TooManyRestarts:
+                    self.single_step_copies += 1
+                    source.backup(destination, pages=-1)
+            except sqlite3.OperationalError as e:
+                # A reader still has the inactive database open in a transaction, or the source is
+                # locked by a writer; try again next time
+                if "locked" not in str(e):
+                    raise
+                self.failures += 1
+                return False
+            finally:
+                destination.close()
+                source.close()
+
+            self._current = target
+            self._source_version = version
+            self._refreshed_at = started
+            self.copies += 1
+            return True
+
+    def metrics(self):
+        """
+        Returns the refresh counters.
+
+        :return: Dictionary with copies, unchanged (nothing to copy), failures (source or inactive
+                 database locked), restarts (of stepwise copies), single_step_copies and age.
+        """
+        return {
+            "copies": self.copies,
+            "unchanged": self.unchanged,
+            "failures": self.failures,
+            "restarts": self.restarts,
+            "single_step_copies": self.single_step_copies,
+            "age": self.age(),
+        }
+
+    def start(self, interval=None):
+        """
+        Refresh the replica every interval seconds (default: max_staleness / 2) in a background thread.
+        """
+        if self._thread is not None:
+            return
+        interval = self.max_staleness / 2 if interval is None else interval
+        self._stop.clear()
+
+        def loop():
+            # The first copy is made here too, so start() returns at once
+            self.refresh()
+            while not self._stop.wait(interval):
+                self.refresh()
+
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background refresh thread.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """
+        Stop refreshing and free the in-memory databases.
+        """
+        self.stop()
+        for conn in self._keepers:
+            conn.close()
+        self._source.close()
+
+    def _progress(self):
+        """
+        Returns a backup progress callback that pauses between steps and abandons the copy after
+        BACKUP_MAX_RESTARTS restarts (the number of remaining pages goes up when the backup starts over).
+        """
+        last_remaining = None
+        restarts = 0
+
+        def progress(status, remaining, total):
+            nonlocal last_remaining, restarts
+            if last_remaining is not None and remaining > last_remaining:
+                restarts += 1
+                self.restarts += 1
+                if restarts > BACKUP_MAX_RESTARTS:
+                    raise _TooManyRestarts()
+            last_remaining = remaining
+            time.sleep(BACKUP_PAUSE)
+
+        return progress
+
+    def _data_version(self):
+        # data_version only changes for commits of other connections, which is every writer here
+        return self._source.execute("PRAGMA data_version;").fetchone()[0]
@@ -0,0 +1,155 @@
+"""
+Headless batch reports: an occupancy pie chart per flight plus a statistics file.
+
+Charts are rendered with the Agg canvas (no display needed) across a pool of worker processes. They
+are cached by content: a chart is stored once under the SHA-256 of everything it shows (in
+<output>/.chart_cache/<digest>.png), and flight_<id>.png is a hard link to it. Charts whose
+occupancy did not change since the last run, and flights that look exactly like an already rendered
+one, are not rendered again.
+
+Seat counts come from the occupancy index (occupancy.py), so no bookings are scanned for the charts.
+
+Usage: python reports.py <output folder> [--flights ID ...] [--workers N] [--no-statistics]
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+import db_queries
+import export
+import occupancy
+
+# Part of every chart digest; change it when the look of the charts changes, so they are rendered again
+CHART_VERSION = 1
+
+CACHE_DIR = ".chart_cache"
+
+# Charts handed to a worker process at a time
+CHUNK_SIZE = 32
+
+
+def chart_digest(reserved, available):
+    """
+    Returns the content address of a pie chart: the SHA-256 of its version and data.
+    """
+    return hashlib.sha256(f"pie:{CHART_VERSION}:{reserved}:{available}".encode()).hexdigest()
+
+
+def render_pie_chart(task):
+    """
+    Renders one pie chart of reserved vs. available seats to a PNG file. Runs in a worker process.
+
+    :param task: Tuple (path, reserved, available).
+    :return: The path.
+    """
+    path, reserved, available = task
+
+    figure = Figure(figsize=(4, 4))
+    ax = figure.add_subplot()
+    if reserved + available:
+        ax.pie([reserved, available], labels=['Reserved Seats', 'Available Seats'], colors=['red', 'green'],
+               autopct='%1.1f%%', startangle=90)
+    ax.axis('equal')
+
+    # Write to a temporary file first, so an interrupted run never leaves a broken chart in the cache
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    FigureCanvasAgg(figure).print_png(tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def flight_counts(flight_ids=None):
+    """
+    Returns (flight_id, reserved seats, available seats) of the given flights, or of all flights.
+    Flights that do not exist are left out.
+    """
+    occupancy.ensure_index()
+    conn = db_queries.get_connection()
+    if flight_ids is None:
+        rows = conn.execute("SELECT flight_id, total_seats, free_seats FROM flight_occupancy ORDER BY flight_id;")
+    else:
+        rows = (conn.execute("SELECT flight_id, total_seats, free_seats FROM flight_occupancy WHERE flight_id = ?;",
+                             (str(flight_id),)).fetchone() for flight_id in flight_ids)
+    return [(flight_id, total - free, free) for flight_id, total, free in filter(None, rows)]
+
+
+def render_reports(output_dir, flight_ids=None, workers=None, statistics=True, progress=None):
+    """
+    Render the occupancy chart of every given flight (all flights if None) and write their statistics.
+
+    :param output_dir: Folder for the charts and statistics.csv; created if needed.
+    :param flight_ids: Flight IDs to report on, or None for all flights.
+    :param workers: Number of worker processes (default: one per CPU).
+    :param statistics: Also write statistics.csv with export.export_statistics.
+    :param progress: Optional callback called as progress(done, total) while charts are rendered.
+    :return: Dictionary with "flights", "rendered", "cached" and "seconds" for the charts.
+    """
+    start = time.perf_counter()
+    cache_dir = os.path.join(output_dir, CACHE_DIR)
+    os.makedirs(cache_dir, exist_ok=True)
+
+    counts = flight_counts(flight_ids)
+
+    # One render per distinct chart that is not in the cache yet
+    charts = {}
+    for flight_id, reserved, available in counts:
+        digest = chart_digest(reserved, available)
+        if digest not in charts and not os.path.exists(os.path.join(cache_dir, f"{digest}.png")):
+            charts[digest] = (os.path.join(cache_dir, f"{digest}.png"), reserved, available)
+
+    if charts:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for done, _ in enumerate(pool.map(render_pie_chart, charts.values(), chunksize=CHUNK_SIZE), 1):
+                if progress:
+                    progress(done, len(charts))
+
+    for flight_id, reserved, available in counts:
+        _link(os.path.join(cache_dir, f"{chart_digest(reserved, available)}.png"),
+              os.path.join(output_dir, f"flight_{flight_id}.png"))
+
+    seconds = time.perf_counter() - start
+    if statistics:
+        export.export_statistics(db_queries.db_path, os.path.join(output_dir, "statistics.csv"),
+                                 None if flight_ids is None else [flight_id for flight_id, _, _ in counts])
+
+    return {"flights": len(counts), "rendered": len(charts), "cached": len(counts) - len(charts), "seconds": seconds}
+
+
+def _link(source, target):
+    """
+    Makes target a hard link to source (a copy where hard links are not supported).
+    """
+    if os.path.exists(target) and os.path.samefile(source, target):
+        return
+    tmp_target = f"{target}.tmp"
+    try:
+        os.link(source, tmp_target)
+    except OSError:
+        shutil.copyfile(source, tmp_target)
+    os.replace(tmp_target, target)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render occupancy charts and statistics for many flights")
+    parser.add_argument("output", help="folder for the charts and statistics.csv")
+    parser.add_argument("--flights", nargs="+", help="flight IDs (default: all flights)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: one per CPU)")
+    parser.add_argument("--no-statistics", action="store_true", help="only render the charts")
+    args = parser.parse_args()
+
+    result = render_reports(args.output, args.flights, args.workers, not args.no_statistics)
+    rendered_per_second = result["rendered"] / result["seconds"] if result["seconds"] else 0
+    print(f"{result['flights']} flights: {result['rendered']} charts rendered, {result['cached']} from the cache "
+          f"in {result['seconds']:.1f}s ({rendered_per_second:.0f} charts/s, "
+          f"{result['flights'] / result['seconds']:.0f} flights/s)")
+
+
+if __name__ == "__main__":
+    main()
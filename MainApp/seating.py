@@ -0,0 +1,129 @@
+"""
+Adjacent-seat recommendation for group bookings.
+
+An aircraft layout such as "ABC| |DEGH| |JKL" is split at the aisles into segments ("ABC", "DEGH",
+"JKL"); seats are only adjacent within a segment. For every layout the bit masks of all contiguous
+blocks of each size are computed once and cached. The occupancy of a flight is one integer bit
+mask per row, so checking a block is a single AND and a query needs no database access.
+"""
+
+from functools import lru_cache
+
+
+@lru_cache(maxsize=64)
+def layout_index(layout):
+    """
+    Precomputes the adjacency information of a layout.
+
+    :param layout: The aircraft layout, e.g. "ABC| |DEF".
+    :return: Tuple (columns, blocks) where columns is the string of all column letters in layout order
+             (bit i of a row mask stands for columns[i]) and blocks maps a block size to a list of
+             (first column position, block mask, mask of the seats directly left and right of the
+             block in the same segment) for every contiguous block of that size.
+    """
+    segments = [segment.strip() for segment in layout.split("|") if segment.strip()]
+    columns = "".join(segments)
+
+    blocks = {}
+    offset = 0
+    for segment in segments:
+        for size in range(1, len(segment) + 1):
+            for start in range(len(segment) - size + 1):
+                mask = ((1 << size) - 1) << (offset + start)
+                neighbours = 0
+                if start > 0:
+                    neighbours |= 1 << (offset + start - 1)
+                if start + size < len(segment):
+                    neighbours |= 1 << (offset + start + size)
+                blocks.setdefault(size, []).append((offset + start, mask, neighbours))
+        offset += len(segment)
+
+    return columns, blocks
+
+
+def seat_labels(layout, row_number):
+    """
+    Returns all seat labels of an aircraft, column by column ("1A", "2A", ..., "1B", ...). This is
+    the order in which the bookings rows of a flight are created (db_queries.add_rows_to_bookings,
+    importer.py, benchmarks/generate.py).
+
+    :param layout: The aircraft layout, e.g. "ABC| |DEF".
+    :param row_number: The number of rows.
+    """
+    columns = layout.replace("|", "").replace(" ", "")
+    return [f"{i}{a}" for a in columns for i in range(1, row_number + 1)]
+
+
+def occupancy_masks(layout, row_number, booked_seats):
+    """
+    Turns a list of booked seat numbers into one bit mask per row.
+
+    :param layout: The aircraft layout.
+    :param row_number: The number of rows.
+    :param booked_seats: Iterable of booked seat numbers, e.g. ["1A", "12C"].
+    :return: List with the mask of row r at index r - 1.
+    """
+    columns, _ = layout_index(layout)
+    bit = {col: 1 << i for i, col in enumerate(columns)}
+
+    masks = [0] * row_number
+    for seat in booked_seats:
+        row = int(seat[:-1])
+        if 1 <= row <= row_number and seat[-1] in bit:
+            masks[row - 1] |= bit[seat[-1]]
+    return masks
+
+
+def recommend_seats(layout, masks, party_size):
+    """
+    Finds the best block of contiguous free seats in one row and aisle segment.
+
+    Blocks are ranked by how many free seats they leave unusable next to them in the same segment
+    (fewer is better, so large free stretches are kept for larger groups), then by row and column.
+
+    :param layout: The aircraft layout.
+    :param masks: Occupancy masks as returned by occupancy_masks.
+    :param party_size: The number of seats needed.
+    :return: List of seat numbers, or None if no such block is free.
+    """
+    columns, blocks = layout_index(layout)
+    candidates = blocks.get(party_size)
+    if not candidates:
+        return None
+
+    best = None
+    best_score = None
+    for row, booked in enumerate(masks, start=1):
+        for start, mask, neighbours in candidates:
+            if booked & mask:
+                continue
+            # Free seats next to the block that a later group could no longer use together with it
+            score = bin(neighbours & ~booked).count("1")
+            if best_score is None or score < best_score:
+                best, best_score = (row, start), score
+                if score == 0:
+                    break
+        if best_score == 0:
+            break
+
+    if best is None:
+        return None
+    row, start = best
+    return [f"{row}{col}" for col in columns[start:start + party_size]]
+
+
+def largest_free_block(layout, masks):
+    """
+    Returns the size of the largest block of contiguous free seats in one row and aisle segment.
+
+    :param layout: The aircraft layout.
+    :param masks: Occupancy masks as returned by occupancy_masks.
+    """
+    _, blocks = layout_index(layout)
+    for size in sorted(blocks, reverse=True):
+        block_masks = [mask for _, mask, _ in blocks[size]]
+        for booked in masks:
+            for mask in block_masks:
+                if not booked & mask:
+                    return size
+    return 0
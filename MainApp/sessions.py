@@ -0,0 +1,181 @@
+"""
+Session tokens for logged in users.
+
+A session is issued once at login and carries the username, full name and user type,
+so that later permission checks (e.g. admin-only pages) do not have to query the users table.
+Sessions live in an in-memory LRU and can optionally be mirrored to a SQLite table so that
+other processes (or a headless client) can validate the same token.
+"""
+
+import sqlite3
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+# Default lifetime of a session in seconds
+DEFAULT_TTL = 8 * 60 * 60
+
+# Default maximum number of sessions kept in memory
+DEFAULT_MAX_SESSIONS = 4096
+
+
+class SessionManager:
+    """
+    Issues, validates and revokes session tokens.
+
+    Methods:
+        __init__(ttl, max_sessions, db_path): Creates the manager and, if db_path is given, the sessions table.
+        issue(user): Creates a new session for a user and returns its token.
+        validate(token): Returns the session dictionary for a valid token, None otherwise.
+        is_admin(token): Checks whether a token belongs to a valid admin session.
+        revoke(token): Removes a session.
+        purge_expired(): Removes all expired sessions.
+    """
+    def __init__(self, ttl=DEFAULT_TTL, max_sessions=DEFAULT_MAX_SESSIONS, db_path=None):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.db_path = db_path
+
+        # token -> session dictionary, least recently used first
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+        if db_path is not None:
+            conn = sqlite3.connect(db_path)
+            conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                token TEXT PRIMARY KEY,
+                username TEXT NOT NULL,
+                name TEXT,
+                user_type TEXT,
+                expires_at REAL NOT NULL,
+                FOREIGN KEY (username) REFERENCES users(username)
+            );
+            """)
+            conn.commit()
+            conn.close()
+
+    def issue(self, user):
+        """
+        Create a new session for a user.
+
+        :param user: Dictionary with at least the keys "username" and "user_type" ("name" is optional).
+        :return: The session token.
+        """
+        token = secrets.token_urlsafe(32)
+        session = {
+            "token": token,
+            "username": user["username"],
+            "name": user.get("name"),
+            "user_type": user["user_type"],
+            "expires_at": time.time() + self.ttl,
+        }
+
+        self._remember(session)
+
+        if self.db_path is not None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute(
+                "INSERT INTO sessions (token, username, name, user_type, expires_at) VALUES (?, ?, ?, ?, ?);",
+                (token, session["username"], session["name"], session["user_type"], session["expires_at"]),
+            )
+            conn.commit()
+            conn.close()
+
+        return token
+
+    def validate(self, token):
+        """
+        Look up a session by its token.
+
+        The in-memory LRU is checked first; the SQLite store is only queried on a miss.
+
+        :param token: The session token.
+        :return: The session dictionary, or None if the token is unknown or expired.
+        """
+        if not token:
+            return None
+
+        now = time.time()
+
+        with self._lock:
+            session = self._sessions.get(token)
+            if session is not None:
+                if session["expires_at"] > now:
+                    self._sessions.move_to_end(token)
+                    return session
+                del self._sessions[token]
+
+        if self.db_path is None:
+            return None
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            row = conn.execute(
+                "SELECT username, name, user_type, expires_at FROM sessions WHERE token = ?;", (token,)
+            ).fetchone()
+        finally:
+            conn.close()
+
+        if row is None or row[3] <= now:
+            return None
+
+        session = {"token": token, "username": row[0], "name": row[1], "user_type": row[2], "expires_at": row[3]}
+        self._remember(session)
+        return session
+
+    def is_admin(self, token):
+        """
+        Check whether a token belongs to a valid admin session.
+
+        :param token: The session token.
+        :return: True if the session exists, has not expired and belongs to an admin.
+        """
+        session = self.validate(token)
+        return session is not None and session["user_type"] == "admin"
+
+    def revoke(self, token):
+        """
+        Remove a session, e.g. on log out.
+
+        :param token: The session token.
+        """
+        with self._lock:
+            self._sessions.pop(token, None)
+
+        if self.db_path is not None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("DELETE FROM sessions WHERE token = ?;", (token,))
+            conn.commit()
+            conn.close()
+
+    def purge_expired(self):
+        """
+        Remove all expired sessions from memory and from the SQLite store.
+
+        :return: Number of sessions removed from memory.
+        """
+        now = time.time()
+        with self._lock:
+            expired = [token for token, session in self._sessions.items() if session["expires_at"] <= now]
+            for token in expired:
+                del self._sessions[token]
+
+        if self.db_path is not None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("DELETE FROM sessions WHERE expires_at <= ?;", (now,))
+            conn.commit()
+            conn.close()
+
+        return len(expired)
+
+    def _remember(self, session):
+        """
+        Put a session into the in-memory LRU, evicting the least recently used one if it is full.
+        """
+        with self._lock:
+            self._sessions[session["token"]] = session
+            self._sessions.move_to_end(session["token"])
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
@@ -0,0 +1,411 @@
+"""
+Read-only seat snapshot file for many reader processes on one host.
+
+Every process reading flights.sqlite keeps its own SQLite page cache, so many App or service
+processes hold the same bookings data many times. publish() instead writes the occupancy of all
+flights to one binary file, and SeatSnapshot maps it with mmap: all readers share the same pages of
+the operating system's cache, and seat map and availability reads never touch SQLite.
+
+File layout (little endian, see the struct formats below):
+- header: magic, format version, number of aircraft, number of flights, creation time
+- aircraft table: code, number of rows, seats per row, offset and length of the layout string
+- flight index: one fixed-size entry per flight, sorted by flight ID for binary search, with the
+  aircraft, total and free seats, the flight's bookings version (changes.py) and bitmap offset
+- layout strings
+- bitmaps: per flight, one little endian bit mask per row with bit i set if seat column i (in
+  layout order) is booked, the same masks as seating.occupancy_masks
+
+A new snapshot is written to a temporary file and renamed over the old one, so readers see either
+the old or the new file, never a partial one. Readers check every CHECK_INTERVAL seconds whether
+the file was replaced and map the new one. Held seats are not part of the snapshot.
+
+A snapshot is as old as its creation time. The bookings version of a flight tells how old its seat
+map is: changes.changed_seats(conn, flight_id, version) returns exactly the seats changed since.
+
+Usage: python snapshot.py <snapshot file> [--db flights.sqlite] [--interval 5] [--once]
+"""
+
+import argparse
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+from collections import namedtuple
+
+import db_queries
+import seating
+
+MAGIC = b"SEATSNAP"
+FORMAT_VERSION = 1
+
+# Flight IDs are stored as fixed-size keys (encoded, padded with NUL bytes)
+KEY_SIZE = 16
+
+HEADER = struct.Struct("<8sIIId")                # magic, format version, aircraft, flights, created_at
+AIRCRAFT = struct.Struct("<8sHHII")              # code, rows, seats per row, layout offset, layout length
+FLIGHT = struct.Struct(f"<{KEY_SIZE}sIIIQQ")     # key, aircraft index, total seats, free seats, version, bitmap offset
+
+# Seconds between checks of readers for a replaced snapshot file
+CHECK_INTERVAL = 1.0
+
+SnapshotFlight = namedtuple("SnapshotFlight", "flight_id aircraft_code layout row_number total_seats free_seats version")
+
+# A mapped snapshot file: the map, the file's (inode, mtime), the number of flights, the offset of
+# the flight index and the decoded aircraft table
+_Mapping = namedtuple("_Mapping", "mm identity flight_count flights_offset aircrafts")
+
+
+def _decode_aircraft(mm, index, layouts_offset):
+    """
+    Returns (code, layout, rows, seats per row) of an aircraft in the aircraft table of a snapshot.
+    """
+    code, row_number, seats_per_row, layout_offset, layout_length = AIRCRAFT.unpack_from(
+        mm, HEADER.size + AIRCRAFT.size * index)
+    layout = mm[layouts_offset + layout_offset:layouts_offset + layout_offset + layout_length].decode("utf-8")
+    return code.rstrip(b"\0").decode("utf-8"), layout, row_number, seats_per_row
+
+
+def _key(flight_id):
+    key = str(flight_id).encode("utf-8")
+    if len(key) > KEY_SIZE:
+        raise ValueError(f"Flight ID {flight_id!r} is longer than {KEY_SIZE} bytes.")
+    return key.ljust(KEY_SIZE, b"\0")
+
+
+def build(conn):
+    """
+    Builds the contents of a snapshot from one consistent read of the database.
+
+    :param conn: An open connection to the database (not inside a transaction).
+    :return: The snapshot as bytes.
+    """
+    conn.execute("BEGIN;")
+    try:
+        aircrafts = conn.execute("SELECT code, layout, row_number FROM aircrafts ORDER BY code;").fetchall()
+        flights = conn.execute("SELECT flight_id, aircraft_code FROM flights;").fetchall()
+        # One row per flight with its number of seats and its booked seats, so that millions of
+        # bookings do not become millions of Python rows
+        seats = {str(flight): (total, booked.split(",") if booked else ()) for flight, total, booked in conn.execute("""
+        SELECT flight, COUNT(*), group_concat(CASE WHEN booker IS NOT NULL THEN seat_number END)
+        FROM bookings GROUP BY flight;
+        """)}
+        versions = {}
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'flight_versions';").fetchone():
+            versions = dict(conn.execute("SELECT flight_id, version FROM flight_versions;"))
+    finally:
+        conn.rollback()
+
+    # Aircraft table and layout strings
+    aircraft_index = {}
+    layouts = bytearray()
+    aircraft_entries = []
+    for i, (code, layout, row_number) in enumerate(aircrafts):
+        layout_columns, _ = seating.layout_index(layout)
+        encoded = layout.encode("utf-8")
+        aircraft_entries.append((code.encode("utf-8"), row_number, len(layout_columns), len(layouts), len(encoded)))
+        aircraft_index[code] = i
+        layouts += encoded
+
+    # Flights with an unknown aircraft have no seat map and are left out
+    flights = sorted(((_key(flight_id), flight_id, aircraft_index[code])
+                      for flight_id, code in flights if code in aircraft_index))
+
+    flights_offset = HEADER.size + AIRCRAFT.size * len(aircraft_entries)
+    layouts_offset = flights_offset + FLIGHT.size * len(flights)
+    bitmap_offset = layouts_offset + len(layouts)
+
+    # Bitmap position of every flight
+    positions = {}
+    for _, flight_id, index in flights:
+        row_number, seats_per_row = aircraft_entries[index][1], aircraft_entries[index][2]
+        positions[str(flight_id)] = bitmap_offset
+        bitmap_offset += row_number * ((seats_per_row + 7) // 8)
+
+    data = bytearray(bitmap_offset)
+    HEADER.pack_into(data, 0, MAGIC, FORMAT_VERSION, len(aircraft_entries), len(flights), time.time())
+    for i, entry in enumerate(aircraft_entries):
+        AIRCRAFT.pack_into(data, HEADER.size + AIRCRAFT.size * i, *entry)
+    data[layouts_offset:layouts_offset + len(layouts)] = layouts
+
+    for i, (key, flight_id, index) in enumerate(flights):
+        flight_id = str(flight_id)
+        _, row_number, seats_per_row, _, _ = aircraft_entries[index]
+        row_bytes = (seats_per_row + 7) // 8
+        position = positions[flight_id]
+
+        total, booked = seats.get(flight_id, (0, ()))
+        booked_count = 0
+        masks = seating.occupancy_masks(aircrafts[index][1], row_number, booked)
+        for row, mask in enumerate(masks):
+            if mask:
+                start = position + row * row_bytes
+                data[start:start + row_bytes] = mask.to_bytes(row_bytes, "little")
+                booked_count += bin(mask).count("1")
+
+        FLIGHT.pack_into(data, flights_offset + FLIGHT.size * i, key, index, total,
+                         max(total - booked_count, 0), versions.get(flight_id, 0), position)
+    return bytes(data)
+
+
+def publish(db_path, path):
+    """
+    Writes a new snapshot of a database and atomically replaces the file at path with it.
+
+    :param db_path: Path to the database.
+    :param path: Path of the snapshot file.
+    :return: Size of the snapshot in bytes.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        data = build(conn)
+    finally:
+        conn.close()
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return len(data)
+
+
+class SeatSnapshot:
+    """
+    Reads a snapshot file through a read-only memory map.
+
+    Methods:
+        __init__(path): Maps the snapshot file.
+        flight(flight_id): Returns a flight's aircraft, layout, seat counts and version.
+        masks(flight_id): Returns a flight's occupancy masks, one per row.
+        booked_seats(flight_id): Returns the booked seat numbers of a flight.
+        created_at(): Returns the time the snapshot was written.
+        reload(): Maps the file again if it was replaced.
+        close(): Unmaps the file.
+    """
+    def __init__(self, path):
+        self.path = path
+        # The mapped file with what was decoded from it, replaced as a whole by reload(), so a
+        # lookup that holds it reads everything from the same file
+        self._mapping = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload()
+
+    def flight(self, flight_id):
+        """
+        Returns a SnapshotFlight (flight_id, aircraft_code, layout, row_number, total_seats,
+        free_seats, version), or None if the flight is not in the snapshot.
+        """
+        mapping, entry = self._find(flight_id)
+        if entry is None:
+            return None
+        return self._flight(mapping, flight_id, entry)
+
+    def masks(self, flight_id):
+        """
+        Returns the occupancy masks of a flight (see seating.occupancy_masks), or None if the flight
+        is not in the snapshot.
+        """
+        mapping, entry = self._find(flight_id)
+        if entry is None:
+            return None
+        return self._masks(mapping, entry)
+
+    def booked_seats(self, flight_id):
+        """
+        Returns the booked seat numbers of a flight, or None if the flight is not in the snapshot.
+        """
+        mapping, entry = self._find(flight_id)
+        if entry is None:
+            return None
+        columns, _ = seating.layout_index(self._flight(mapping, flight_id, entry).layout)
+        return [f"{row}{col}" for row, mask in enumerate(self._masks(mapping, entry), start=1) if mask
+                for i, col in enumerate(columns) if mask >> i & 1]
+
+    def created_at(self):
+        """
+        Returns the time (time.time()) the mapped snapshot was written.
+        """
+        return HEADER.unpack_from(self._mapping.mm, 0)[4]
+
+    def reload(self):
+        """
+        Maps the snapshot file again if it was replaced since it was mapped.
+
+        :return: True if a new file was mapped.
+        """
+        with self._lock:
+            self._checked_at = time.monotonic()
+            stat = os.stat(self.path)
+            if self._mapping is not None and (stat.st_ino, stat.st_mtime_ns) == self._mapping.identity:
+                return False
+
+            with open(self.path, "rb") as file:
+                mm = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, format_version, aircraft_count, flight_count, _ = HEADER.unpack_from(mm, 0)
+            if magic != MAGIC or format_version != FORMAT_VERSION:
+                mm.close()
+                raise ValueError(f"{self.path} is not a seat snapshot (format {FORMAT_VERSION}).")
+
+            flights_offset = HEADER.size + AIRCRAFT.size * aircraft_count
+            layouts_offset = flights_offset + FLIGHT.size * flight_count
+            # The old map is not closed: a reader in another thread may still be using it. It is
+            # unmapped when the last reference to it is gone.
+            self._mapping = _Mapping(
+                mm, (stat.st_ino, stat.st_mtime_ns), flight_count, flights_offset,
+                # The aircraft table is tiny, so it is decoded once per file
+                [_decode_aircraft(mm, i, layouts_offset) for i in range(aircraft_count)])
+            return True
+
+    def close(self):
+        """
+        Unmap the snapshot file.
+        """
+        if self._mapping is not None:
+            self._mapping.mm.close()
+            self._mapping = None
+
+    def _find(self, flight_id):
+        """
+        Returns the current mapping and the unpacked flight index entry of a flight in it (binary
+        search), or None for the entry.
+        """
+        if time.monotonic() - self._checked_at > CHECK_INTERVAL:
+            self.reload()
+        mapping = self._mapping
+        try:
+            key = _key(flight_id)
+        except ValueError:
+            return mapping, None
+
+        mm, offset = mapping.mm, mapping.flights_offset
+        low, high = 0, mapping.flight_count
+        while low < high:
+            middle = (low + high) // 2
+            start = offset + FLIGHT.size * middle
+            candidate = mm[start:start + KEY_SIZE]
+            if candidate < key:
+                low = middle + 1
+            elif candidate > key:
+                high = middle
+            else:
+                return mapping, FLIGHT.unpack_from(mm, start)
+        return mapping, None
+
+    @staticmethod
+    def _flight(mapping, flight_id, entry):
+        """
+        Builds the SnapshotFlight of a flight index entry of the mapping.
+        """
+        _, index, total, free, version, _ = entry
+        code, layout, row_number, _ = mapping.aircrafts[index]
+        return SnapshotFlight(str(flight_id), code, layout, row_number, total, free, version)
+
+    @staticmethod
+    def _masks(mapping, entry):
+        """
+        Decodes the row masks of a flight index entry from the mapping.
+        """
+        _, index, _, _, _, position = entry
+        _, _, row_number, seats_per_row = mapping.aircrafts[index]
+        row_bytes = (seats_per_row + 7) // 8
+        mm = mapping.mm
+        return [int.from_bytes(mm[start:start + row_bytes], "little")
+                for start in range(position, position + row_number * row_bytes, row_bytes)]
+
+
+class SnapshotPublisher:
+    """
+    Publishes a snapshot of a database whenever it changed, from a background thread.
+
+    Methods:
+        __init__(db_path, path, interval): Creates the publisher.
+        publish(): Publishes a snapshot if the database changed since the last one.
+        start(): Publishes every interval seconds in a background thread.
+        stop(): Stops the background thread.
+    """
+    def __init__(self, db_path, path, interval=5):
+        self.db_path = db_path
+        self.path = path
+        self.interval = interval
+
+        # Connection used to read the database's data_version between snapshots
+        self._source = sqlite3.connect(db_path, check_same_thread=False)
+        self._version = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def publish(self):
+        """
+        Publish a snapshot, unless the database did not change since the last one.
+
+        :return: True if a snapshot was written.
+        """
+        # data_version only changes for commits of other connections, which is every writer here
+        version = self._source.execute("PRAGMA data_version;").fetchone()[0]
+        if version == self._version and os.path.exists(self.path):
+            return False
+        publish(self.db_path, self.path)
+        self._version = version
+        return True
+
+    def start(self):
+        """
+        Publish a snapshot now and then every interval seconds in a background thread.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def loop():
+            while not self._stop.wait(self.interval):
+                self.publish()
+
+        self.publish()
+        self._thread = threading.Thread(target=loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop the background thread and close the publisher's connection.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self._source.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish seat snapshots of the flights database")
+    parser.add_argument("path", help="snapshot file to write")
+    parser.add_argument("--db", default=db_queries.db_path, help="database to read")
+    parser.add_argument("--interval", type=float, default=5, help="seconds between checks for changes")
+    parser.add_argument("--once", action="store_true", help="publish one snapshot and exit")
+    args = parser.parse_args()
+
+    publisher = SnapshotPublisher(args.db, args.path, args.interval)
+    try:
+        while True:
+            start = time.perf_counter()
+            if publisher.publish():
+                print(f"Published {os.path.getsize(args.path)} bytes in {time.perf_counter() - start:.2f}s")
+            if args.once:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        publisher.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,19 @@
 import sqlite3
 
-def calculate_seat_availability(flight_id, db_path):
+import archive
+import instrumentation
+from holds import active_holds
+
+def calculate_seat_availability(flight_id, db_path, include_archive=False):
     """
     Calculate and output the number and percentage of available and reserved seats for a specific flight.
 
     :param flight_id: The ID of the flight to analyze.
     :param db_path: Path to the SQLite database file.
+    :param include_archive: Also look for the flight in the archive (see archive.py).
     :return: Dictionary with seat statistics or an error message.
     """
-    conn = sqlite3.connect(db_path)
+    conn = archive.connect(db_path) if include_archive else instrumentation.connect(db_path)
     cursor = conn.cursor()
 
     try:
@@ -47,8 +52,9 @@ def calculate_seat_availability(flight_id, db_path):
         cursor.execute("SELECT COUNT(*) FROM bookings WHERE flight = ? AND booker IS NOT NULL", (flight_id,))
         reserved_seats = cursor.fetchone()[0]
 
-        # Step 7: Calculate the number of available seats
+        # Step 7: Calculate the number of available seats and how many of them are currently held
         available_seats = total_seats - reserved_seats
+        held_seats = len(active_holds(conn, flight_id))
 
         # Step 8: Calculate percentages
         reserved_percentage = (reserved_seats / total_seats * 100) if total_seats > 0 else 0
@@ -58,6 +64,7 @@ def calculate_seat_availability(flight_id, db_path):
             "total_seats": total_seats,
             "reserved_seats": reserved_seats,
             "available_seats": available_seats,
+            "held_seats": held_seats,
             "reserved_percentage": reserved_percentage,
             "available_percentage": available_percentage
         }, None
@@ -69,15 +76,16 @@ def calculate_seat_availability(flight_id, db_path):
         conn.close()
 
 
-def list_seat_availability(flight_id, db_path):
+def list_seat_availability(flight_id, db_path, include_archive=False):
     """
     Outputs the list of available and reserved seats for a specific flight.
 
     :param flight_id: The ID of the flight to analyze.
     :param db_path: Path to the SQLite database file.
+    :param include_archive: Also look for the flight in the archive (see archive.py).
     :return: Dictionary with lists of reserved and available seats or an error message.
     """
-    conn = sqlite3.connect(db_path)
+    conn = archive.connect(db_path) if include_archive else instrumentation.connect(db_path)
     cursor = conn.cursor()
 
     try:
@@ -113,12 +121,14 @@ def list_seat_availability(flight_id, db_path):
         cursor.execute("SELECT seat_number FROM bookings WHERE flight = ? AND booker IS NOT NULL", (flight_id,))
         reserved_seats = [row[0] for row in cursor.fetchall()]
 
-        # Step 4: Calculate available seats
+        # Step 4: Calculate available seats and which of them are currently held
         available_seats = list(set(all_seats) - set(reserved_seats))
+        held_seats = active_holds(conn, flight_id)
 
         return {
             "reserved_seats": sorted(reserved_seats),
-            "available_seats": sorted(available_seats)
+            "available_seats": sorted(available_seats),
+            "held_seats": sorted(held_seats)
         }, None
 
     except sqlite3.Error as e:
@@ -128,15 +138,16 @@ def list_seat_availability(flight_id, db_path):
         conn.close()
 
 
-def list_users_for_flight(flight_id, db_path):
+def list_users_for_flight(flight_id, db_path, include_archive=False):
     """
     Outputs the number of users for a specific flight along with their details (username, name, user type, and booked seats).
 
     :param flight_id: The ID of the flight to analyze.
     :param db_path: Path to the SQLite database file.
+    :param include_archive: Also look for the flight in the archive (see archive.py).
     :return: List of user details or an error message.
     """
-    conn = sqlite3.connect(db_path)
+    conn = archive.connect(db_path) if include_archive else instrumentation.connect(db_path)
     cursor = conn.cursor()
 
     try:
@@ -0,0 +1,167 @@
+"""
+Cache of per-flight statistics for the statistics page.
+
+Searching a flight runs stats.calculate_seat_availability, list_seat_availability and
+list_users_for_flight. A StatsCache keeps their results for the most recently searched flights
+(least recently used ones are dropped beyond FLIGHTS_STATS_CACHE entries, default 64; 0 disables
+the cache) together with the flight's bookings version from changes.py. That version is bumped by
+a trigger on every booking change, in whichever process it happens, so before an entry is used one
+indexed query checks that the flight's version, aircraft layout and number of seats are unchanged;
+otherwise the statistics are computed again. Held seats expire with time and are read fresh on
+every search.
+
+Entries are keyed by flight, not by database path, because the statistics replica (replica.py)
+alternates between two in-memory copies; the check runs against whichever copy is read.
+Changes to a user's name or type (only possible outside the app) show up once the flight's bookings
+change or the entry is dropped.
+"""
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+import archive
+import instrumentation
+from holds import active_holds
+from stats import calculate_seat_availability, list_seat_availability, list_users_for_flight
+
+# Maximum number of flights whose statistics are kept (0 disables the cache)
+MAX_ENTRIES = int(os.environ.get("FLIGHTS_STATS_CACHE", 64))
+
+
+def flight_signature(conn, flight_id):
+    """
+    Returns what a flight's cached statistics depend on: its aircraft code and layout, its bookings
+    version (changes.py) and its number of seats.
+
+    :param conn: An open connection to the database.
+    :param flight_id: The ID of the flight.
+    :return: Tuple, or None if the flight does not exist or the database has no version table.
+    """
+    try:
+        return conn.execute("""
+        SELECT f.aircraft_code, a.layout,
+               (SELECT version FROM flight_versions WHERE flight_id = f.flight_id),
+               (SELECT COUNT(*) FROM bookings WHERE flight = f.flight_id)
+        FROM flights f LEFT JOIN aircrafts a ON a.code = f.aircraft_code
+        WHERE f.flight_id = ?;
+        """, (str(flight_id),)).fetchone()
+    except sqlite3.OperationalError:
+        return None
+
+
+class StatsCache:
+    """
+    Bounded LRU of per-flight statistics, checked against the flight's bookings version.
+
+    Methods:
+        __init__(max_entries): Creates an empty cache.
+        flight_statistics(flight_id, db_path, include_archive): Returns the statistics of a flight.
+        metrics(): Returns the hit, miss and eviction counts.
+        clear(): Drops all entries.
+    """
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+
+        # (flight_id, include_archive) -> (signature, (seat_data, seat_list_data, user_data)),
+        # least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    def flight_statistics(self, flight_id, db_path, include_archive=False):
+        """
+        Returns the statistics of a flight, from the cache if the flight has not changed since.
+
+        :param flight_id: The ID of the flight.
+        :param db_path: Path to the SQLite database file (or the statistics replica).
+        :param include_archive: Also look for the flight in the archive (see archive.py).
+        :return: Tuple ((seat_data, seat_list_data, user_data), error) with the results of
+                 calculate_seat_availability, list_seat_availability and list_users_for_flight.
+        """
+        key = (str(flight_id), include_archive)
+        conn = archive.connect(db_path) if include_archive else instrumentation.connect(db_path)
+
+        try:
+            # Read before computing: a booking made in between leaves an entry that is recomputed
+            # on the next search, never one that looks current but isn't
+            signature = flight_signature(conn, flight_id)
+
+            with self._lock:
+                entry = self._entries.get(key)
+                if signature is not None and entry is not None and entry[0] == signature:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    results = entry[1]
+                else:
+                    self.misses += 1
+                    if entry is not None:
+                        self.stale += 1
+                    results = None
+
+            if results is None:
+                results, error = self._compute(flight_id, db_path, include_archive)
+                if error:
+                    return None, error
+                if signature is not None and self.max_entries > 0:
+                    self._store(key, signature, results)
+
+            held_seats = active_holds(conn, flight_id)
+
+        except sqlite3.Error as e:
+            return None, f"Database error: {e}"
+
+        finally:
+            conn.close()
+
+        # Copies, so callers can't change the cached results
+        seat_data, seat_list_data, user_data = results
+        return (dict(seat_data, held_seats=len(held_seats)),
+                dict(seat_list_data, held_seats=sorted(held_seats)),
+                list(user_data)), None
+
+    def metrics(self):
+        """
+        Returns the cache's counters.
+
+        :return: Dictionary with hits, misses (of which stale: the flight had changed), evictions,
+                 entries and max_entries.
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+            }
+
+    def clear(self):
+        """
+        Drops all entries (the counters are kept).
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def _compute(self, flight_id, db_path, include_archive):
+        results = []
+        for function in (calculate_seat_availability, list_seat_availability, list_users_for_flight):
+            result, error = function(flight_id, db_path, include_archive)
+            if error:
+                return None, error
+            results.append(result)
+        return tuple(results), None
+
+    def _store(self, key, signature, results):
+        with self._lock:
+            self._entries[key] = (signature, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
@@ -0,0 +1,148 @@
+"""
+Search over users by part of their username or name, and their bookings.
+
+The users_fts table is an FTS5 index with the trigram tokenizer over users.username and users.name,
+so any part of at least three characters (case-insensitive) is found through the index; shorter
+search texts are matched as prefixes with a scan that stops after the first results. Triggers on
+users keep the index in sync. FTS5 rows are addressed by rowid, and a full VACUUM (maintenance.py)
+may renumber the rowids of users, so users_fts takes its rowids from user_search_ids, whose INTEGER
+PRIMARY KEY never changes.
+
+A user's bookings across all flights are read with the bookings_booker index.
+"""
+
+import threading
+
+import db_queries
+
+# Maximum number of users returned by a search
+SEARCH_LIMIT = 50
+
+# Maximum number of matches of a search that are ranked (those starting with the text first)
+SEARCH_CANDIDATES = 1000
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS user_search_ids (
+        id INTEGER PRIMARY KEY,
+        username TEXT NOT NULL UNIQUE
+    );
+    """,
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(username, name, tokenize = 'trigram');",
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users
+    BEGIN
+        INSERT INTO user_search_ids (username) VALUES (NEW.username);
+        INSERT INTO users_fts (rowid, username, name)
+        SELECT id, NEW.username, NEW.name FROM user_search_ids WHERE username = NEW.username;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF username, name ON users
+    BEGIN
+        DELETE FROM users_fts WHERE rowid = (SELECT id FROM user_search_ids WHERE username = OLD.username);
+        UPDATE user_search_ids SET username = NEW.username WHERE username = OLD.username;
+        INSERT INTO users_fts (rowid, username, name)
+        SELECT id, NEW.username, NEW.name FROM user_search_ids WHERE username = NEW.username;
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users
+    BEGIN
+        DELETE FROM users_fts WHERE rowid = (SELECT id FROM user_search_ids WHERE username = OLD.username);
+        DELETE FROM user_search_ids WHERE username = OLD.username;
+    END;
+    """,
+    "CREATE INDEX IF NOT EXISTS bookings_booker ON bookings (booker);",
+]
+
+# Databases (by path) whose schema was already checked by this process
+_initialized = set()
+# Keeps the search thread and the UI thread from filling the index twice
+_init_lock = threading.Lock()
+
+
+def ensure_index():
+    """
+    Creates the search index, its triggers and the bookings_booker index if they do not exist yet,
+    and fills the search index from the users table the first time.
+    """
+    if db_queries.db_path in _initialized:
+        return
+
+    with _init_lock:
+        if db_queries.db_path in _initialized:
+            return
+
+        conn = db_queries.get_connection()
+        exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users_fts';").fetchone()
+
+        with conn:
+            for sql in SCHEMA:
+                conn.execute(sql)
+            if not exists:
+                conn.execute("INSERT INTO user_search_ids (username) SELECT username FROM users;")
+                conn.execute("""
+                INSERT INTO users_fts (rowid, username, name)
+                SELECT i.id, u.username, u.name FROM users u JOIN user_search_ids i ON i.username = u.username;
+                """)
+
+        _initialized.add(db_queries.db_path)
+
+
+def search_users(text, limit=SEARCH_LIMIT):
+    """
+    Finds users whose username or name contains a text. Users whose username or name starts with
+    it come first (among the first SEARCH_CANDIDATES matches).
+
+    :param text: Part of a username or name.
+    :param limit: Maximum number of users returned.
+    :return: List of (username, name, user_type) tuples. Empty for an empty text.
+    """
+    text = text.strip()
+    if not text:
+        return []
+
+    ensure_index()
+    conn = db_queries.get_connection()
+
+    # LIKE patterns for prefixes, with the wildcards in the text escaped
+    prefix = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+    if len(text) < 3:
+        # The trigram index needs at least three characters
+        return conn.execute("""
+        SELECT username, name, user_type FROM users
+        WHERE username LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\'
+        ORDER BY username LIMIT ?;
+        """, (prefix, prefix, limit)).fetchall()
+
+    # One phrase, so the text is matched as it is and FTS5 query syntax in it has no effect
+    phrase = '"' + text.replace('"', '""') + '"'
+    # Only the first SEARCH_CANDIDATES matches are ranked, so a text that matches almost every
+    # user costs no more than a selective one
+    return conn.execute("""
+    SELECT u.username, u.name, u.user_type
+    FROM (
+        SELECT username, NOT (username LIKE ? ESCAPE '\\' OR name LIKE ? ESCAPE '\\') AS inner_match
+        FROM (SELECT username, name FROM users_fts WHERE users_fts MATCH ? LIMIT ?)
+        ORDER BY inner_match, username LIMIT ?
+    ) f JOIN users u ON u.username = f.username
+    ORDER BY f.inner_match, f.username;
+    """, (prefix, prefix, phrase, SEARCH_CANDIDATES, limit)).fetchall()
+
+
+def user_bookings(username):
+    """
+    Returns the bookings of a user on all flights (archived flights excluded).
+
+    :param username: The username.
+    :return: List of (flight, seat_number, aircraft_code) tuples, ordered by flight and seat.
+    """
+    ensure_index()
+    return db_queries.get_connection().execute("""
+    SELECT b.flight, b.seat_number, f.aircraft_code
+    FROM bookings b JOIN flights f ON f.flight_id = CAST(b.flight AS TEXT)
+    WHERE b.booker = ?
+    ORDER BY b.flight, b.seat_number;
+    """, (username,)).fetchall()
@@ -0,0 +1,204 @@
+"""
+Waitlists for full flights.
+
+Customers who cannot get a seat join the waitlist of a flight. When a booking is cancelled through
+Waitlist.cancel(), the freed seat is booked for the head of the waitlist in the same transaction as
+the cancellation, so the seat is never free for anyone else in between. The head is the entry with
+the highest priority, and among equal priorities the one that joined first.
+
+Entries are stored in the waitlist table, so they survive restarts and are shared by all processes.
+The waitlist_queue index holds a flight's waiting entries in queue order, so the head is found with
+one index lookup (O(log n)) inside the cancelling transaction and always reflects what other
+processes did; benchmarks/bench_waitlist.py compares it with a scan of the waitlist.
+
+A promoted entry keeps its row, with the seat it got, until the customer was told (see
+pop_promotions).
+"""
+
+import time
+
+import db_queries
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS waitlist (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        flight_id TEXT NOT NULL,
+        username TEXT NOT NULL,
+        priority INTEGER NOT NULL DEFAULT 0,
+        requested_at REAL NOT NULL,
+        seat_number TEXT,
+        promoted_at REAL,
+        FOREIGN KEY (username) REFERENCES users(username)
+    );
+    """,
+    # One waiting entry per customer and flight
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS waitlist_waiting ON waitlist (flight_id, username)
+    WHERE seat_number IS NULL;
+    """,
+    # Queue order of a flight's waiting entries, for finding the head and for positions
+    """
+    CREATE INDEX IF NOT EXISTS waitlist_queue ON waitlist (flight_id, priority DESC, requested_at, id)
+    WHERE seat_number IS NULL;
+    """,
+    # A customer's waiting entries and promotions
+    "CREATE INDEX IF NOT EXISTS waitlist_user ON waitlist (username);",
+]
+
+
+def ensure_schema(conn):
+    """
+    Creates the waitlist table if it does not exist yet.
+
+    :param conn: An open connection to the database.
+    """
+    with conn:
+        for sql in SCHEMA:
+            conn.execute(sql)
+
+
+class Waitlist:
+    """
+    Joins, leaves and promotes waitlist entries.
+
+    Methods:
+        __init__(): Creates the manager and the waitlist table.
+        join(flight_id, username, priority): Puts a customer on the waitlist of a flight.
+        leave(flight_id, username): Takes a customer off the waitlist of a flight.
+        position(flight_id, username): Returns a customer's place in the queue.
+        waiting(username): Returns the flights a customer is waiting for.
+        cancel(flight_id, seat_number, username): Cancels a booking and gives the seat to the head of the waitlist.
+        pop_promotions(username): Returns and removes the promotions a customer was not told about yet.
+    """
+    def __init__(self):
+        ensure_schema(db_queries.get_connection())
+
+    def join(self, flight_id, username, priority=0):
+        """
+        Put a customer on the waitlist of a flight.
+
+        :param flight_id: The ID of the flight.
+        :param username: The username of the customer.
+        :param priority: Entries with a higher priority are promoted first.
+        :return: Tuple (success, error message or None).
+        """
+        flight_id = str(flight_id)
+        conn = db_queries.get_connection()
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            if conn.execute("SELECT 1 FROM flights WHERE flight_id = ?;", (flight_id,)).fetchone() is None:
+                conn.rollback()
+                return False, "Flight not found, please try again."
+            if conn.execute("SELECT 1 FROM bookings WHERE flight = ? AND booker IS NULL LIMIT 1;", (flight_id,)).fetchone():
+                conn.rollback()
+                return False, "This flight still has free seats, please book one of them."
+            if conn.execute("SELECT 1 FROM waitlist WHERE flight_id = ? AND username = ? AND seat_number IS NULL;",
+                            (flight_id, username)).fetchone():
+                conn.rollback()
+                return False, "You are already on the waitlist of this flight."
+
+            conn.execute("INSERT INTO waitlist (flight_id, username, priority, requested_at) VALUES (?, ?, ?, ?);",
+                         (flight_id, username, priority, time.time()))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return True, None
+
+    def leave(self, flight_id, username):
+        """
+        Take a customer off the waitlist of a flight.
+        """
+        conn = db_queries.get_connection()
+        with conn:
+            conn.execute("DELETE FROM waitlist WHERE flight_id = ? AND username = ? AND seat_number IS NULL;",
+                         (str(flight_id), username))
+
+    def position(self, flight_id, username):
+        """
+        Returns a customer's place in the waitlist of a flight (1 = next to get a seat), or None if
+        the customer is not waiting for it.
+        """
+        conn = db_queries.get_connection()
+        entry = conn.execute("""
+        SELECT priority, requested_at, id FROM waitlist
+        WHERE flight_id = ? AND username = ? AND seat_number IS NULL;
+        """, (str(flight_id), username)).fetchone()
+        if entry is None:
+            return None
+
+        priority, requested_at, entry_id = entry
+        ahead = conn.execute("""
+        SELECT COUNT(*) FROM waitlist
+        WHERE flight_id = ? AND seat_number IS NULL
+          AND (priority > ? OR (priority = ? AND (requested_at < ? OR (requested_at = ? AND id < ?))));
+        """, (str(flight_id), priority, priority, requested_at, requested_at, entry_id)).fetchone()[0]
+        return ahead + 1
+
+    def waiting(self, username):
+        """
+        Returns the IDs of the flights a customer is on the waitlist of.
+        """
+        rows = db_queries.get_connection().execute(
+            "SELECT flight_id FROM waitlist WHERE username = ? AND seat_number IS NULL ORDER BY requested_at;",
+            (username,))
+        return [row[0] for row in rows]
+
+    def cancel(self, flight_id, seat_number, username):
+        """
+        Cancel a customer's booking and, in the same transaction, book the freed seat for the head
+        of the flight's waitlist.
+
+        :param flight_id: The ID of the flight.
+        :param seat_number: The seat to cancel.
+        :param username: The booker of the seat; the booking is only cancelled if it is theirs.
+        :return: Tuple (cancelled, username of the promoted customer or None).
+        """
+        flight_id = str(flight_id)
+        conn = db_queries.get_connection()
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            cancelled = conn.execute("UPDATE bookings SET booker = NULL WHERE flight = ? AND seat_number = ? AND booker = ?;",
+                                     (flight_id, seat_number, username)).rowcount
+            promoted = self._promote(conn, flight_id, seat_number) if cancelled else None
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return bool(cancelled), promoted
+
+    def pop_promotions(self, username):
+        """
+        Returns the promotions of a customer that were not reported yet, and removes them.
+
+        :return: List of (flight_id, seat_number).
+        """
+        conn = db_queries.get_connection()
+        rows = conn.execute(
+            "SELECT id, flight_id, seat_number FROM waitlist WHERE username = ? AND seat_number IS NOT NULL;",
+            (username,)).fetchall()
+        if rows:
+            with conn:
+                conn.executemany("DELETE FROM waitlist WHERE id = ?;", [(entry_id,) for entry_id, _, _ in rows])
+        return [(flight_id, seat_number) for _, flight_id, seat_number in rows]
+
+    def _promote(self, conn, flight_id, seat_number):
+        """
+        Books a free seat for the head of a flight's waitlist. Runs inside the caller's transaction.
+
+        :return: The username of the promoted customer, or None if nobody is waiting.
+        """
+        head = conn.execute("""
+        SELECT id, username FROM waitlist
+        WHERE flight_id = ? AND seat_number IS NULL
+        ORDER BY priority DESC, requested_at, id LIMIT 1;
+        """, (flight_id,)).fetchone()
+        if head is None:
+            return None
+
+        entry_id, username = head
+        conn.execute("UPDATE waitlist SET seat_number = ?, promoted_at = ? WHERE id = ?;", (seat_number, time.time(), entry_id))
+        conn.execute("UPDATE bookings SET booker = ? WHERE flight = ? AND seat_number = ?;",
+                     (username, flight_id, seat_number))
+        return username
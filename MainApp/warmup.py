@@ -0,0 +1,132 @@
+"""
+Background warm-up at application start.
+
+The first search after launch pays for work later searches don't: database pages that are not yet
+in the operating system's cache, the first matplotlib rendering (fonts, text layout), computing
+aircraft layouts and filling in the occupancy index. warm_up() does that work ahead of time in a
+background thread, while the user is still on the Welcome page, in this order:
+
+- layouts: the layout index (seating.py) of every aircraft
+- chart: one pie chart like the statistics page draws, rendered off screen
+- occupancy: the flight search index (occupancy.ensure_index, including blocks that are out of date)
+- seat maps: the seat maps of the most popular flights (most booking changes, see changes.py) and
+  of the most recently added ones, read with the same queries as the seat map page
+
+The warm-up stops once its time budget (FLIGHTS_WARMUP_BUDGET_MS, default 500; 0 disables it) is
+used up; a step that has started is finished. SQLite page caches belong to a connection, so the
+warm-up's own cache is of no use to the app's connections and is limited to the memory cap
+(FLIGHTS_WARMUP_MEMORY_MIB, default 16); what carries over is the operating system's cache of the
+database file and the caches shared by the whole process.
+"""
+
+import logging
+import os
+import threading
+import time
+
+import db_queries
+import occupancy
+import seating
+
+# Total time the warm-up may take, in milliseconds (0 disables it)
+BUDGET_MS = float(os.environ.get("FLIGHTS_WARMUP_BUDGET_MS", 500))
+
+# Page cache of the warm-up's connection, in MiB
+MEMORY_MIB = float(os.environ.get("FLIGHTS_WARMUP_MEMORY_MIB", 16))
+
+# Number of popular and of recent flights whose seat maps are read
+FLIGHTS = int(os.environ.get("FLIGHTS_WARMUP_FLIGHTS", 20))
+
+logger = logging.getLogger("flights.warmup")
+
+
+def warm_up(budget_ms=BUDGET_MS, memory_mib=MEMORY_MIB, flights=FLIGHTS):
+    """
+    Warm up caches for the database at db_queries.db_path. Runs in the calling thread.
+
+    :param budget_ms: Time budget in milliseconds.
+    :param memory_mib: Maximum page cache of the warm-up's connection in MiB.
+    :param flights: Number of popular and of recent flights whose seat maps are read.
+    :return: Dictionary with the milliseconds of every step done, the number of seat maps read, and
+             the step the budget ran out before (None if all steps were done).
+    """
+    deadline = time.perf_counter() + budget_ms / 1000
+    report = {"steps": {}, "seat_maps": 0, "stopped_before": None}
+
+    conn = db_queries.get_connection()
+    conn.execute(f"PRAGMA cache_size = {-int(memory_mib * 1024)};")
+    try:
+        for name, step in (("layouts", _layouts), ("chart", _chart), ("occupancy", occupancy.ensure_index),
+                           ("seat maps", lambda: _seat_maps(conn, flights, deadline, report))):
+            if time.perf_counter() >= deadline:
+                report["stopped_before"] = name
+                break
+            start = time.perf_counter()
+            step()
+            report["steps"][name] = (time.perf_counter() - start) * 1000
+    finally:
+        # The connection belongs to this thread, which ends after the warm-up
+        db_queries.close_connection()
+
+    logger.info("Warm-up: %s", report)
+    return report
+
+
+def start():
+    """
+    Run warm_up() in a daemon thread, unless the budget is 0.
+
+    :return: The thread, or None.
+    """
+    if BUDGET_MS <= 0:
+        return None
+    thread = threading.Thread(target=_run, name="warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def _run():
+    # A failed warm-up only means a slower first search
+    try:
+        warm_up()
+    except Exception:
+        logger.exception("Warm-up failed")
+
+
+def _layouts():
+    for (layout,) in db_queries.get_connection().execute("SELECT layout FROM aircrafts;"):
+        seating.layout_index(layout)
+
+
+def _chart():
+    # Imported here so that processes that never warm up don't pay for matplotlib
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    figure = Figure()
+    axes = figure.add_subplot()
+    axes.pie([1, 3], labels=['Reserved Seats', 'Available Seats'], colors=['red', 'green'],
+             autopct='%1.1f%%', startangle=90)
+    axes.axis('equal')
+    FigureCanvasAgg(figure).draw()
+
+
+def _seat_maps(conn, flights, deadline, report):
+    """
+    Reads the seat maps of the most popular and the most recently added flights until the deadline.
+    """
+    flight_ids = []
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'flight_versions';").fetchone():
+        flight_ids += [row[0] for row in conn.execute(
+            "SELECT flight_id FROM flight_versions ORDER BY version DESC LIMIT ?;", (flights,))]
+    flight_ids += [row[0] for row in conn.execute("SELECT flight_id FROM flights ORDER BY rowid DESC LIMIT ?;", (flights,))]
+
+    for flight_id in dict.fromkeys(flight_ids):
+        if time.perf_counter() >= deadline:
+            break
+        flight = db_queries.fetch_record("flights", {"flight_id": flight_id})
+        if flight is None:
+            continue
+        db_queries.fetch_record("aircrafts", {"code": flight.aircraft_code})
+        db_queries.fetch_records("bookings", {"flight": flight_id})
+        report["seat_maps"] += 1
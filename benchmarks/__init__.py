@@ -0,0 +1,16 @@
+"""
+Benchmarks for the MainApp modules.
+
+generate.py builds synthetic databases at fleet scale and run.py times the public functions of
+db_queries and stats against them. The bench_*.py scripts are standalone microbenchmarks.
+"""
+
+import os
+import sys
+
+BENCHMARKS_DIR = os.path.abspath(os.path.dirname(__file__))
+MAINAPP_DIR = os.path.join(BENCHMARKS_DIR, '..', 'MainApp')
+
+# Make the MainApp modules importable (they import each other as top-level modules)
+if MAINAPP_DIR not in sys.path:
+    sys.path.insert(0, MAINAPP_DIR)
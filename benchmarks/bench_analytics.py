@@ -0,0 +1,85 @@
+"""
+Benchmark of the columnar analytics snapshot (analytics.py) against the per-flight functions of
+stats.py for fleet-wide statistics, plus the cost of loading and incrementally refreshing the snapshot.
+
+The per-flight baseline is timed on a sample of flights and extrapolated to the whole fleet.
+
+Usage: python -m benchmarks.bench_analytics --flights 100000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.generate import FIRST_FLIGHT_ID, dataset_path
+
+import analytics
+import db_queries
+import stats
+
+# Flights checked by the per-flight baseline (the result is extrapolated to the whole fleet)
+BASELINE_SAMPLE = 1000
+
+
+def timed(function, *args):
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar analytics benchmark")
+    parser.add_argument("--flights", type=int, default=100000)
+    parser.add_argument("--occupancy", type=float, default=0.6)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--changes", type=int, default=1000, help="bookings changed before the incremental refresh")
+    args = parser.parse_args()
+
+    source = dataset_path(args.flights, args.occupancy, args.users)
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'flights.sqlite')
+    shutil.copy(source, db_path)
+    db_queries.db_path = db_path
+
+    try:
+        sample = [str(FIRST_FLIGHT_ID + i) for i in range(min(BASELINE_SAMPLE, args.flights))]
+        for label, function in (("calculate_seat_availability", stats.calculate_seat_availability),
+                                ("list_seat_availability", stats.list_seat_availability)):
+            start = time.perf_counter()
+            for flight_id in sample:
+                function(flight_id, db_path)
+            per_flight = (time.perf_counter() - start) / len(sample)
+            print(f"stats.{label:28s} {per_flight * 1e6:7.0f} us per flight, "
+                  f"about {per_flight * args.flights:7.1f}s for the fleet")
+
+        snapshot, seconds = timed(analytics.BookingsSnapshot, db_path)
+        print(f"Snapshot load ({len(snapshot.flight)} seats): {seconds:.2f}s, "
+              f"{sum(a.nbytes for a in (snapshot.flight, snapshot.row, snapshot.column, snapshot.booker, snapshot._keys)) / 2**20:.0f} MiB")
+
+        for label, function, arguments in (
+                ("flight_occupancy (whole fleet)", snapshot.flight_occupancy, ()),
+                ("load_factor_histogram", snapshot.load_factor_histogram, ()),
+                ("row_fill_rates('773')", snapshot.row_fill_rates, ("773",)),
+                ("column_fill_rates('773')", snapshot.column_fill_rates, ("773",)),
+                ("summary", snapshot.summary, ())):
+            _, seconds = timed(function, *arguments)
+            print(f"analytics.{label:32s} {seconds * 1000:8.1f} ms")
+
+        rng = random.Random(1)
+        for _ in range(args.changes):
+            key = {"flight": FIRST_FLIGHT_ID + rng.randrange(args.flights), "seat_number": "1B"}
+            db_queries.update_row("bookings", old_values=key, new_values={"booker": rng.choice(["user1", None])})
+        status, seconds = timed(snapshot.refresh)
+        print(f"refresh after {args.changes} booking changes: {status} in {seconds * 1000:.1f} ms")
+        status, seconds = timed(snapshot.refresh)
+        print(f"refresh without changes: {status} in {seconds * 1000:.1f} ms")
+    finally:
+        db_queries.close_connection()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
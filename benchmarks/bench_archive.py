@@ -0,0 +1,101 @@
+"""
+Benchmark of archiving closed flights: throughput of archive.archive_flights and the size of the hot
+bookings table and the time of seat map lookups before and after.
+
+Runs on a copy of a generated database; the oldest flights (lowest IDs) are archived.
+
+Usage: python -m benchmarks.bench_archive --flights 100000 --archive-share 0.9
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.generate import FIRST_FLIGHT_ID, dataset_path
+
+import archive
+import db_queries
+
+
+def lookup_us(flight_ids, calls, include_archive=False):
+    """
+    Mean time in microseconds of reading the seat map of a random flight.
+    """
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for _ in range(calls):
+        db_queries.gimme_tuples("bookings", "seat_number, booker", {"flight": rng.choice(flight_ids)},
+                                include_archive=include_archive)
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def table_pages(db_path):
+    """
+    Number of pages used by the bookings table and its primary key index.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        rows = conn.execute("SELECT COUNT(*) FROM dbstat WHERE name IN ('bookings', 'sqlite_autoindex_bookings_1');")
+        return rows.fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
+    finally:
+        conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flight archive benchmark")
+    parser.add_argument("--flights", type=int, default=100000)
+    parser.add_argument("--occupancy", type=float, default=0.8)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--archive-share", type=float, default=0.9)
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    source = dataset_path(args.flights, args.occupancy, args.users)
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'flights.sqlite')
+    shutil.copy(source, db_path)
+    db_queries.db_path = db_path
+
+    archived_count = int(args.flights * args.archive_share)
+    archived_ids = [str(FIRST_FLIGHT_ID + i) for i in range(archived_count)]
+    hot_ids = [str(FIRST_FLIGHT_ID + i) for i in range(archived_count, args.flights)]
+
+    try:
+        rows_before = db_queries.get_connection().execute("SELECT COUNT(*) FROM bookings;").fetchone()[0]
+        pages_before = table_pages(db_path)
+        lookup_before = lookup_us(hot_ids, args.calls)
+
+        start = time.perf_counter()
+        moved = archive.archive_flights(archived_ids, db_path)
+        seconds = time.perf_counter() - start
+        print(f"Archived {moved} flights in {seconds:.1f}s ({moved / seconds:.0f} flights/s)")
+
+        # Deleted pages stay in the file until it is vacuumed
+        db_queries.close_connection()
+        conn = sqlite3.connect(db_path)
+        conn.execute("VACUUM;")
+        conn.close()
+
+        rows_after = db_queries.get_connection().execute("SELECT COUNT(*) FROM bookings;").fetchone()[0]
+        pages_after = table_pages(db_path)
+        lookup_after = lookup_us(hot_ids, args.calls)
+        lookup_archived = lookup_us(archived_ids, args.calls, include_archive=True)
+
+        print(f"Hot bookings rows:            {rows_before:10d} -> {rows_after:10d}")
+        if pages_before is not None:
+            print(f"Hot bookings pages (+ index): {pages_before:10d} -> {pages_after:10d}")
+        print(f"Seat map lookup, hot flight:  {lookup_before:8.1f} us -> {lookup_after:8.1f} us")
+        print(f"Seat map lookup, archived flight (include_archive): {lookup_archived:8.1f} us")
+    finally:
+        db_queries.close_connection()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
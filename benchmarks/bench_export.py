@@ -0,0 +1,79 @@
+"""
+Benchmark of the streaming statistics export: export time and peak RSS per format.
+
+Each format runs in its own process so peak RSS is measured separately. "in-memory" builds every
+flight's record in a list before writing, like a non-streaming exporter would, for comparison.
+
+Usage: python -m benchmarks.bench_export --flights 100000
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generate import dataset_path
+
+import export
+
+MODES = ("csv", "csv.gz", "jsonl", "jsonl.gz", "columnar", "columnar.gz", "in-memory")
+
+
+def run_child(db_path, mode, out_dir):
+    """
+    Export in this process and print time and peak RSS as JSON.
+    """
+    out_path = os.path.join(out_dir, f"stats.{mode}")
+    start = time.perf_counter()
+    if mode == "in-memory":
+        records = list(export.iter_flight_stats(db_path))
+        with open(out_path, 'w') as file:
+            json.dump(records, file)
+        count = len(records)
+    else:
+        count = export.export_statistics(db_path, out_path, fmt=export.format_for_path(out_path))
+    elapsed = time.perf_counter() - start
+
+    # ru_maxrss is in kilobytes on Linux
+    print(json.dumps({
+        "mode": mode,
+        "flights": count,
+        "seconds": elapsed,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "file_mb": os.path.getsize(out_path) / 2**20,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streaming export benchmark")
+    parser.add_argument("--flights", type=int, default=100000)
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    parser.add_argument("--out-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.db, args.child, args.out_dir)
+        return
+
+    db_path = dataset_path(args.flights, args.occupancy, args.users)
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        print(f"{'mode':12s} {'flights':>8s} {'seconds':>8s} {'flights/s':>10s} {'peak RSS':>10s} {'file':>10s}")
+        for mode in MODES:
+            output = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_export", "--child", mode, "--db", db_path, "--out-dir", out_dir],
+                capture_output=True, text=True, check=True).stdout
+            result = json.loads(output)
+            print(f"{mode:12s} {result['flights']:8d} {result['seconds']:8.2f} {result['flights'] / result['seconds']:10.0f} "
+                  f"{result['peak_rss_mb']:8.1f}MB {result['file_mb']:8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark of the seat position heatmap: reading the seat_position_counts aggregate against a grouped
+scan of bookings per redraw, updating the image in place against building a new figure, and the
+cost of the aggregate's triggers on booking writes.
+
+Runs on a copy of a generated database, because building the aggregate changes the schema.
+Rendering uses the Agg canvas, so no display is needed.
+
+Usage: python -m benchmarks.bench_heatmap --flights 100000
+"""
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from benchmarks.bench_search import book_unbook
+from benchmarks.generate import dataset_path
+
+import db_queries
+import heatmap
+
+SCAN_QUERY = """
+SELECT b.seat_number, COUNT(*), SUM(b.booker IS NOT NULL)
+FROM flights f CROSS JOIN bookings b ON b.flight = f.flight_id
+WHERE f.aircraft_code = ?
+GROUP BY b.seat_number;
+"""
+
+
+def mean_ms(function, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter() - start) / calls * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seat heatmap benchmark")
+    parser.add_argument("--flights", type=int, default=100000)
+    parser.add_argument("--occupancy", type=float, default=0.6)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--aircraft", default="773")
+    args = parser.parse_args()
+
+    source = dataset_path(args.flights, args.occupancy, args.users)
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'flights.sqlite')
+    shutil.copy(source, db_path)
+    db_queries.db_path = db_path
+
+    try:
+        write_before = book_unbook(args.flights, args.calls * 10)
+
+        start = time.perf_counter()
+        heatmap.ensure_table()
+        print(f"Building seat_position_counts for {args.flights} flights: {time.perf_counter() - start:.1f}s")
+
+        write_after = book_unbook(args.flights, args.calls * 10)
+        print(f"Booking write: {write_before:.0f} us without trigger, {write_after:.0f} us with trigger")
+
+        conn = db_queries.get_connection()
+        scan = mean_ms(lambda: conn.execute(SCAN_QUERY, (args.aircraft,)).fetchall(), max(1, args.calls // 10))
+        aggregate = mean_ms(lambda: heatmap.seat_heatmap(args.aircraft), args.calls)
+        print(f"Heatmap data for {args.aircraft}: {scan:8.1f} ms scanning bookings, {aggregate:8.2f} ms from the aggregate")
+
+        columns, rows, matrix = heatmap.seat_heatmap(args.aircraft)
+
+        def recreate():
+            figure = Figure(figsize=(5, 5))
+            axes = figure.add_subplot()
+            image = axes.imshow(matrix, cmap="Reds", vmin=0, vmax=1, aspect="auto")
+            figure.colorbar(image, ax=axes)
+            FigureCanvasAgg(figure).draw()
+
+        figure = Figure(figsize=(5, 5))
+        image = figure.add_subplot().imshow(matrix, cmap="Reds", vmin=0, vmax=1, aspect="auto")
+        figure.colorbar(image, ax=image.axes)
+        canvas = FigureCanvasAgg(figure)
+        canvas.draw()
+
+        def update():
+            image.set_data(heatmap.seat_heatmap(args.aircraft)[2])
+            canvas.draw()
+
+        print(f"Redraw: {mean_ms(recreate, args.calls):8.1f} ms new figure, "
+              f"{mean_ms(update, args.calls):8.1f} ms set_data on the existing image (including the query)")
+    finally:
+        db_queries.close_connection()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Benchmark of the occupancy history (history.py) on a copy of a generated database that has the
+app's other booking triggers (changes.py, occupancy.py, heatmap.py) installed.
+
+- Booking path: the time of one booking (UPDATE of a random free seat) with and without the history
+  triggers, in rounds of --bookings statements in one transaction and --commits bookings in a
+  transaction each, alternating so both see the same conditions. The difference of the medians is
+  compared with history.WRITE_BUDGET_US; the exit status is 1 if it is over the budget.
+- Retention: --days of simulated bookings (--changes per flight and day at random times) are
+  written to the table, then downsampled with a time budget of --budget-ms per transaction (as
+  maintenance.py does); reported are rows and size before and after, and the duration and longest
+  transaction of downsample().
+- Fill curve: mean time of history.fill_curve for random flights.
+
+Usage: python -m benchmarks.bench_history --flights 20000 --rounds 5 --days 60
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from benchmarks.generate import FIRST_FLIGHT_ID, dataset_path
+
+import changes
+import db_queries
+import heatmap
+import history
+import occupancy
+
+HISTORY_TRIGGERS = [sql for sql in history.SCHEMA if "CREATE TRIGGER" in sql]
+
+
+def set_triggers(conn, installed):
+    with conn:
+        for sql in HISTORY_TRIGGERS:
+            if installed:
+                conn.execute(sql)
+            else:
+                name = sql.split("IF NOT EXISTS")[1].split()[0]
+                conn.execute(f"DROP TRIGGER IF EXISTS {name};")
+
+
+def book(conn, seats, per_transaction):
+    """
+    Books the seats and returns the mean time per booking in microseconds.
+    """
+    start = time.perf_counter()
+    for i in range(0, len(seats), per_transaction):
+        conn.execute("BEGIN IMMEDIATE;")
+        for flight, seat_number in seats[i:i + per_transaction]:
+            conn.execute("UPDATE bookings SET booker = 'bench' WHERE flight = ? AND seat_number = ?;", (flight, seat_number))
+        conn.execute("COMMIT;")
+    return (time.perf_counter() - start) / len(seats) * 1e6
+
+
+def table_bytes(conn):
+    rows = conn.execute("SELECT COUNT(*) FROM occupancy_history;").fetchone()[0]
+    size = conn.execute("SELECT SUM(pgsize) FROM dbstat WHERE name = 'occupancy_history';").fetchone()[0]
+    return rows, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Occupancy history benchmark")
+    parser.add_argument("--flights", type=int, default=20000)
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--bookings", type=int, default=5000, help="bookings per round in one transaction")
+    parser.add_argument("--commits", type=int, default=300, help="bookings per round with a commit each")
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--changes", type=int, default=5, help="simulated bookings per flight and day")
+    parser.add_argument("--budget-ms", type=float, default=50, help="time budget of a downsampling transaction")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, "flights.sqlite")
+    try:
+        shutil.copy(dataset_path(args.flights, args.occupancy, args.users), db_path)
+        db_queries.db_path = db_path
+        changes.ensure_schema(db_queries.get_connection())
+        occupancy.ensure_index()
+        heatmap.ensure_table()
+        start = time.perf_counter()
+        history.ensure_table()
+        print(f"History table created and filled in {time.perf_counter() - start:.2f}s")
+
+        conn = db_queries.get_connection()
+        conn.isolation_level = None
+        free = conn.execute("SELECT flight, seat_number FROM bookings WHERE booker IS NULL;").fetchall()
+        rng = random.Random(1)
+        rng.shuffle(free)
+
+        measured = {(installed, mode): [] for installed in (False, True) for mode in ("statement", "commit")}
+        for _ in range(args.rounds):
+            for installed in (False, True):
+                set_triggers(conn, installed)
+                seats, free = free[:args.bookings], free[args.bookings:]
+                measured[installed, "statement"].append(book(conn, seats, len(seats)))
+                seats, free = free[:args.commits], free[args.commits:]
+                measured[installed, "commit"].append(book(conn, seats, 1))
+
+        print(f"Booking path, median of {args.rounds} rounds:")
+        overhead = 0.0
+        for mode in ("statement", "commit"):
+            without, with_history = (statistics.median(measured[installed, mode]) for installed in (False, True))
+            print(f"  per {mode:9s} {without:8.1f} us without history, {with_history:8.1f} us with it "
+                  f"({with_history - without:+.1f} us)")
+            if mode == "statement":
+                overhead = with_history - without
+        within = overhead <= history.WRITE_BUDGET_US
+        print(f"  overhead {overhead:+.1f} us per booking, budget {history.WRITE_BUDGET_US} us: "
+              f"{'within budget' if within else 'OVER BUDGET'}")
+
+        now = int(time.time())
+        flight_ids = [str(FIRST_FLIGHT_ID + i) for i in range(args.flights)]
+        conn.execute("BEGIN;")
+        conn.executemany("""
+        INSERT INTO occupancy_history (flight_id, time, change) VALUES (?, ?, ?)
+        ON CONFLICT (flight_id, time) DO UPDATE SET change = change + excluded.change;
+        """, ((flight_id, now - rng.randrange(args.days * 86400), rng.choice((1, 1, 1, -1)))
+              for flight_id in flight_ids for _ in range(args.days * args.changes)))
+        conn.execute("COMMIT;")
+        rows, size = table_bytes(conn)
+        print(f"{args.days} days of {args.changes} bookings per flight and day: {rows} points, {size / 2**20:.1f} MiB")
+
+        conn.isolation_level = ""
+        start = time.perf_counter()
+        result = history.downsample(conn, now, budget_ms=args.budget_ms)
+        rows, size = table_bytes(conn)
+        print(f"  downsampled in {time.perf_counter() - start:.2f}s (longest transaction "
+              f"{result['max_chunk_seconds'] * 1000:.1f} ms): {rows} points, {size / 2**20:.1f} MiB")
+
+        sample = rng.sample(flight_ids, 200)
+        start = time.perf_counter()
+        points = sum(len(history.fill_curve(flight_id)) for flight_id in sample)
+        print(f"Fill curve: {(time.perf_counter() - start) / len(sample) * 1000:.3f} ms per flight "
+              f"({points / len(sample):.0f} points)")
+        db_queries.close_connection()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    sys.exit(0 if within else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Contention benchmark for seat holds.
+
+Several clerks (threads) fill the same flight. Each one looks at the seat map, picks a free seat,
+spends some time with the customer and then clicks "Book". Without holds, another clerk may book the
+seat in the meantime and the booking fails. With holds, the seat is held right after it was picked
+(a failed hold just means picking again, before talking to the customer), so the booking succeeds.
+
+Usage: python -m benchmarks.bench_holds --clerks 8 --think-ms 20
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+
+from benchmarks.generate import SOURCE_DB
+
+import db_queries
+import holds
+
+FLIGHT_ID = "990000"
+
+
+def free_seats(flight_id, held):
+    """
+    The seat map as a clerk sees it: seats that are neither booked nor held.
+    """
+    rows = db_queries.gimme_tuples("bookings", "seat_number, booker", {"flight": flight_id})
+    return [seat for seat, booker in rows if booker is None and seat not in held]
+
+
+def clerk(number, manager, use_holds, think_s, counters, lock):
+    rng = random.Random(number)
+    username = f"clerk{number}"
+    while True:
+        held = manager.held_seats(FLIGHT_ID) if use_holds else {}
+        seats = free_seats(FLIGHT_ID, held)
+        if not seats:
+            break
+        seat = rng.choice(seats)
+
+        if use_holds:
+            success, _ = manager.hold(FLIGHT_ID, [seat], username)
+            if not success:
+                with lock:
+                    counters["failed_holds"] += 1
+                continue
+
+        time.sleep(think_s * rng.uniform(0.5, 1.5))
+
+        success, _ = manager.book(FLIGHT_ID, [seat], username)
+        with lock:
+            counters["booked" if success else "failed_bookings"] += 1
+    db_queries.close_connection()
+
+
+def run(db_path, aircraft_code, clerks, think_s, use_holds):
+    db_queries.db_path = db_path
+    conn = db_queries.get_connection()
+    holds.ensure_schema(conn)
+    with conn:
+        conn.execute("DELETE FROM bookings WHERE flight = ?;", (FLIGHT_ID,))
+        conn.execute("DELETE FROM flights WHERE flight_id = ?;", (FLIGHT_ID,))
+        conn.execute("DELETE FROM seat_holds;")
+    db_queries.insert_row("flights", {"flight_id": FLIGHT_ID, "aircraft_code": aircraft_code})
+    db_queries.add_rows_to_bookings(FLIGHT_ID, aircraft_code)
+
+    manager = holds.SeatHolds(ttl=60)
+    counters = {"booked": 0, "failed_bookings": 0, "failed_holds": 0}
+    lock = threading.Lock()
+    threads = [threading.Thread(target=clerk, args=(i, manager, use_holds, think_s, counters, lock)) for i in range(clerks)]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    counters["seconds"] = time.perf_counter() - start
+    return counters
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seat hold contention benchmark")
+    parser.add_argument("--clerks", type=int, default=8)
+    parser.add_argument("--think-ms", type=float, default=20)
+    parser.add_argument("--aircraft", default="CR2")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'flights.sqlite')
+    shutil.copy(SOURCE_DB, db_path)
+
+    try:
+        for use_holds in (False, True):
+            result = run(db_path, args.aircraft, args.clerks, args.think_ms / 1000, use_holds)
+            label = "with holds" if use_holds else "without holds"
+            print(f"{label:14s} booked {result['booked']:4d}, failed bookings {result['failed_bookings']:4d}, "
+                  f"failed holds {result['failed_holds']:4d}, {result['seconds']:.2f}s")
+    finally:
+        db_queries.close_connection()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
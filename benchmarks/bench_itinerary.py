@@ -0,0 +1,120 @@
+"""
+Benchmark of concurrent multi-leg itinerary bookings.
+
+Worker threads (one database connection each) book random itineraries of 2-3 legs with 1-2 seats per
+leg on a limited set of flights, so many itineraries compete for the same seats. Every itinerary is
+booked under its own username, so afterwards each one can be checked: either all of its seats are
+booked for it, or none. Two ways of booking are compared on copies of a generated database:
+- itinerary:   holds.SeatHolds.book_itinerary (one transaction for all legs)
+- leg by leg:  holds.SeatHolds.book once per leg, as booking each flight separately in the app does
+
+Usage: python -m benchmarks.bench_itinerary --threads 8 --itineraries 500 --hot-flights 200
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from benchmarks.generate import FIRST_FLIGHT_ID, dataset_path
+
+import db_queries
+import holds
+
+
+def random_itinerary(rng, seats):
+    flight_ids = rng.sample(sorted(seats), rng.choice((2, 3)))
+    return [(flight_id, rng.sample(seats[flight_id], rng.choice((1, 2)))) for flight_id in flight_ids]
+
+
+def book_leg_by_leg(manager, legs, username):
+    for flight_id, seat_numbers in legs:
+        success, error = manager.book(flight_id, seat_numbers, username)
+        if not success:
+            return False, error
+    return True, None
+
+
+def worker(number, book, manager, seats, itineraries, results):
+    rng = random.Random(number)
+    for i in range(itineraries):
+        legs = random_itinerary(rng, seats)
+        username = f"t{number}_{i}"
+        try:
+            success, _ = book(manager, legs, username)
+            results.append((username, legs, "booked" if success else "conflict"))
+        except sqlite3.OperationalError:
+            results.append((username, legs, "locked"))
+    db_queries.close_connection()
+
+
+def verify(results):
+    """
+    Counts the itineraries that are only partly booked.
+    """
+    conn = db_queries.get_connection()
+    conn.execute("CREATE INDEX IF NOT EXISTS bench_bookings_booker ON bookings (booker);")
+    partial = 0
+    for username, legs, _ in results:
+        booked = conn.execute("SELECT COUNT(*) FROM bookings WHERE booker = ?;", (username,)).fetchone()[0]
+        if 0 < booked < sum(len(seat_numbers) for _, seat_numbers in legs):
+            partial += 1
+    return partial
+
+
+def run(label, book, source, db_path, args):
+    db_queries.close_connection()
+    shutil.copy(source, db_path)
+    db_queries.db_path = db_path
+    manager = holds.SeatHolds()
+
+    conn = db_queries.get_connection()
+    flight_ids = [str(FIRST_FLIGHT_ID + i) for i in range(args.hot_flights)]
+    seats = {flight_id: [row[0] for row in conn.execute(
+        "SELECT seat_number FROM bookings WHERE flight = ? AND booker IS NULL;", (flight_id,))] for flight_id in flight_ids}
+
+    results = []
+    threads = [threading.Thread(target=worker, args=(number, book, manager, seats, args.itineraries, results))
+               for number in range(args.threads)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    outcomes = [outcome for _, _, outcome in results]
+    print(f"  {label:11s} {len(results) / seconds:7.0f} itineraries/s, {outcomes.count('booked')} booked, "
+          f"{outcomes.count('conflict')} conflicts, {outcomes.count('locked')} lock errors, "
+          f"{verify(results)} partly booked")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Itinerary booking benchmark")
+    parser.add_argument("--flights", type=int, default=1000)
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--itineraries", type=int, default=500, help="itineraries per thread")
+    parser.add_argument("--hot-flights", type=int, default=200, help="flights the itineraries are drawn from")
+    args = parser.parse_args()
+
+    source = dataset_path(args.flights, args.occupancy, args.users)
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'flights.sqlite')
+
+    print(f"{args.threads} threads x {args.itineraries} itineraries on {args.hot_flights} flights")
+    try:
+        run("itinerary", lambda manager, legs, username: manager.book_itinerary(legs, username), source, db_path, args)
+        run("leg by leg", book_leg_by_leg, source, db_path, args)
+    finally:
+        db_queries.close_connection()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
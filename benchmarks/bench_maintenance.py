@@ -0,0 +1,106 @@
+"""
+Benchmark of booking writes while database maintenance runs: once with plain ANALYZE, VACUUM and
+quick_check on the database file, once with maintenance.run_maintenance.
+
+Both runs start from a copy of a generated database in which the bookings of a share of the flights
+were deleted, so there are free pages to reclaim. The copy for run_maintenance is switched to
+incremental vacuum beforehand (a one-time full VACUUM, timed separately). A writer thread books and
+cancels random seats during maintenance and records the latency of every write.
+
+Usage: python -m benchmarks.bench_maintenance --flights 20000 --delete-share 0.3
+"""
+
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from benchmarks.bench_replica import percentile, writer
+from benchmarks.generate import FIRST_FLIGHT_ID, dataset_path
+
+import db_queries
+import maintenance
+
+
+def plain_maintenance(db_path):
+    conn = sqlite3.connect(db_path, timeout=60)
+    try:
+        conn.execute("ANALYZE;")
+        conn.execute("VACUUM;")
+        conn.execute("PRAGMA quick_check;").fetchall()
+    finally:
+        conn.close()
+
+
+def prepare(source, db_path, flights, delete_share, incremental):
+    shutil.copy(source, db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        if incremental:
+            start = time.perf_counter()
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL;")
+            conn.execute("VACUUM;")
+            print(f"One-time VACUUM to enable incremental vacuum: {time.perf_counter() - start:.2f}s")
+        with conn:
+            conn.execute("DELETE FROM bookings WHERE flight < ?;", (FIRST_FLIGHT_ID + int(flights * delete_share),))
+    finally:
+        conn.close()
+
+
+def run(flights, task):
+    stop = threading.Event()
+    latencies, failures = [], []
+    thread = threading.Thread(target=writer, args=(flights, 0, stop, latencies, failures))
+    thread.start()
+    try:
+        time.sleep(0.5)
+        start = time.perf_counter()
+        result = task()
+        seconds = time.perf_counter() - start
+    finally:
+        stop.set()
+        thread.join()
+    return seconds, result, latencies, failures
+
+
+def report(label, seconds, latencies, failures):
+    ms = lambda value: value * 1000
+    print(f"{label}: {seconds:.2f}s")
+    print(f"  writes {len(latencies):6d} ok, {len(failures)} failed (locked), "
+          f"p50 {ms(percentile(latencies, 0.5)):8.2f} ms, p99 {ms(percentile(latencies, 0.99)):8.2f} ms, "
+          f"max {ms(max(latencies + failures, default=0)):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Database maintenance benchmark")
+    parser.add_argument("--flights", type=int, default=20000)
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--delete-share", type=float, default=0.3)
+    args = parser.parse_args()
+
+    source = dataset_path(args.flights, args.occupancy, args.users)
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'flights.sqlite')
+    db_queries.db_path = db_path
+
+    try:
+        prepare(source, db_path, args.flights, args.delete_share, incremental=False)
+        seconds, _, latencies, failures = run(args.flights, lambda: plain_maintenance(db_path))
+        report("ANALYZE + VACUUM + quick_check on the file", seconds, latencies, failures)
+
+        db_queries.close_connection()
+        prepare(source, db_path, args.flights, args.delete_share, incremental=True)
+        seconds, result, latencies, failures = run(args.flights, lambda: maintenance.run_maintenance(db_path))
+        report(f"run_maintenance (budget {maintenance.BUDGET_MS:g} ms)", seconds, latencies, failures)
+        print("\n".join("  " + line for line in maintenance.format_report(result).splitlines()))
+    finally:
+        db_queries.close_connection()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
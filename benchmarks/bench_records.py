@@ -0,0 +1,86 @@
+"""
+Benchmark of row representations when loading all bookings of a generated database.
+
+Each representation is loaded with the same SELECT flight, seat_number, booker, and measured for
+load time (best of --repeat) and the memory the loaded list keeps alive (tracemalloc):
+- tuple:              sqlite3's default rows
+- records:            records.Booking via records.row_factory (tuple.__new__), as db_queries.fetch_records
+- namedtuple _make:   records.Booking via the generated constructor
+- slots class:        a class with __slots__ = ("flight", "seat_number", "booker")
+- sqlite3.Row:        the built-in row factory
+- dict:               one dictionary per row
+
+Usage: python -m benchmarks.bench_records --flights 1000 --repeat 3
+"""
+
+import argparse
+import sqlite3
+import time
+import tracemalloc
+
+from benchmarks.generate import dataset_path
+
+import records
+
+QUERY = "SELECT flight, seat_number, booker FROM bookings;"
+
+
+class SlottedBooking:
+    __slots__ = ("flight", "seat_number", "booker")
+
+    def __init__(self, flight, seat_number, booker):
+        self.flight = flight
+        self.seat_number = seat_number
+        self.booker = booker
+
+
+FACTORIES = [
+    ("tuple", None),
+    ("records", records.row_factory(records.Booking)),
+    ("namedtuple _make", lambda cursor, row: records.Booking._make(row)),
+    ("slots class", lambda cursor, row: SlottedBooking(*row)),
+    ("sqlite3.Row", sqlite3.Row),
+    ("dict", lambda cursor, row: {column[0]: value for column, value in zip(cursor.description, row)}),
+]
+
+
+def load(conn, factory):
+    cursor = conn.cursor()
+    cursor.row_factory = factory
+    return cursor.execute(QUERY).fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Row representation benchmark")
+    parser.add_argument("--flights", type=int, default=1000)
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(dataset_path(args.flights, args.occupancy, args.users))
+    rows = len(load(conn, None))
+    print(f"Loading {rows} bookings")
+
+    try:
+        for label, factory in FACTORIES:
+            best = float("inf")
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                load(conn, factory)
+                best = min(best, time.perf_counter() - start)
+
+            tracemalloc.start()
+            loaded = load(conn, factory)
+            memory = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            del loaded
+
+            print(f"  {label:17s} {best * 1000:8.1f} ms ({rows / best / 1e6:5.2f} M rows/s), "
+                  f"{memory / 2**20:7.1f} MiB ({memory / rows:5.1f} bytes/row)")
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
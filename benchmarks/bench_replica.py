@@ -0,0 +1,136 @@
+"""
+Benchmark of booking writes while fleet-wide statistics reports run at the same time, once with the
+reports reading the database file and once reading an in-memory StatsReplica.
+
+A writer thread books and cancels random seats (--rate writes per second, 0 for as fast as it
+can) and records the latency of every write; a reader thread runs export.iter_flight_stats over all
+flights in a loop. Both run on a copy of a generated database. For the replica, the age of the
+replica is sampled every 0.1 s, and the refresh counters are reported: copies, failed refreshes, restarts of
+stepwise copies by commits of the writer, and copies made in one step after too many restarts.
+
+Usage: python -m benchmarks.bench_replica --flights 20000 --seconds 10 --rate 200
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+
+from benchmarks.generate import FIRST_FLIGHT_ID, dataset_path
+
+import db_queries
+import export
+import replica
+
+
+def writer(flights, rate, stop, latencies, failures):
+    rng = random.Random(1)
+    next_write = time.perf_counter()
+    while not stop.is_set():
+        key = {"flight": FIRST_FLIGHT_ID + rng.randrange(flights), "seat_number": "1B"}
+        for booker in ("user1", None):
+            if rate:
+                next_write += 1 / rate
+                time.sleep(max(0.0, next_write - time.perf_counter()))
+            start = time.perf_counter()
+            try:
+                db_queries.update_row("bookings", old_values=key, new_values={"booker": booker})
+            except sqlite3.OperationalError:
+                failures.append(time.perf_counter() - start)
+                continue
+            latencies.append(time.perf_counter() - start)
+    db_queries.close_connection()
+
+
+def reader(get_path, stop, durations):
+    while not stop.is_set():
+        start = time.perf_counter()
+        for _ in export.iter_flight_stats(get_path()):
+            pass
+        durations.append(time.perf_counter() - start)
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def sampler(stats_replica, stop, ages):
+    while not stop.wait(0.1):
+        ages.append(stats_replica.age())
+
+
+def run(flights, rate, seconds, get_path, stats_replica=None):
+    stop = threading.Event()
+    latencies, failures, durations, ages = [], [], [], []
+    threads = [threading.Thread(target=writer, args=(flights, rate, stop, latencies, failures)),
+               threading.Thread(target=reader, args=(get_path, stop, durations))]
+    if stats_replica is not None:
+        threads.append(threading.Thread(target=sampler, args=(stats_replica, stop, ages)))
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return latencies, failures, durations, ages
+
+
+def report(label, latencies, failures, durations, ages):
+    ms = lambda value: value * 1000
+    print(f"{label}:")
+    print(f"  writes   {len(latencies):6d} ok, {len(failures)} failed (locked), "
+          f"p50 {ms(percentile(latencies, 0.5)):8.2f} ms, p99 {ms(percentile(latencies, 0.99)):8.2f} ms, "
+          f"max {ms(max(latencies + failures, default=0)):8.2f} ms")
+    print(f"  reports  {len(durations):6d} done, "
+          f"p50 {ms(percentile(durations, 0.5)):8.1f} ms, max {ms(max(durations, default=0)):8.1f} ms")
+    if ages:
+        print(f"  replica age p50 {percentile(ages, 0.5):6.2f} s, p99 {percentile(ages, 0.99):6.2f} s, max {max(ages):6.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stats replica benchmark")
+    parser.add_argument("--flights", type=int, default=20000)
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--staleness", type=float, default=5, help="max age of the replica in seconds")
+    parser.add_argument("--rate", type=float, default=0, help="writes per second (0: as fast as possible)")
+    args = parser.parse_args()
+
+    source = dataset_path(args.flights, args.occupancy, args.users)
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'flights.sqlite')
+    shutil.copy(source, db_path)
+    db_queries.db_path = db_path
+
+    try:
+        report("Reports on the database file", *run(args.flights, args.rate, args.seconds, lambda: db_path))
+
+        stats_replica = replica.StatsReplica(db_path, max_staleness=args.staleness)
+        start = time.perf_counter()
+        stats_replica.refresh()
+        print(f"Initial replica copy: {time.perf_counter() - start:.2f}s")
+        stats_replica.start()
+        try:
+            report(f"Reports on the replica (max staleness {args.staleness:g}s)",
+                   *run(args.flights, args.rate, args.seconds, stats_replica.path, stats_replica))
+            metrics = stats_replica.metrics()
+            print(f"  refreshes: {metrics['copies']} copies ({metrics['single_step_copies']} in one step after "
+                  f"{replica.BACKUP_MAX_RESTARTS} restarts), {metrics['unchanged']} unchanged, "
+                  f"{metrics['failures']} failed; {metrics['restarts']} restarts of stepwise copies")
+        finally:
+            stats_replica.close()
+    finally:
+        db_queries.close_connection()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark of the batch chart renderer (reports.py): charts per second rendered serially and with a
+process pool, and a full report run over a generated fleet with a cold cache, a warm cache and after
+some bookings changed.
+
+Usage: python -m benchmarks.bench_reports --flights 20000 --charts 400
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from benchmarks.generate import FIRST_FLIGHT_ID, dataset_path
+
+import db_queries
+import occupancy
+import reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch chart rendering benchmark")
+    parser.add_argument("--flights", type=int, default=20000)
+    parser.add_argument("--occupancy", type=float, default=0.6)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--charts", type=int, default=400, help="distinct charts for the throughput test")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--changes", type=int, default=100, help="booking changes before the last run")
+    args = parser.parse_args()
+
+    source = dataset_path(args.flights, args.occupancy, args.users)
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'flights.sqlite')
+    shutil.copy(source, db_path)
+    db_queries.db_path = db_path
+
+    try:
+        tasks = [(os.path.join(tmp_dir, f"chart_{i}.png"), i, args.charts - i) for i in range(args.charts)]
+
+        start = time.perf_counter()
+        for task in tasks:
+            reports.render_pie_chart(task)
+        serial = args.charts / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            list(pool.map(reports.render_pie_chart, tasks, chunksize=reports.CHUNK_SIZE))
+        parallel = args.charts / (time.perf_counter() - start)
+        print(f"Rendering {args.charts} charts: {serial:.0f} charts/s serial, "
+              f"{parallel:.0f} charts/s with {args.workers} worker processes")
+
+        start = time.perf_counter()
+        occupancy.ensure_index()
+        print(f"Building the occupancy index (once per database): {time.perf_counter() - start:.1f}s")
+
+        output_dir = os.path.join(tmp_dir, 'reports')
+        for label in ("cold cache", "warm cache"):
+            result = reports.render_reports(output_dir, workers=args.workers, statistics=False)
+            print(f"Report run, {label}: {result['flights']} flights, {result['rendered']} rendered, "
+                  f"{result['cached']} cached, {result['seconds']:.2f}s ({result['flights'] / result['seconds']:.0f} flights/s)")
+
+        rng = random.Random(1)
+        for _ in range(args.changes):
+            key = {"flight": FIRST_FLIGHT_ID + rng.randrange(args.flights), "seat_number": "1B"}
+            db_queries.update_row("bookings", old_values=key, new_values={"booker": rng.choice(["user1", None])})
+        result = reports.render_reports(output_dir, workers=args.workers, statistics=False)
+        print(f"Report run after {args.changes} booking changes: {result['rendered']} rendered, "
+              f"{result['cached']} cached, {result['seconds']:.2f}s")
+    finally:
+        db_queries.close_connection()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark of the occupancy-indexed flight search against a loop over
+stats.calculate_seat_availability, plus the extra cost of the occupancy triggers on booking writes.
+
+Runs on a copy of a generated database, because building the index changes the schema.
+
+Usage: python -m benchmarks.bench_search --flights 100000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.generate import FIRST_FLIGHT_ID, dataset_path
+
+import db_queries
+import occupancy
+import stats
+
+# Flights checked by the per-flight baseline (the result is extrapolated to the whole fleet)
+BASELINE_SAMPLE = 1000
+
+
+def book_unbook(flights, calls):
+    """
+    Books and cancels random seats and returns the mean time of one write in microseconds.
+    """
+    rng = random.Random(1)
+    start = time.perf_counter()
+    for _ in range(calls):
+        key = {"flight": FIRST_FLIGHT_ID + rng.randrange(flights), "seat_number": "1B"}
+        db_queries.update_row("bookings", old_values=key, new_values={"booker": "user1"})
+        db_queries.update_row("bookings", old_values=key, new_values={"booker": None})
+    return (time.perf_counter() - start) / (2 * calls) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flight search benchmark")
+    parser.add_argument("--flights", type=int, default=100000)
+    parser.add_argument("--occupancy", type=float, default=0.8)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--calls", type=int, default=50)
+    args = parser.parse_args()
+
+    source = dataset_path(args.flights, args.occupancy, args.users)
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'flights.sqlite')
+    shutil.copy(source, db_path)
+    db_queries.db_path = db_path
+
+    try:
+        write_before = book_unbook(args.flights, args.calls)
+
+        start = time.perf_counter()
+        occupancy.ensure_index()
+        print(f"Building the occupancy index for {args.flights} flights: {time.perf_counter() - start:.1f}s")
+
+        write_after = book_unbook(args.flights, args.calls)
+        print(f"Booking write: {write_before:.0f} us without triggers, {write_after:.0f} us with triggers")
+
+        # Baseline: check every flight with the per-flight statistics function
+        start = time.perf_counter()
+        matches = 0
+        for i in range(min(BASELINE_SAMPLE, args.flights)):
+            seat_data, _ = stats.calculate_seat_availability(str(FIRST_FLIGHT_ID + i), db_path)
+            matches += seat_data["available_seats"] >= 100
+        per_flight = (time.perf_counter() - start) / min(BASELINE_SAMPLE, args.flights)
+        print(f"Per-flight loop: {per_flight * 1e6:.0f} us per flight, about {per_flight * args.flights:.1f}s for the fleet")
+
+        searches = [
+            ("min 100 free", dict(min_free=100)),
+            ("773, min 50 free, by free desc", dict(aircraft_code="773", min_free=50, sort="free_seats", descending=True)),
+            ("min block 3, page 10", dict(min_block=3, page=10)),
+            ("min block 4, by max_block", dict(min_block=4, sort="max_block")),
+        ]
+        for label, kwargs in searches:
+            start = time.perf_counter()
+            for _ in range(args.calls):
+                rows, total = occupancy.search_flights(**kwargs)
+            elapsed = (time.perf_counter() - start) / args.calls * 1000
+            print(f"search {label:35s} {elapsed:8.2f} ms  ({total} matches)")
+
+        # Search right after a booking, which makes one flight's block size unknown again
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            book_unbook(args.flights, 1)
+            occupancy.search_flights(min_block=3)
+        elapsed = (time.perf_counter() - start) / args.calls * 1000
+        print(f"book+cancel then search with min block: {elapsed:.2f} ms")
+    finally:
+        db_queries.close_connection()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark of adjacent-seat recommendation on a full Boeing 777-300 (aircraft code 773, 44 rows of
+"ABC| |DEGH| |JKL").
+
+Compares the bit mask recommender (with and without fetching the occupancy from the database)
+against a naive search that queries the database for every seat of every candidate block.
+
+Usage: python -m benchmarks.bench_seating --occupancy 0.5 0.8 0.95
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.generate import SOURCE_DB
+
+import db_queries
+import seating
+
+FLIGHT_ID = "773000"
+
+
+def naive_suggest(flight_id, layout, row_number, party_size):
+    """
+    One query per seat of every candidate block, scanning rows front to back.
+    """
+    segments = [segment.strip() for segment in layout.split("|") if segment.strip()]
+    for row in range(1, row_number + 1):
+        for segment in segments:
+            for start in range(len(segment) - party_size + 1):
+                seats = [f"{row}{col}" for col in segment[start:start + party_size]]
+                if all(db_queries.gimme_tuples("bookings", "booker", {"flight": flight_id, "seat_number": seat})[0][0] is None
+                       for seat in seats):
+                    return seats
+    return None
+
+
+def timed(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Adjacent-seat recommendation benchmark")
+    parser.add_argument("--occupancy", type=float, nargs="+", default=[0.5, 0.8, 0.95])
+    parser.add_argument("--calls", type=int, default=500)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'flights.sqlite')
+    shutil.copy(SOURCE_DB, db_path)
+    db_queries.db_path = db_path
+
+    try:
+        db_queries.insert_row("flights", {"flight_id": FLIGHT_ID, "aircraft_code": "773"})
+        db_queries.add_rows_to_bookings(FLIGHT_ID, "773")
+        layout, row_number = db_queries.gimme_tuples("aircrafts", "layout, row_number", {"code": "773"})[0]
+        all_seats = [row[0] for row in db_queries.gimme_tuples("bookings", "seat_number", {"flight": FLIGHT_ID})]
+
+        print(f"{'occupancy':>9s} {'party':>5s} {'masks only':>12s} {'with DB':>12s} {'naive':>12s}  suggestion")
+        for occupancy in args.occupancy:
+            rng = random.Random(0)
+            booked = [seat for seat in all_seats if rng.random() < occupancy]
+            conn = db_queries.get_connection()
+            with conn:
+                conn.execute("UPDATE bookings SET booker = NULL WHERE flight = ?;", (FLIGHT_ID,))
+                conn.executemany("UPDATE bookings SET booker = 'angel31' WHERE flight = ? AND seat_number = ?;",
+                                 [(FLIGHT_ID, seat) for seat in booked])
+
+            masks = seating.occupancy_masks(layout, row_number, booked)
+            for party in (1, 2, 3, 4):
+                masks_us = timed(lambda: seating.recommend_seats(layout, masks, party), args.calls)
+                db_us = timed(lambda: db_queries.suggest_seats(FLIGHT_ID, party), args.calls)
+                naive_us = timed(lambda: naive_suggest(FLIGHT_ID, layout, row_number, party), max(1, args.calls // 50))
+                suggestion = db_queries.suggest_seats(FLIGHT_ID, party)
+                print(f"{occupancy:9.2f} {party:5d} {masks_us:10.1f}us {db_us:10.1f}us {naive_us:10.1f}us  {suggestion}")
+    finally:
+        db_queries.close_connection()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
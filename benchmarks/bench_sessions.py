@@ -0,0 +1,76 @@
+# Description: Benchmark of session validation with many concurrent sessions.
+# Usage: python benchmarks/bench_sessions.py --sessions 10000 --threads 8 --lookups 200000
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Make the MainApp modules importable
+current_dir = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../MainApp'))
+
+import sessions
+
+
+def run_lookups(manager, tokens, lookups, threads):
+    """
+    Validate random tokens from several threads and return validations per second.
+    """
+    per_thread = lookups // threads
+
+    def worker(seed):
+        rng = random.Random(seed)
+        for _ in range(per_thread):
+            manager.is_admin(tokens[rng.randrange(len(tokens))])
+
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    elapsed = time.perf_counter() - start
+
+    return per_thread * threads / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Session validation benchmark")
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--lookups", type=int, default=200000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'sessions.sqlite')
+
+    try:
+        users = [{"username": f"user{i}", "name": f"User {i}", "user_type": "admin" if i % 10 == 0 else "regular"}
+                 for i in range(args.sessions)]
+
+        # In-memory LRU only
+        memory = sessions.SessionManager(max_sessions=args.sessions)
+        tokens = [memory.issue(user) for user in users]
+        rate = run_lookups(memory, tokens, args.lookups, args.threads)
+        print(f"memory LRU, all hot:          {rate:12,.0f} validations/s")
+
+        # SQLite-backed, LRU large enough for every session
+        backed = sessions.SessionManager(max_sessions=args.sessions, db_path=db_path)
+        tokens = [backed.issue(user) for user in users]
+        rate = run_lookups(backed, tokens, args.lookups, args.threads)
+        print(f"SQLite-backed, all hot:       {rate:12,.0f} validations/s")
+
+        # SQLite-backed, LRU holding 10% of the sessions (misses go to the database)
+        cold = sessions.SessionManager(max_sessions=max(1, args.sessions // 10), db_path=db_path)
+        rate = run_lookups(cold, tokens, args.lookups // 10, args.threads)
+        print(f"SQLite-backed, 10% in memory: {rate:12,.0f} validations/s")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Benchmark of seat map reads from many processes: SQLite against the memory-mapped seat snapshot.
+
+--processes reader processes (started fresh, not forked) read the seat maps (layout and occupancy
+masks) of random flights of a generated database for --seconds each, all at the same time:
+- sqlite:          layout and booked seats queried from the database, masks built with seating.py
+- sqlite (cache):  the same with PRAGMA cache_size set to --cache-mib, so each process caches more
+- snapshot:        snapshot.SeatSnapshot.flight and masks on one shared snapshot file
+
+Reported are the reads per second of all processes together, and per process the resident set
+size (RSS) and the proportional set size (PSS, shared pages divided among the processes sharing
+them, from /proc/self/smaps_rollup) after reading.
+
+Usage: python -m benchmarks.bench_snapshot --flights 20000 --processes 8 --seconds 5
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import sqlite3
+import tempfile
+import time
+
+from benchmarks.generate import FIRST_FLIGHT_ID, dataset_path
+
+import seating
+import snapshot
+
+
+def memory():
+    """
+    Returns (RSS, PSS) of the calling process in bytes.
+    """
+    values = {}
+    with open("/proc/self/smaps_rollup") as file:
+        for line in file:
+            name, _, rest = line.partition(":")
+            if name in ("Rss", "Pss"):
+                values[name] = int(rest.split()[0]) * 1024
+    return values["Rss"], values["Pss"]
+
+
+def sqlite_reader(db_path, cache_mib):
+    conn = sqlite3.connect(db_path)
+    if cache_mib:
+        conn.execute(f"PRAGMA cache_size = {-cache_mib * 1024};")
+
+    def read(flight_id):
+        layout, row_number = conn.execute(
+            "SELECT a.layout, a.row_number FROM flights f JOIN aircrafts a ON a.code = f.aircraft_code WHERE f.flight_id = ?;",
+            (flight_id,)).fetchone()
+        booked = conn.execute("SELECT seat_number FROM bookings WHERE flight = ? AND booker IS NOT NULL;", (flight_id,))
+        return layout, seating.occupancy_masks(layout, row_number, (row[0] for row in booked))
+    return read
+
+
+def snapshot_reader(snapshot_path):
+    seat_snapshot = snapshot.SeatSnapshot(snapshot_path)
+
+    def read(flight_id):
+        return seat_snapshot.flight(flight_id).layout, seat_snapshot.masks(flight_id)
+    return read
+
+
+def reader(number, mode, db_path, snapshot_path, args, barrier, results):
+    read = snapshot_reader(snapshot_path) if mode == "snapshot" else sqlite_reader(db_path, args.cache_mib if mode == "sqlite (cache)" else 0)
+    rng = random.Random(number)
+    flight_ids = [str(FIRST_FLIGHT_ID + i) for i in range(args.flights)]
+
+    barrier.wait()
+    reads = 0
+    deadline = time.perf_counter() + args.seconds
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            read(rng.choice(flight_ids))
+        reads += 100
+    results.put((reads, *memory()))
+
+
+def run(mode, db_path, snapshot_path, args):
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(args.processes)
+    results = context.Queue()
+    processes = [context.Process(target=reader, args=(number, mode, db_path, snapshot_path, args, barrier, results))
+                 for number in range(args.processes)]
+    for process in processes:
+        process.start()
+    measured = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    reads = sum(result[0] for result in measured)
+    rss = sum(result[1] for result in measured) / len(measured)
+    pss = sum(result[2] for result in measured) / len(measured)
+    print(f"  {mode:15s} {reads / args.seconds:9.0f} reads/s, RSS {rss / 2**20:6.1f} MiB, "
+          f"PSS {pss / 2**20:6.1f} MiB per process ({pss * len(measured) / 2**20:6.1f} MiB together)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seat snapshot benchmark")
+    parser.add_argument("--flights", type=int, default=20000)
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--processes", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--cache-mib", type=int, default=64, help="SQLite cache per process for 'sqlite (cache)'")
+    args = parser.parse_args()
+
+    db_path = dataset_path(args.flights, args.occupancy, args.users)
+    tmp_dir = tempfile.mkdtemp()
+    snapshot_path = os.path.join(tmp_dir, "seats.snapshot")
+
+    try:
+        start = time.perf_counter()
+        size = snapshot.publish(db_path, snapshot_path)
+        print(f"Snapshot of {args.flights} flights: {size / 2**20:.1f} MiB, published in {time.perf_counter() - start:.2f}s "
+              f"(database {os.path.getsize(db_path) / 2**20:.1f} MiB)")
+
+        # Both sources must give the same seat maps
+        check_snapshot, check_sqlite = snapshot_reader(snapshot_path), sqlite_reader(db_path, 0)
+        for flight_id in random.Random(0).sample(range(FIRST_FLIGHT_ID, FIRST_FLIGHT_ID + args.flights), 100):
+            assert check_snapshot(str(flight_id)) == check_sqlite(str(flight_id)), flight_id
+
+        print(f"{args.processes} processes reading random seat maps for {args.seconds}s")
+        for mode in ("sqlite", "sqlite (cache)", "snapshot"):
+            run(mode, db_path, snapshot_path, args)
+    finally:
+        os.remove(snapshot_path)
+        os.rmdir(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
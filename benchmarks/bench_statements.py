@@ -0,0 +1,88 @@
+# Description: Microbenchmark of statement preparation overhead in db_queries.
+# Compares the old pattern (new connection and new f-string SQL per call) with the cached
+# SQL builder on a reused connection. Runs against a copy of flights.sqlite.
+# Usage: python benchmarks/bench_statements.py --calls 20000
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+# Make the MainApp modules importable
+current_dir = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(current_dir, '../MainApp'))
+
+import db_queries
+
+
+def old_gimme_tuples(db_path, table, identifier):
+    """
+    The previous implementation: connect, build the query with f-strings, execute, close.
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    where_clause = " AND ".join([f"{col} = ?" for col in identifier.keys()])
+    query = f"SELECT * FROM {table} WHERE {where_clause};"
+    cursor.execute(query, tuple(identifier.values()))
+    rows = cursor.fetchall()
+    conn.close()
+    return rows
+
+
+def timed(label, calls, func):
+    start = time.perf_counter()
+    for i in range(calls):
+        func(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:45s} {elapsed / calls * 1e6:9.2f} us/call")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Statement preparation microbenchmark")
+    parser.add_argument("--calls", type=int, default=20000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'flights.sqlite')
+    shutil.copy(db_queries.db_path, db_path)
+    db_queries.db_path = db_path
+
+    seats = [f"{row}{col}" for row in range(1, 37) for col in "ABCDEF"]
+
+    def key(i):
+        return {"flight": 5000, "seat_number": seats[i % len(seats)]}
+
+    try:
+        conn = sqlite3.connect(db_path)
+        timed("SQL text only, f-string per call",
+              args.calls,
+              lambda i: "SELECT * FROM bookings WHERE " + " AND ".join(f"{col} = ?" for col in key(i)) + ";")
+        timed("SQL text only, cached builder",
+              args.calls,
+              lambda i: db_queries.select_sql("bookings", ("*",), tuple(key(i).keys())))
+        timed("prepare+run, new SQL object, reused conn",
+              args.calls,
+              lambda i: conn.execute("SELECT * FROM bookings WHERE flight = ? AND seat_number = ?;" + " " * (i % 300),
+                                     tuple(key(i).values())).fetchall())
+        timed("prepare+run, cached statement, reused conn",
+              args.calls,
+              lambda i: conn.execute("SELECT * FROM bookings WHERE flight = ? AND seat_number = ?;",
+                                     tuple(key(i).values())).fetchall())
+        conn.close()
+
+        timed("old gimme_tuples (connect per call)",
+              args.calls,
+              lambda i: old_gimme_tuples(db_path, "bookings", key(i)))
+        timed("new gimme_tuples",
+              args.calls,
+              lambda i: db_queries.gimme_tuples("bookings", identifier=key(i)))
+        print(f"builder cache: {db_queries.select_sql.cache_info()}")
+    finally:
+        db_queries.close_connection()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
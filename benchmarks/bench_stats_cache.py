@@ -0,0 +1,115 @@
+"""
+Benchmark of the statistics page's flight search with and without the statistics cache (statscache.py).
+
+A copy of a generated database is searched --searches times, picking from --working-set random
+flights (admins tend to look at the same flights again), once calling the three stats.py functions
+directly and once through a StatsCache of --entries entries. Reported are the mean and 99th
+percentile search time and the cache's hits, misses and evictions.
+
+Then a writer in another process books or cancels a random seat on one of the flights --rounds
+times; after each change the cached statistics of that flight are compared with freshly computed
+ones, to check that changes from other processes are never missed.
+
+Usage: python -m benchmarks.bench_stats_cache --flights 20000 --searches 2000 --working-set 50
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from benchmarks.bench_replica import percentile
+from benchmarks.generate import FIRST_FLIGHT_ID, dataset_path
+
+import changes
+import statscache
+from stats import calculate_seat_availability, list_seat_availability, list_users_for_flight
+
+
+def uncached(flight_id, db_path):
+    return tuple(function(flight_id, db_path)[0]
+                 for function in (calculate_seat_availability, list_seat_availability, list_users_for_flight))
+
+
+def writer(db_path, flight_ids, rounds, changed, done):
+    """
+    Books or cancels a random seat on a random flight, waiting for the reader after each change.
+    """
+    rng = random.Random(2)
+    conn = sqlite3.connect(db_path)
+    try:
+        for _ in range(rounds):
+            flight_id = rng.choice(flight_ids)
+            seat_number, booker = rng.choice(conn.execute(
+                "SELECT seat_number, booker FROM bookings WHERE flight = ?;", (flight_id,)).fetchall())
+            with conn:
+                conn.execute("UPDATE bookings SET booker = ? WHERE flight = ? AND seat_number = ?;",
+                             (None if booker else "bench", flight_id, seat_number))
+            changed.put(flight_id)
+            done.get()
+    finally:
+        conn.close()
+    changed.put(None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Statistics cache benchmark")
+    parser.add_argument("--flights", type=int, default=20000)
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--searches", type=int, default=2000)
+    parser.add_argument("--working-set", type=int, default=50, help="number of different flights searched")
+    parser.add_argument("--entries", type=int, default=statscache.MAX_ENTRIES)
+    parser.add_argument("--rounds", type=int, default=500, help="changes from another process to check")
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, "flights.sqlite")
+    try:
+        shutil.copy(dataset_path(args.flights, args.occupancy, args.users), db_path)
+        conn = sqlite3.connect(db_path)
+        changes.ensure_schema(conn)
+        conn.close()
+
+        rng = random.Random(1)
+        working_set = [str(flight_id) for flight_id in
+                       rng.sample(range(FIRST_FLIGHT_ID, FIRST_FLIGHT_ID + args.flights), args.working_set)]
+        searches = [rng.choice(working_set) for _ in range(args.searches)]
+
+        cache = statscache.StatsCache(args.entries)
+        print(f"{args.searches} searches of {args.working_set} different flights ({args.flights} flights)")
+        for label, search in (("uncached", lambda flight_id: uncached(flight_id, db_path)),
+                              ("cached", lambda flight_id: cache.flight_statistics(flight_id, db_path))):
+            times = []
+            for flight_id in searches:
+                start = time.perf_counter()
+                search(flight_id)
+                times.append((time.perf_counter() - start) * 1000)
+            print(f"  {label:8s} mean {statistics.mean(times):6.3f} ms, p99 {percentile(times, 0.99):6.3f} ms")
+        print(f"  cache: {cache.metrics()}")
+
+        context = multiprocessing.get_context("spawn")
+        changed, done = context.Queue(), context.Queue()
+        process = context.Process(target=writer, args=(db_path, working_set, args.rounds, changed, done))
+        process.start()
+        before = cache.metrics()
+        mismatches = 0
+        while (flight_id := changed.get()) is not None:
+            results, error = cache.flight_statistics(flight_id, db_path)
+            mismatches += error is not None or results != uncached(flight_id, db_path)
+            done.put(None)
+        process.join()
+        after = cache.metrics()
+        print(f"{args.rounds} changes from another process: {after['stale'] - before['stale']} stale entries "
+              f"recomputed, {after['hits'] - before['hits']} hits, {mismatches} wrong results")
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Benchmark of the admin user search (usersearch.py) on a copy of a generated database.
+
+For --queries search texts cut from random usernames and names (3 to 8 characters, and some
+of 1 and 2 characters), it measures the mean and 99th percentile time of:
+- LIKE scan:       users whose username or name contains the text, with LIKE '%text%' over users,
+                   in the same order as search_users
+- search_users:    usersearch.search_users (trigram index, prefix scan for short texts)
+and for --queries random users the time to list their bookings on all flights, scanning bookings
+before the bookings_booker index exists and with usersearch.user_bookings afterwards.
+It also reports how long building the indexes took, and the time to register --inserts users
+with and without the triggers that keep the search index in sync.
+
+Usage: python -m benchmarks.bench_user_search --flights 20000 --users 10000 --queries 200
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from benchmarks.bench_replica import percentile
+from benchmarks.generate import dataset_path
+
+import db_queries
+import usersearch
+
+
+def timed(function, arguments):
+    times = []
+    for argument in arguments:
+        start = time.perf_counter()
+        function(argument)
+        times.append((time.perf_counter() - start) * 1000)
+    return f"mean {statistics.mean(times):8.3f} ms, p99 {percentile(times, 0.99):8.3f} ms"
+
+
+def insert_users(conn, first, count):
+    start = time.perf_counter()
+    with conn:
+        for number in range(first, first + count):
+            conn.execute("INSERT INTO users (username, name, password, user_type) VALUES (?, ?, 0, 'regular');",
+                         (f"bench{number}", f"Bench User {number}"))
+    return (time.perf_counter() - start) / count * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="User search benchmark")
+    parser.add_argument("--flights", type=int, default=20000)
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--inserts", type=int, default=2000)
+    args = parser.parse_args()
+
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, "flights.sqlite")
+    try:
+        shutil.copy(dataset_path(args.flights, args.occupancy, args.users), db_path)
+        db_queries.db_path = db_path
+        conn = db_queries.get_connection()
+
+        rng = random.Random(1)
+        users = conn.execute("SELECT username, name FROM users;").fetchall()
+        texts = []
+        for _ in range(args.queries):
+            text = rng.choice(rng.choice(users))
+            length = rng.choice((1, 2) + tuple(range(3, 9)))
+            offset = rng.randrange(max(1, len(text) - length + 1))
+            texts.append(text[offset:offset + length])
+        bookers = [row[0] for row in conn.execute(
+            "SELECT DISTINCT booker FROM bookings WHERE booker IS NOT NULL LIMIT 1000;")]
+        bookers = [rng.choice(bookers) for _ in range(args.queries)]
+
+        without_triggers = insert_users(conn, 0, args.inserts)
+
+        def like_scan(text):
+            # Same order as search_users: usernames and names starting with the text first
+            conn.execute("""
+            SELECT username, name, user_type FROM users WHERE username LIKE ? OR name LIKE ?
+            ORDER BY NOT (username LIKE ? OR name LIKE ?), username LIMIT ?;
+            """, (f"%{text}%", f"%{text}%", f"{text}%", f"{text}%", usersearch.SEARCH_LIMIT)).fetchall()
+
+        def bookings_scan(username):
+            conn.execute("""
+            SELECT b.flight, b.seat_number, f.aircraft_code
+            FROM bookings b NOT INDEXED JOIN flights f ON f.flight_id = CAST(b.flight AS TEXT)
+            WHERE b.booker = ? ORDER BY b.flight, b.seat_number;
+            """, (username,)).fetchall()
+
+        print(f"{len(users)} users, {args.queries} searches and booking lists")
+        print(f"  LIKE scan        {timed(like_scan, texts)}")
+        print(f"  bookings scan    {timed(bookings_scan, bookers[:max(1, args.queries // 20)])}")
+
+        start = time.perf_counter()
+        usersearch.ensure_index()
+        print(f"  indexes built in {time.perf_counter() - start:.2f}s")
+
+        print(f"  search_users     {timed(usersearch.search_users, texts)}")
+        print(f"  user_bookings    {timed(usersearch.user_bookings, bookers)}")
+
+        with_triggers = insert_users(conn, args.inserts, args.inserts)
+        print(f"  registering a user: {without_triggers:.1f} us without the search index, {with_triggers:.1f} us with it")
+        db_queries.close_connection()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
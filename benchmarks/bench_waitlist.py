@@ -0,0 +1,103 @@
+"""
+Benchmark of cancellations on full flights with long waitlists: every cancellation promotes the head
+of the waitlist in the same transaction.
+
+waitlist.Waitlist.cancel is run on copies of a generated database, each with two passes of
+cancellations, finding the head:
+- index:  on the waitlist_queue index
+- scan:   without the index, scanning and sorting the flight's waitlist
+
+Usage: python -m benchmarks.bench_waitlist --flights 1000 --full-flights 20 --waiting 20000 --cancels 5000
+"""
+
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.bench_replica import percentile
+from benchmarks.generate import FIRST_FLIGHT_ID, dataset_path
+
+import db_queries
+import waitlist
+
+
+def prepare(source, db_path, full_flights, waiting, drop_index=False):
+    """
+    Copies the database, books every seat of the first full_flights flights and puts waiting
+    customers with random priorities on each of their waitlists.
+    """
+    db_queries.close_connection()
+    shutil.copy(source, db_path)
+    db_queries.db_path = db_path
+    manager = waitlist.Waitlist()
+
+    flight_ids = [str(FIRST_FLIGHT_ID + i) for i in range(full_flights)]
+    rng = random.Random(1)
+    conn = db_queries.get_connection()
+    with conn:
+        conn.executemany("UPDATE bookings SET booker = 'booker' || seat_number WHERE flight = ?;",
+                         [(flight_id,) for flight_id in flight_ids])
+        conn.executemany("INSERT INTO waitlist (flight_id, username, priority, requested_at) VALUES (?, ?, ?, ?);",
+                         [(flight_id, f"waiting{i}", rng.choice((0, 0, 0, 1, 2)), 1e9 + i)
+                          for flight_id in flight_ids for i in range(waiting)])
+        if drop_index:
+            conn.execute("DROP INDEX waitlist_queue;")
+
+    seats = {flight_id: [row[0] for row in conn.execute("SELECT seat_number FROM bookings WHERE flight = ?;", (flight_id,))]
+             for flight_id in flight_ids}
+    return manager, seats
+
+
+def run(cancel, seats, cancels):
+    rng = random.Random(2)
+    conn = db_queries.get_connection()
+    latencies = []
+    promoted = 0
+    for _ in range(cancels):
+        flight_id = rng.choice(list(seats))
+        seat_number = rng.choice(seats[flight_id])
+        booker = conn.execute("SELECT booker FROM bookings WHERE flight = ? AND seat_number = ?;",
+                              (flight_id, seat_number)).fetchone()[0]
+        start = time.perf_counter()
+        _, head = cancel(flight_id, seat_number, booker)
+        latencies.append(time.perf_counter() - start)
+        promoted += head is not None
+    return latencies, promoted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Waitlist promotion benchmark")
+    parser.add_argument("--flights", type=int, default=1000)
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--full-flights", type=int, default=20)
+    parser.add_argument("--waiting", type=int, default=20000, help="customers waiting per full flight")
+    parser.add_argument("--cancels", type=int, default=5000)
+    args = parser.parse_args()
+
+    source = dataset_path(args.flights, args.occupancy, args.users)
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'flights.sqlite')
+
+    print(f"{args.full_flights} full flights with {args.waiting} customers waiting each, {args.cancels} cancellations")
+    try:
+        for label, drop_index in (("index", False), ("scan", True)):
+            manager, seats = prepare(source, db_path, args.full_flights, args.waiting, drop_index)
+            # The second pass shows the steady state, with the waitlists in the page cache
+            for run_label in ("first", "second"):
+                start = time.perf_counter()
+                latencies, promoted = run(manager.cancel, seats, args.cancels)
+                seconds = time.perf_counter() - start
+                print(f"  {label:10s} {run_label:6s} {args.cancels / seconds:8.0f} cancels/s, "
+                      f"p50 {percentile(latencies, 0.5) * 1000:7.3f} ms, p99 {percentile(latencies, 0.99) * 1000:7.3f} ms, "
+                      f"{promoted} promoted")
+    finally:
+        db_queries.close_connection()
+        shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    main()
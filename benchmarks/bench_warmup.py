@@ -0,0 +1,162 @@
+"""
+Benchmark of the first search after application start, with and without the warm-up (warmup.py).
+
+Every run starts from a copy of a generated database where --dirty flights were booked since the
+occupancy index was last refreshed, with the copy evicted from the operating system's cache (as
+after a reboot or when other files pushed it out). A fresh process imports the app's modules,
+starts the warm-up or not, waits --think seconds (the user logging in) and then times its first:
+- seat map:      flight, aircraft and bookings of a popular flight, as the seat map page reads them
+- flight search: occupancy.search_flights with a minimum block of adjacent seats
+- statistics:    stats.calculate_seat_availability of the same flight
+- chart:         the statistics page's pie chart, rendered off screen
+
+Usage: python -m benchmarks.bench_warmup --flights 20000 --dirty 2000 --runs 5 --think 1
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from benchmarks.generate import FIRST_FLIGHT_ID, dataset_path
+
+STEPS = ("seat map", "flight search", "statistics", "chart")
+
+
+def build_template(source, template_path):
+    """
+    Copies the database and builds the change feed and occupancy index in the copy, as a running
+    app would have.
+    """
+    import changes
+    import db_queries
+    import occupancy
+
+    shutil.copy(source, template_path)
+    db_queries.db_path = template_path
+    changes.ensure_schema(db_queries.get_connection())
+    occupancy.ensure_index()
+    db_queries.close_connection()
+
+
+def prepare(template_path, db_path, flights, dirty):
+    """
+    Copies the template, books a seat on dirty random flights (so their blocks in the occupancy
+    index are out of date) and evicts the copy from the operating system's cache.
+    Returns the most popular flight.
+    """
+    shutil.copy(template_path, db_path)
+
+    rng = random.Random(1)
+    flight_ids = rng.sample(range(FIRST_FLIGHT_ID, FIRST_FLIGHT_ID + flights), dirty)
+    conn = sqlite3.connect(db_path)
+    try:
+        with conn:
+            for flight_id in flight_ids:
+                # Two bookings on the first flight make it the most popular one
+                for _ in range(1 + (flight_id == flight_ids[0])):
+                    conn.execute("""
+                    UPDATE bookings SET booker = 'warmup' WHERE rowid = (
+                        SELECT rowid FROM bookings WHERE flight = ? AND booker IS NULL LIMIT 1);
+                    """, (flight_id,))
+    finally:
+        conn.close()
+
+    fd = os.open(db_path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+    return str(flight_ids[0])
+
+
+def first_search(db_path, flight_id, warm, think, results):
+    import matplotlib
+    matplotlib.use("Agg")
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    import db_queries
+    import occupancy
+    import stats
+    import warmup
+
+    db_queries.db_path = db_path
+    thread = warmup.start() if warm else None
+    time.sleep(think)
+    # The search does not wait for the warm-up; runs where it was not done yet are counted
+    unfinished = thread is not None and thread.is_alive()
+
+    def seat_map():
+        flight = db_queries.fetch_record("flights", {"flight_id": flight_id})
+        db_queries.fetch_record("aircrafts", {"code": flight.aircraft_code})
+        db_queries.fetch_records("bookings", {"flight": flight_id})
+
+    def chart():
+        figure = Figure()
+        axes = figure.add_subplot()
+        axes.pie([40, 60], labels=['Reserved Seats', 'Available Seats'],
+                 colors=['red', 'green'], autopct='%1.1f%%', startangle=90)
+        axes.axis('equal')
+        FigureCanvasAgg(figure).draw()
+
+    times = {}
+    for name, step in (("seat map", seat_map),
+                       ("flight search", lambda: occupancy.search_flights(min_block=2)),
+                       ("statistics", lambda: stats.calculate_seat_availability(flight_id, db_path)),
+                       ("chart", chart)):
+        start = time.perf_counter()
+        step()
+        times[name] = (time.perf_counter() - start) * 1000
+    results.put((times, unfinished))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="First search latency benchmark")
+    parser.add_argument("--flights", type=int, default=20000)
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--dirty", type=int, default=2000, help="flights booked since the occupancy index was refreshed")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--think", type=float, default=1.0, help="seconds between start and the first search")
+    args = parser.parse_args()
+
+    source = dataset_path(args.flights, args.occupancy, args.users)
+    tmp_dir = tempfile.mkdtemp()
+    db_path = os.path.join(tmp_dir, 'flights.sqlite')
+    context = multiprocessing.get_context("spawn")
+
+    template_path = os.path.join(tmp_dir, 'template.sqlite')
+    measured = {False: [], True: []}
+    try:
+        build_template(source, template_path)
+        for _ in range(args.runs):
+            for warm in (False, True):
+                flight_id = prepare(template_path, db_path, args.flights, args.dirty)
+                results = context.Queue()
+                process = context.Process(target=first_search, args=(db_path, flight_id, warm, args.think, results))
+                process.start()
+                measured[warm].append(results.get())
+                process.join()
+    finally:
+        shutil.rmtree(tmp_dir)
+
+    print(f"First search after start, median of {args.runs} runs ({args.dirty} flights with outdated blocks, "
+          f"{args.think}s until the search)")
+    for warm in (False, True):
+        times = [result[0] for result in measured[warm]]
+        columns = ", ".join(f"{name} {statistics.median(t[name] for t in times):7.1f} ms" for name in STEPS)
+        total = statistics.median(sum(t.values()) for t in times)
+        unfinished = sum(result[1] for result in measured[warm])
+        print(f"  {'with warm-up' if warm else 'without':12s} {columns}, total {total:7.1f} ms"
+              + (f" (warm-up not done yet in {unfinished} runs)" if warm else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Deterministic generator for synthetic flight databases.
+
+The generated database has the same schema and aircraft layouts as MainApp/flights.sqlite, with a
+configurable number of flights, users and a target seat occupancy. The same arguments always
+produce the same database.
+
+Usage: python -m benchmarks.generate --flights 100000 --occupancy 0.6 --users 50000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import time
+
+from benchmarks import BENCHMARKS_DIR, MAINAPP_DIR
+
+import seating
+
+SOURCE_DB = os.path.join(MAINAPP_DIR, 'flights.sqlite')
+DATA_DIR = os.path.join(BENCHMARKS_DIR, 'data')
+
+# Number of bookings rows buffered before they are written
+CHUNK_SIZE = 100000
+
+# First generated flight ID
+FIRST_FLIGHT_ID = 100000
+
+
+def generate_database(path, flights=1000, occupancy=0.5, users=1000, seed=0, admin_share=0.05):
+    """
+    Creates a new synthetic database at path.
+
+    :param path: Where to write the database. An existing file is replaced.
+    :param flights: Number of flights to generate.
+    :param occupancy: Probability that a seat is booked.
+    :param users: Number of users to generate.
+    :param seed: Seed for the random generator.
+    :param admin_share: Share of users that are admins.
+    :return: Dictionary describing the generated dataset.
+    """
+    rng = random.Random(seed)
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    # Copy the schema and the aircraft layouts from the shipped database
+    source = sqlite3.connect(SOURCE_DB)
+    schema = [row[0] for row in source.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name IN ('flights', 'bookings', 'users', 'aircrafts');")]
+    aircrafts = source.execute("SELECT code, layout, row_number FROM aircrafts ORDER BY code;").fetchall()
+    source.close()
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode = OFF;")
+    conn.execute("PRAGMA synchronous = OFF;")
+    for sql in schema:
+        conn.execute(sql)
+
+    with conn:
+        conn.executemany("INSERT INTO aircrafts (code, layout, row_number) VALUES (?, ?, ?);", aircrafts)
+
+        usernames = [f"user{i}" for i in range(users)]
+        conn.executemany(
+            "INSERT INTO users (username, name, password, user_type) VALUES (?, ?, ?, ?);",
+            ((name, f"User {i}", rng.randrange(10000, 99999999), "admin" if rng.random() < admin_share else "regular")
+             for i, name in enumerate(usernames)))
+
+    seats_by_aircraft = {code: seating.seat_labels(layout, rows) for code, layout, rows in aircrafts}
+    codes = [code for code, _, _ in aircrafts]
+
+    total_seats = 0
+    booked_seats = 0
+    buffer = []
+
+    with conn:
+        for i in range(flights):
+            flight_id = FIRST_FLIGHT_ID + i
+            code = rng.choice(codes)
+            conn.execute("INSERT INTO flights (flight_id, aircraft_code) VALUES (?, ?);", (str(flight_id), code))
+
+            for seat in seats_by_aircraft[code]:
+                if users and rng.random() < occupancy:
+                    booker = usernames[rng.randrange(users)]
+                    booked_seats += 1
+                else:
+                    booker = None
+                buffer.append((flight_id, seat, booker))
+
+            total_seats += len(seats_by_aircraft[code])
+            if len(buffer) >= CHUNK_SIZE:
+                conn.executemany("INSERT INTO bookings (flight, seat_number, booker) VALUES (?, ?, ?);", buffer)
+                buffer = []
+
+        conn.executemany("INSERT INTO bookings (flight, seat_number, booker) VALUES (?, ?, ?);", buffer)
+
+    conn.close()
+
+    return {
+        "flights": flights,
+        "occupancy": occupancy,
+        "users": users,
+        "seed": seed,
+        "total_seats": total_seats,
+        "booked_seats": booked_seats,
+    }
+
+
+def dataset_path(flights=1000, occupancy=0.5, users=1000, seed=0):
+    """
+    Returns the path of a generated database, generating it first if it does not exist yet.
+    Generated databases are kept in benchmarks/data.
+    """
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = os.path.join(DATA_DIR, f"flights_{flights}_{occupancy}_{users}_{seed}.sqlite")
+    if not os.path.exists(path):
+        tmp_path = path + ".tmp"
+        generate_database(tmp_path, flights, occupancy, users, seed)
+        os.replace(tmp_path, path)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic flights database")
+    parser.add_argument("--flights", type=int, default=1000)
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Output file (default: cached file in benchmarks/data)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.output:
+        info = generate_database(args.output, args.flights, args.occupancy, args.users, args.seed)
+        path = args.output
+    else:
+        path = dataset_path(args.flights, args.occupancy, args.users, args.seed)
+        info = None
+    elapsed = time.perf_counter() - start
+
+    print(f"Database: {path}")
+    if info:
+        print(f"{info['flights']} flights, {info['total_seats']} seats, {info['booked_seats']} booked")
+    print(f"Done in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
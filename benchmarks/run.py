@@ -0,0 +1,168 @@
+"""
+Times the public functions of db_queries and stats against a generated database.
+
+Results are written as JSON (one entry per function with mean, median, p95 and min time per call),
+together with the git commit and the dataset parameters, so runs can be compared across commits.
+
+Usage:
+    python -m benchmarks.run --flights 100000 --calls 200
+    python -m benchmarks.run --flights 100000 --compare benchmarks/results/<old>.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import time
+
+from benchmarks import BENCHMARKS_DIR
+from benchmarks.generate import FIRST_FLIGHT_ID, dataset_path
+
+import db_queries
+import stats
+
+RESULTS_DIR = os.path.join(BENCHMARKS_DIR, 'results')
+
+
+def git_commit():
+    """
+    Returns the current git commit hash, or "unknown" outside a git checkout.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build_cases(db_path, flights, users, seed):
+    """
+    Returns a list of (name, function) pairs. Each function takes the call number and performs
+    one call of the benchmarked function. Functions that write undo their change again, so the
+    dataset stays the same between runs.
+    """
+    rng = random.Random(seed)
+
+    def flight(_):
+        return str(FIRST_FLIGHT_ID + rng.randrange(flights))
+
+    def user(_):
+        return f"user{rng.randrange(users)}" if users else "nobody"
+
+    def update_row(i):
+        key = {"flight": int(flight(i)), "seat_number": "1A"}
+        old = db_queries.gimme_tuples("bookings", "booker", key)
+        db_queries.update_row("bookings", old_values=key, new_values={"booker": user(i)})
+        db_queries.update_row("bookings", old_values=key, new_values={"booker": old[0][0] if old else None})
+
+    def insert_delete_row(i):
+        db_queries.insert_row("flights", {"flight_id": f"bench{i}", "aircraft_code": "321"})
+        db_queries.delete_row("flights", {"flight_id": f"bench{i}"})
+
+    def add_rows_to_bookings(i):
+        db_queries.add_rows_to_bookings(f"bench{i}", "773")
+        db_queries.delete_row("bookings", {"flight": f"bench{i}"})
+
+    return [
+        ("db_queries.gimme_tuples[flights by id]", lambda i: db_queries.gimme_tuples("flights", identifier={"flight_id": flight(i)})),
+        ("db_queries.gimme_tuples[bookings by flight]", lambda i: db_queries.gimme_tuples("bookings", identifier={"flight": flight(i)})),
+        ("db_queries.gimme_tuples[bookings by booker]", lambda i: db_queries.gimme_tuples("bookings", identifier={"booker": user(i)})),
+        ("db_queries.gimme_tuples[aircrafts]", lambda i: db_queries.gimme_tuples("aircrafts")),
+        ("db_queries.is_in_table[flights]", lambda i: db_queries.is_in_table("flights", {"flight_id": flight(i)})),
+        ("db_queries.is_in_table[users]", lambda i: db_queries.is_in_table("users", {"username": user(i)})),
+        ("db_queries.update_row[book+unbook]", update_row),
+        ("db_queries.insert_row+delete_row[flights]", insert_delete_row),
+        ("db_queries.add_rows_to_bookings[773]", add_rows_to_bookings),
+        ("stats.calculate_seat_availability", lambda i: stats.calculate_seat_availability(flight(i), db_path)),
+        ("stats.list_seat_availability", lambda i: stats.list_seat_availability(flight(i), db_path)),
+        ("stats.list_users_for_flight", lambda i: stats.list_users_for_flight(flight(i), db_path)),
+    ]
+
+
+def time_case(func, calls):
+    """
+    Calls func calls times and returns timing statistics in microseconds.
+    """
+    times = []
+    for i in range(calls):
+        start = time.perf_counter()
+        func(i)
+        times.append((time.perf_counter() - start) * 1e6)
+    times.sort()
+    return {
+        "calls": calls,
+        "mean_us": statistics.fmean(times),
+        "median_us": statistics.median(times),
+        "p95_us": times[min(len(times) - 1, int(len(times) * 0.95))],
+        "min_us": times[0],
+    }
+
+
+def compare(results, baseline_path):
+    """
+    Prints the median time of each function relative to a previous results file.
+    """
+    with open(baseline_path) as file:
+        baseline = json.load(file)
+
+    print(f"\nCompared to {baseline['commit']} ({baseline_path}):")
+    for name, result in results["results"].items():
+        old = baseline["results"].get(name)
+        if old is None:
+            print(f"  {name:50s} (new)")
+            continue
+        ratio = result["median_us"] / old["median_us"] if old["median_us"] else float("inf")
+        print(f"  {name:50s} {old['median_us']:12.1f} -> {result['median_us']:12.1f} us  x{ratio:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time db_queries and stats on a generated database")
+    parser.add_argument("--flights", type=int, default=1000)
+    parser.add_argument("--occupancy", type=float, default=0.5)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--filter", default="", help="Only run functions whose name contains this text")
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/<commit>_<flights>.json)")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    args = parser.parse_args()
+
+    db_path = dataset_path(args.flights, args.occupancy, args.users, args.seed)
+    db_queries.db_path = db_path
+
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "dataset": {"flights": args.flights, "occupancy": args.occupancy, "users": args.users, "seed": args.seed},
+        "results": {},
+    }
+
+    for name, func in build_cases(db_path, args.flights, args.users, args.seed):
+        if args.filter not in name:
+            continue
+        result = time_case(func, args.calls)
+        results["results"][name] = result
+        print(f"{name:50s} median {result['median_us']:12.1f} us  p95 {result['p95_us']:12.1f} us")
+
+    db_queries.close_connection()
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        output = os.path.join(RESULTS_DIR, f"{results['commit']}_{args.flights}.json")
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
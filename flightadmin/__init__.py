@@ -0,0 +1,17 @@
+"""
+Command line administration of the flights database (python -m flightadmin --help).
+
+Replaces the one-off scripts in reference_scripts_db: queries, bulk updates and deletes from CSV,
+provisioning of flights with their seat grids and schema inspection, all built on the MainApp
+modules (db_queries, importer).
+"""
+
+import os
+import sys
+
+FLIGHTADMIN_DIR = os.path.abspath(os.path.dirname(__file__))
+MAINAPP_DIR = os.path.join(FLIGHTADMIN_DIR, '..', 'MainApp')
+
+# Make the MainApp modules importable (they import each other as top-level modules)
+if MAINAPP_DIR not in sys.path:
+    sys.path.insert(0, MAINAPP_DIR)
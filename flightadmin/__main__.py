@@ -0,0 +1,270 @@
+"""
+Command line administration of the flights database.
+
+Subcommands:
+- query SQL [PARAM ...]: runs a statement on a read-only connection and prints the rows.
+- update TABLE --set COL ... --where COL ... [FILE]: updates one row per CSV line.
+- delete TABLE --where COL ... [FILE]: deletes the rows matching each CSV line.
+- provision [FILE]: adds flights (CSV columns flight_id, aircraft_code) with their seat grids.
+- schema [TABLE ...]: prints tables with their columns, indexes and triggers.
+
+Batch commands read CSV with a header line from FILE, or from standard input if FILE is "-" or
+missing. Empty fields are passed as NULL. Rows are written in chunks of --chunk-size, each chunk in
+its own transaction, so a failure only rolls back the current chunk. With --dry-run everything runs
+in one transaction that is rolled back at the end, so the reported counts are exact but nothing is
+changed. --timing prints the time of every chunk to standard error.
+
+Usage: python -m flightadmin [--db flights.sqlite] [--dry-run] [--timing] [--chunk-size N] <command> ...
+"""
+
+import argparse
+import csv
+import itertools
+import os
+import sqlite3
+import sys
+import time
+
+import db_queries
+import importer
+
+CHUNK_SIZE = 1000
+
+
+def read_rows(source, columns):
+    """
+    Yields the values of the given columns for every line of a CSV file, empty fields as None.
+
+    :param source: Path to the CSV file, or "-" for standard input.
+    :param columns: Names of the columns to read; the header line must contain all of them.
+    :raises ValueError: If a column is missing from the header.
+    """
+    file = sys.stdin if source == "-" else open(source, newline='', encoding='utf-8')
+    try:
+        reader = csv.DictReader(file)
+        missing = [col for col in columns if col not in (reader.fieldnames or ())]
+        if missing:
+            raise ValueError(f"Column(s) {', '.join(missing)} missing from the CSV header.")
+        for line in reader:
+            yield tuple(line[col] if line[col] != '' else None for col in columns)
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+def run_batches(conn, rows, write, args):
+    """
+    Passes rows to write(conn, chunk) in chunks of args.chunk_size, one transaction per chunk
+    (a single, rolled back transaction with args.dry_run).
+
+    :param conn: An open connection to the database.
+    :param rows: Iterable of rows.
+    :param write: Function writing one chunk and returning the number of rows it changed.
+    :param args: Parsed command line arguments.
+    :return: Tuple (rows read, rows changed).
+    """
+    rows = iter(rows)
+    read = changed = 0
+    if args.dry_run:
+        conn.execute("BEGIN IMMEDIATE;")
+    try:
+        for number in itertools.count(1):
+            chunk = list(itertools.islice(rows, args.chunk_size))
+            if not chunk:
+                break
+            start = time.perf_counter()
+            if not args.dry_run:
+                conn.execute("BEGIN IMMEDIATE;")
+            try:
+                count = write(conn, chunk)
+                if not args.dry_run:
+                    conn.commit()
+            except Exception:
+                if not args.dry_run:
+                    conn.rollback()
+                    print(f"Chunk {number} rolled back; {read} rows before it were committed.", file=sys.stderr)
+                raise
+            read += len(chunk)
+            changed += count
+            if args.timing:
+                print(f"chunk {number}: {len(chunk)} rows, {count} changed, "
+                      f"{(time.perf_counter() - start) * 1000:.1f} ms", file=sys.stderr)
+    finally:
+        if args.dry_run:
+            conn.rollback()
+    return read, changed
+
+
+def report(label, start, read, changed, args):
+    """
+    Prints the summary of a batch command, e.g. "update bookings: 500 rows read, 480 changed".
+    """
+    elapsed = time.perf_counter() - start
+    line = f"{label}: {read} rows read, {changed}"
+    if args.timing:
+        line += f" in {elapsed:.3f} s ({read / elapsed if elapsed else 0:.0f} rows/s)"
+    if args.dry_run:
+        line += " (dry run, rolled back)"
+    print(line)
+
+
+def query(args):
+    """
+    Runs a statement with PRAGMA query_only set and prints the rows, tab separated or as CSV.
+    """
+    conn = db_queries.get_connection()
+    start = time.perf_counter()
+    conn.execute("PRAGMA query_only = ON;")
+    try:
+        cursor = conn.execute(args.sql, args.params)
+        rows = cursor.fetchall()
+    finally:
+        conn.execute("PRAGMA query_only = OFF;")
+    elapsed = time.perf_counter() - start
+
+    header = [column[0] for column in cursor.description or ()]
+    if args.csv:
+        writer = csv.writer(sys.stdout)
+        writer.writerow(header)
+        writer.writerows(rows)
+    else:
+        print("\t".join(header))
+        for row in rows:
+            print("\t".join("NULL" if value is None else str(value) for value in row))
+    if args.timing:
+        print(f"{len(rows)} rows in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+
+def update(args):
+    """
+    Updates the rows matching the --where columns of every CSV line with its --set columns.
+    """
+    set_keys, where_keys = tuple(args.set), tuple(args.where)
+    sql = db_queries.update_sql(args.table, set_keys, where_keys)
+    rows = read_rows(args.file, set_keys + where_keys)
+
+    start = time.perf_counter()
+    read, changed = run_batches(db_queries.get_connection(), rows,
+                                lambda conn, chunk: conn.executemany(sql, chunk).rowcount, args)
+    report(f"update {args.table}", start, read, f"{changed} changed", args)
+
+
+def delete(args):
+    """
+    Deletes the rows matching the --where columns of every CSV line.
+    """
+    where_keys = tuple(args.where)
+    sql = db_queries.delete_sql(args.table, where_keys)
+    rows = read_rows(args.file, where_keys)
+
+    start = time.perf_counter()
+    read, changed = run_batches(db_queries.get_connection(), rows,
+                                lambda conn, chunk: conn.executemany(sql, chunk).rowcount, args)
+    report(f"delete {args.table}", start, read, f"{changed} deleted", args)
+
+
+def provision(args):
+    """
+    Adds the flights of the CSV lines with the seat grid of their aircraft (see importer.insert_flights).
+    Flights that already exist and flights with unknown aircraft are skipped.
+    """
+    conn = db_queries.get_connection()
+    grids = importer.aircraft_grids(conn)
+    rows = read_rows(args.file, ("flight_id", "aircraft_code"))
+    seats_added = 0
+
+    def write(conn, chunk):
+        nonlocal seats_added
+        flights, seats = importer.insert_flights(conn, chunk, grids)
+        seats_added += seats
+        return flights
+
+    start = time.perf_counter()
+    read, changed = run_batches(conn, rows, write, args)
+    report("provision", start, read, f"{changed} flights and {seats_added} seats added", args)
+
+
+def schema(args):
+    """
+    Prints the columns, indexes and triggers of the given tables (default: all tables).
+    """
+    conn = db_queries.get_connection()
+    tables = args.tables or [row[0] for row in conn.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name;")]
+
+    for table in tables:
+        db_queries.table_columns(table)  # raises ValueError for unknown tables
+        line = f"{table}"
+        if args.counts:
+            line += f" ({conn.execute(f'SELECT COUNT(*) FROM {table};').fetchone()[0]} rows)"
+        print(line)
+
+        # PRAGMA does not accept parameters, but the name was checked by table_columns
+        for _, name, col_type, not_null, default, pk in conn.execute(f"PRAGMA table_info({table});"):
+            flags = [flag for flag, is_set in (("PRIMARY KEY", pk), ("NOT NULL", not_null)) if is_set]
+            if default is not None:
+                flags.append(f"DEFAULT {default}")
+            print(f"  {name} {col_type} {' '.join(flags)}".rstrip())
+        for _, index, unique, origin, partial in conn.execute(f"PRAGMA index_list({table});"):
+            columns = ", ".join(row[2] for row in conn.execute(f"PRAGMA index_info('{index}');"))
+            print(f"  {'unique ' if unique else ''}index {index} ({columns})"
+                  f"{' partial' if partial else ''}{' [' + origin + ']' if origin != 'c' else ''}")
+        for (trigger,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = ?;",
+                                       (table,)):
+            print(f"  trigger {trigger}")
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m flightadmin", description="Administer the flights database")
+    parser.add_argument("--db", default=db_queries.db_path, help="database to work on")
+    parser.add_argument("--dry-run", action="store_true", help="roll back all changes at the end")
+    parser.add_argument("--timing", action="store_true", help="print timings (per chunk on standard error)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="rows written per transaction")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("query", help="run a read-only query")
+    command.add_argument("sql")
+    command.add_argument("params", nargs="*", help="values for the ? placeholders")
+    command.add_argument("--csv", action="store_true", help="print CSV instead of tab separated values")
+    command.set_defaults(run=query)
+
+    command = commands.add_parser("update", help="update rows from CSV")
+    command.add_argument("table")
+    command.add_argument("--set", nargs="+", required=True, metavar="COL", help="columns to set")
+    command.add_argument("--where", nargs="+", required=True, metavar="COL", help="columns identifying the rows")
+    command.add_argument("file", nargs="?", default="-", help="CSV file (default: standard input)")
+    command.set_defaults(run=update)
+
+    command = commands.add_parser("delete", help="delete rows from CSV")
+    command.add_argument("table")
+    command.add_argument("--where", nargs="+", required=True, metavar="COL", help="columns identifying the rows")
+    command.add_argument("file", nargs="?", default="-", help="CSV file (default: standard input)")
+    command.set_defaults(run=delete)
+
+    command = commands.add_parser("provision", help="add flights with their seat grids from CSV")
+    command.add_argument("file", nargs="?", default="-", help="CSV file with flight_id, aircraft_code")
+    command.set_defaults(run=provision)
+
+    command = commands.add_parser("schema", help="show tables, columns, indexes and triggers")
+    command.add_argument("tables", nargs="*", metavar="TABLE")
+    command.add_argument("--counts", action="store_true", help="also count the rows of every table")
+    command.set_defaults(run=schema)
+
+    args = parser.parse_args()
+    if not os.path.isfile(args.db):
+        parser.error(f"database {args.db} not found")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be at least 1")
+    db_queries.db_path = args.db
+
+    try:
+        args.run(args)
+    except (ValueError, sqlite3.Error) as error:
+        print(f"error: {error}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        db_queries.close_connection()
+
+
+if __name__ == "__main__":
+    main()